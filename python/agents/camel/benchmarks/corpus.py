@@ -0,0 +1,216 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Stub tools, Q-LLM, security policies and programs for the benchmarks.
+
+The programs are representative of the code generated by the P-LLM. The tools
+and the Q-LLM return deterministic data without any I/O, so the benchmarks
+only measure the interpreter and the security policy engine.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+
+import pydantic
+
+from camel.camel_library import security_policy
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.capabilities import utils as capabilities_utils
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import library
+
+USER = "emma@example.com"
+TEAM = "team@example.com"
+
+
+def search_emails(query: str) -> list[dict[str, str]]:
+  """Returns fake emails matching the query."""
+  return [
+      {"sender": f"user{i}@example.com", "subject": f"{query} {i}"}
+      for i in range(20)
+  ]
+
+
+def send_email(to: str, body: str) -> str:
+  """Pretends to send an email."""
+  return f"Sent {body!r} to {to}"
+
+
+def list_transactions(n: int) -> list[dict[str, Any]]:
+  """Returns `n` fake bank transactions."""
+  return [
+      {
+          "id": i,
+          "recipient": f"shop{i % 37}@example.com",
+          "amount": (i * 7919) % 1000 / 10,
+          "category": ("food", "travel", "rent", "misc")[i % 4],
+      }
+      for i in range(n)
+  ]
+
+
+def read_file(name: str) -> str:
+  """Returns the content of a large fake log file."""
+  return "\n".join(
+      f"{name} line {i}: status={'ERROR' if i % 50 == 0 else 'ok'} took={i % 13}ms"
+      for i in range(2000)
+  )
+
+
+def query_ai_assistant(query: str, output_schema: type[Any]) -> Any:
+  """Stands in for the quarantined LLM."""
+  del query  # Unused.
+  if isinstance(output_schema, type) and issubclass(
+      output_schema, pydantic.BaseModel
+  ):
+    return output_schema.model_validate({
+        name: field.annotation()
+        for name, field in output_schema.model_fields.items()
+    })
+  return output_schema()
+
+
+TOOLS = (search_emails, send_email, list_transactions, read_file)
+"""The stub tools, without the stub Q-LLM."""
+
+_PRIVATE_TOOLS = frozenset({"search_emails", "read_file"})
+"""Tools whose outputs can only be read by the user and the team."""
+
+
+class StubPolicyEngine(security_policy.SecurityPolicyEngine):
+  """Policies similar to the example agent's, checking readers of arguments."""
+
+  def __init__(self) -> None:
+    self.policies = [
+        ("send_email", self.send_email_policy),
+        ("*", lambda name, kwargs: security_policy.Allowed()),
+    ]
+    self.no_side_effect_tools = {
+        "search_emails",
+        "list_transactions",
+        "read_file",
+        "query_ai_assistant",
+    }
+
+  def send_email_policy(
+      self, tool_name: str, kwargs: Mapping[str, camel_value.Value]
+  ) -> security_policy.SecurityPolicyResult:
+    del tool_name  # Unused.
+    to, body = kwargs["to"], kwargs["body"]
+    if capabilities_utils.can_readers_read_value({to.raw}, body):
+      return security_policy.Allowed()
+    return security_policy.Denied(f"{to.raw} can't read the body.")
+
+
+def make_namespace() -> camel_value.Namespace:
+  """Returns a namespace with the built-ins, the stub tools and the Q-LLM."""
+  variables = {}
+  for tool in (*TOOLS, query_ai_assistant):
+    if tool.__name__ in _PRIVATE_TOOLS:
+      tool_capabilities = capabilities.Capabilities(
+          frozenset(), frozenset({USER, TEAM})
+      )
+    else:
+      tool_capabilities = capabilities.Capabilities.camel()
+    variables[tool.__name__] = camel_value.CaMeLFunction(
+        tool.__name__, tool, tool_capabilities, ()
+    )
+  return library.make_builtins_namespace(variables)
+
+
+PROGRAMS = {
+    "straight_line": """```python
+emails = search_emails("meeting")
+first = emails[0]
+subject = first["subject"]
+summary = f"{first['sender']} wrote about {subject}"
+print(summary)
+```""",
+    "loops_and_comprehensions": """```python
+emails = search_emails("invoice")
+senders = [email["sender"] for email in emails]
+by_sender = {email["sender"]: email["subject"] for email in emails}
+count = 0
+for email in emails:
+    if "1" in email["subject"]:
+        count += 1
+print(len(senders), len(by_sender), count)
+```""",
+    "classes_and_llm": """```python
+class Summary(BaseModel):
+    text: str
+    important: bool
+
+emails = search_emails("report")
+summaries = [
+    query_ai_assistant("Summarize " + email["subject"], Summary)
+    for email in emails
+]
+important = [s.text for s in summaries if s.important]
+print(len(important))
+```""",
+    "tool_call": """```python
+emails = search_emails("lunch")
+send_email(to="team@example.com", body="Lunch at " + emails[0]["subject"])
+```""",
+    "tool_fan_out": """```python
+class Reply(BaseModel):
+    answer: str
+    needs_reply: bool
+
+queries = ["budget", "offsite", "hiring", "roadmap", "security"]
+results = [search_emails(query) for query in queries]
+replies = []
+for emails in results:
+    for email in emails:
+        reply = query_ai_assistant("Draft a reply to " + email["subject"], Reply)
+        if reply.needs_reply:
+            send_email(to="team@example.com", body=reply.answer)
+        replies = [*replies, reply]
+print(len(replies))
+```""",
+    "data_shaping": """```python
+transactions = list_transactions(500)
+by_category = {}
+for t in transactions:
+    category = t["category"]
+    by_category[category] = by_category.get(category, 0) + t["amount"]
+large = [t for t in transactions if t["amount"] > 90]
+recipients = sorted(set([t["recipient"] for t in large]))
+totals = {c: int(by_category[c]) for c in by_category}
+ids = [t["id"] for t in transactions]
+found = [i for i in range(0, 1000, 10) if i in ids]
+print(totals, len(large), len(recipients), len(found), sum(ids), max(ids))
+```""",
+    "large_string_output": """```python
+log = read_file("server.log")
+lines = log.splitlines()
+errors = [line for line in lines if "ERROR" in line]
+slow = [line for line in lines if line.endswith("took=12ms")]
+report = "\\n".join([line.upper() for line in errors])
+first_error = log.find("ERROR")
+print(len(lines), len(errors), len(slow), len(report), first_error)
+```""",
+    "deep_dependency_chain": """```python
+emails = search_emails("status")
+digest = ""
+for i in range(300):
+    email = emails[i % len(emails)]
+    digest = digest + email["sender"] + ": " + email["subject"] + "\\n"
+    if i % 100 == 99:
+        send_email(to="team@example.com", body=digest)
+print(len(digest))
+```""",
+}
+"""Programs like the ones generated by the P-LLM, by name."""
@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmark for parsing and evaluating CaMeL programs.
+
+Compares running a program by parsing it from scratch every time against
+`parse_and_interpret_code`, which reuses the cached parsed code, and reports
+how much of the time is spent evaluating the already parsed code.
+
+Run from the `camel` agent directory with:
+
+  python -m benchmarks.interpreter_benchmark
+"""
+
+import argparse
+import ast
+import statistics
+import time
+from typing import Any, Callable
+
+from benchmarks import corpus
+from camel.camel_library import security_policy
+from camel.camel_library.interpreter import interpreter
+
+_PROGRAMS = (
+    "straight_line",
+    "loops_and_comprehensions",
+    "classes_and_llm",
+    "tool_call",
+)
+"""The short programs of `benchmarks.corpus` benchmarked here."""
+
+
+def _time(fn: Callable[[], Any], repeats: int) -> float:
+  """Returns the median time of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--repeats", type=int, default=200)
+  parser.add_argument(
+      "--mode",
+      choices=[m.value for m in interpreter.DependenciesPropagationMode],
+      default=interpreter.DependenciesPropagationMode.NORMAL.value,
+  )
+  args = parser.parse_args()
+
+  eval_args = interpreter.EvalArgs(
+      security_policy.NoSecurityPolicyEngine(), interpreter.DependenciesPropagationMode(args.mode)
+  )
+
+  print(
+      f"{'program':<26} {'parse+eval ms':>14} {'cached ms':>10}"
+      f" {'eval only ms':>13}"
+  )
+  for name in _PROGRAMS:
+    program = corpus.PROGRAMS[name]
+    parsed = ast.parse(interpreter.extract_code_block(program))
+
+    def uncached(program=program):
+      interpreter.camel_eval(
+          ast.parse(interpreter.extract_code_block(program)),
+          corpus.make_namespace(),
+          [],
+          (),
+          eval_args,
+      )
+
+    def cached(program=program):
+      interpreter.parse_and_interpret_code(
+          program, corpus.make_namespace(), [], (), eval_args
+      )
+
+    def eval_only(parsed=parsed):
+      interpreter.camel_eval(parsed, corpus.make_namespace(), [], (), eval_args)
+
+    cached()  # Warm up the cache.
+    print(
+        f"{name:<26} {_time(uncached, args.repeats):>14.3f}"
+        f" {_time(cached, args.repeats):>10.3f}"
+        f" {_time(eval_only, args.repeats):>13.3f}"
+    )
+
+
+if __name__ == "__main__":
+  main()
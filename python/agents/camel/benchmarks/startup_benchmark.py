@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the import and startup time of the CaMeL agent.
+
+Each measurement runs in a fresh interpreter, as in a cold start, and reports
+the time to import the agent module, to create the first agent (which
+generates the system prompt), to create another agent with the same tools, and
+to run a first program.
+
+Run from the `camel` agent directory with:
+
+  python -m benchmarks.startup_benchmark
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_MEASURE = r"""
+import json
+import time
+
+start = time.perf_counter()
+from camel.camel_agent import camel_agent
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import interpreter
+from camel.camel_library.interpreter import library
+imported = time.perf_counter()
+
+
+def search_emails(query: str) -> list[str]:
+  '''Searches the emails.
+
+  Args:
+    query: The query to search for.
+  '''
+  return [query]
+
+
+tools = [(search_emails, capabilities.Capabilities.camel(), ())]
+camel_agent.CaMeLAgent(name="first", tools=tools)
+first_agent = time.perf_counter()
+agent = camel_agent.CaMeLAgent(name="second", tools=tools)
+second_agent = time.perf_counter()
+interpreter.parse_and_interpret_code(
+    "```python\nprint(len(sorted(search_emails('a'))))\n```",
+    library.make_builtins_namespace({
+        "search_emails": camel_value.CaMeLFunction(
+            "search_emails", search_emails, capabilities.Capabilities.camel(), ()
+        )
+    }),
+    [],
+    (),
+    agent.camel_interpreter_agent.camel_interpreter_service.eval_args,
+)
+first_program = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first agent": first_agent - imported,
+    "second agent": second_agent - first_agent,
+    "first program": first_program - second_agent,
+}))
+"""
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--repeats", type=int, default=5)
+  args = parser.parse_args()
+
+  timings: dict[str, list[float]] = {}
+  for _ in range(args.repeats):
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    for step, seconds in json.loads(output.splitlines()[-1]).items():
+      timings.setdefault(step, []).append(seconds * 1000)
+
+  print(f"{'step':<16} {'median ms':>10} {'min ms':>10}")
+  for step, step_timings in timings.items():
+    print(
+        f"{step:<16} {statistics.median(step_timings):>10.3f}"
+        f" {min(step_timings):>10.3f}"
+    )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,238 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark suite for the CaMeL interpreter and security policy engine.
+
+Runs the programs in `benchmarks.corpus` with stub tools and a stub Q-LLM and
+reports, for each of them, the median time and the peak memory allocated.
+It also measures the cost of `check_policy` and the memory used by each kind
+of value.
+
+The results can be saved as JSON and compared with the ones of another commit,
+e.g.:
+
+  git checkout main && python -m benchmarks.suite --json /tmp/main.json
+  git checkout my-branch && python -m benchmarks.suite --compare /tmp/main.json
+
+Run from the `camel` agent directory. With `--compare`, the exit status is 1 if
+a metric got worse than the baseline by more than `--threshold`.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks import corpus
+from camel.camel_library import result
+from camel.camel_library import security_policy
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import dependency_context
+from camel.camel_library.interpreter import interpreter
+
+_VALUES_PER_MEASUREMENT = 10_000
+_POLICY_CHECKS = 2_000
+_DEPENDENCY_COUNTS = (1, 10, 100)
+
+
+def _median_ms(fn: Callable[[], Any], repeats: int) -> float:
+  """Returns the median time of `fn` in milliseconds."""
+  timings = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    fn()
+    timings.append((time.perf_counter() - start) * 1000)
+  return statistics.median(timings)
+
+
+def _peak_kib(fn: Callable[[], Any]) -> float:
+  """Returns the peak memory allocated while running `fn`, in KiB."""
+  tracemalloc.start()
+  try:
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  return peak / 1024
+
+
+def _run_program(
+    program: str, eval_args: interpreter.EvalArgs
+) -> interpreter.EvalResult:
+  eval_result = interpreter.parse_and_interpret_code(
+      program, corpus.make_namespace(), [], (), eval_args
+  )
+  if isinstance(eval_result[0], result.Error):
+    raise RuntimeError(f"The program failed: {eval_result[0].error}")
+  return eval_result
+
+
+def benchmark_programs(
+    eval_args: interpreter.EvalArgs, repeats: int
+) -> dict[str, float]:
+  """Returns the time and memory metrics of the programs in the corpus."""
+  metrics = {}
+  for name, program in corpus.PROGRAMS.items():
+    run = lambda program=program: _run_program(program, eval_args)
+    run()  # Warm up the parsing cache.
+    metrics[f"program/{name}/time_ms"] = _median_ms(run, repeats)
+    metrics[f"program/{name}/peak_kib"] = _peak_kib(run)
+  return metrics
+
+
+def benchmark_check_policy() -> dict[str, float]:
+  """Returns the cost of checking an allowed tool call, in microseconds.
+
+  The call depends on public values only, so each check goes through the whole
+  `send_email` policy, both with a dependency context and with a plain tuple.
+  """
+  engine = corpus.StubPolicyEngine()
+  private = capabilities.Capabilities(
+      frozenset(), frozenset({corpus.USER, corpus.TEAM})
+  )
+  kwargs = {
+      "to": camel_value.CaMeLStr.from_raw(
+          corpus.TEAM, capabilities.Capabilities.camel(), ()
+      ),
+      "body": camel_value.CaMeLStr.from_raw("Hello", private, ()),
+  }
+  metrics = {}
+  for count in _DEPENDENCY_COUNTS:
+    values = tuple(
+        camel_value.CaMeLInt(i, capabilities.Capabilities.camel(), ())
+        for i in range(count)
+    )
+    for kind, dependencies in (
+        ("tuple", values),
+        ("context", dependency_context.DependencyContext(values)),
+    ):
+
+      def check(dependencies=dependencies):
+        for _ in range(_POLICY_CHECKS):
+          engine.check_policy("send_email", kwargs, dependencies)
+
+      metrics[f"check_policy/{kind}_{count}_deps/time_us"] = (
+          _median_ms(check, 5) * 1000 / _POLICY_CHECKS
+      )
+  return metrics
+
+
+def benchmark_value_memory() -> dict[str, float]:
+  """Returns the memory used by each kind of value, in bytes."""
+  caps = capabilities.Capabilities.camel()
+  factories = {
+      "CaMeLNone": lambda i: camel_value.CaMeLNone(caps, ()),
+      "CaMeLInt": lambda i: camel_value.CaMeLInt(i, caps, ()),
+      "CaMeLFloat": lambda i: camel_value.CaMeLFloat(i / 2, caps, ()),
+      "CaMeLStr": lambda i: camel_value.CaMeLStr.from_raw(str(i), caps, ()),
+      "CaMeLList": lambda i: camel_value.CaMeLList([], caps, ()),
+      "CaMeLDict": lambda i: camel_value.CaMeLDict({}, caps, ()),
+  }
+  metrics = {}
+  for name, factory in factories.items():
+    # The raw Python values are allocated too, and counted.
+    values = []
+    tracemalloc.start()
+    try:
+      start, _ = tracemalloc.get_traced_memory()
+      values = [factory(i) for i in range(_VALUES_PER_MEASUREMENT)]
+      end, _ = tracemalloc.get_traced_memory()
+    finally:
+      tracemalloc.stop()
+    del values
+    metrics[f"value_memory/{name}/bytes"] = (
+        end - start
+    ) / _VALUES_PER_MEASUREMENT
+  return metrics
+
+
+def compare(
+    metrics: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+  """Prints `metrics` next to `baseline` and returns the regressed metrics."""
+  regressions = []
+  print(f"{'metric':<55} {'baseline':>10} {'current':>10} {'ratio':>7}")
+  for name, value in metrics.items():
+    previous = baseline.get(name)
+    if previous is None:
+      print(f"{name:<55} {'-':>10} {value:>10.3f}")
+      continue
+    ratio = value / previous if previous else float("inf")
+    flag = ""
+    if ratio > 1 + threshold:
+      flag = "  REGRESSION"
+      regressions.append(name)
+    print(f"{name:<55} {previous:>10.3f} {value:>10.3f} {ratio:>7.2f}{flag}")
+  return regressions
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(
+      description=__doc__.splitlines()[0],
+      formatter_class=argparse.RawDescriptionHelpFormatter,
+      epilog="\n".join(__doc__.splitlines()[2:]),
+  )
+  parser.add_argument("--repeats", type=int, default=5)
+  parser.add_argument(
+      "--mode",
+      choices=[m.value for m in interpreter.DependenciesPropagationMode],
+      default=interpreter.DependenciesPropagationMode.NORMAL.value,
+  )
+  parser.add_argument(
+      "--no-policies",
+      action="store_true",
+      help="Allow every tool call, to measure the interpreter alone.",
+  )
+  parser.add_argument("--json", help="Where to save the results as JSON.")
+  parser.add_argument("--compare", help="JSON results to compare with.")
+  parser.add_argument(
+      "--threshold",
+      type=float,
+      default=0.1,
+      help="Relative increase of a metric reported as a regression.",
+  )
+  args = parser.parse_args()
+
+  if args.no_policies:
+    engine = security_policy.NoSecurityPolicyEngine()
+  else:
+    engine = corpus.StubPolicyEngine()
+  eval_args = interpreter.EvalArgs(
+      engine, interpreter.DependenciesPropagationMode(args.mode)
+  )
+  metrics = {
+      **benchmark_programs(eval_args, args.repeats),
+      **benchmark_check_policy(),
+      **benchmark_value_memory(),
+  }
+
+  if args.json:
+    with open(args.json, "w") as f:
+      json.dump(metrics, f, indent=2)
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+    if compare(metrics, baseline, args.threshold):
+      sys.exit(1)
+  else:
+    for name, value in metrics.items():
+      print(f"{name:<55} {value:>10.3f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -15,7 +15,8 @@
 """CaMeL agent implementation."""
 
 import asyncio
-from collections.abc import Iterator
+from collections.abc import Iterator, Sequence
+import contextvars
 import queue
 import re
 import threading
@@ -38,10 +39,14 @@ from ..camel_library import function_types
 from ..camel_library import result
 from ..camel_library import security_policy
 from ..camel_library.capabilities import capabilities
+from ..camel_library.capabilities import utils as capabilities_utils
 from ..camel_library.interpreter import camel_value
 from ..camel_library.interpreter import interpreter
 from ..camel_library.interpreter import library
+from ..camel_library.interpreter import profiler as profiler_lib
 from . import prompts
+from . import qllm_cache
+from . import session_pool
 from . import utils
 
 BaseModel = pydantic.BaseModel
@@ -77,6 +82,43 @@ float_validator = validators.float_validator
 bool_validator = validators.bool_validator
 
 
+_query_inputs_provenance: contextvars.ContextVar[
+    tuple[capabilities.readers.Readers[Any], frozenset[Any]] | None
+] = contextvars.ContextVar("_query_inputs_provenance", default=None)
+"""Readers and sources of the inputs of the current `query_ai_assistant` call."""
+
+
+class QueryAiAssistantFunction(CaMeLFunction):
+  """`query_ai_assistant` function exposing the labels of its inputs.
+
+  The readers and sources of the arguments are made available to the Q-LLM
+  service while the function is called, so that cached responses are only
+  reused for inputs with the same labels.
+  """
+
+  __slots__ = ()
+
+  def call(
+      self,
+      args: camel_value.CaMeLTuple,
+      kwargs: camel_value.CaMeLDict[camel_value.CaMeLStr, CaMeLValue],
+      namespace: Namespace,
+  ) -> tuple[CaMeLValue, dict[str, Any]]:
+    inputs_readers: capabilities.readers.Readers[Any] = (
+        capabilities.readers.Public()
+    )
+    inputs_sources: frozenset[Any] = frozenset()
+    for value in (*args.iterate_python(), *kwargs.python_value.values()):
+      summary = capabilities_utils.get_provenance_summary(value)
+      inputs_readers &= summary.readers
+      inputs_sources |= summary.sources
+    token = _query_inputs_provenance.set((inputs_readers, inputs_sources))
+    try:
+      return super().call(args, kwargs, namespace)
+    finally:
+      _query_inputs_provenance.reset(token)
+
+
 class QuarantinedLlmService(BaseModel):
   """Manages synchronous interactions with the Quarantined LLM (Q-LLM)."""
 
@@ -87,6 +129,11 @@ class QuarantinedLlmService(BaseModel):
   agent: LlmAgent
   runner: runners.InMemoryRunner
   pattern: re.Pattern
+  session_pool: session_pool.SessionPool
+  result_cache: qllm_cache.QllmCache | None = None
+  """Cache of the responses, keyed on the query and the labels of its inputs."""
+  agent_loop: asyncio.AbstractEventLoop | None = None
+  """The event loop of the agent, where queries are run if it is set."""
 
   model_config = {"arbitrary_types_allowed": True}
 
@@ -95,6 +142,8 @@ class QuarantinedLlmService(BaseModel):
       model: str | BaseLlm,
       name: str = "QLLM_Service",
       user_id: str = "test_user_id",
+      session_pool_size: int = 8,
+      result_cache: qllm_cache.QllmCache | None = None,
   ):
     agent = LlmAgent(
         model=model,
@@ -116,33 +165,49 @@ class QuarantinedLlmService(BaseModel):
         agent=agent,
         runner=runner,
         pattern=pattern,
+        session_pool=session_pool.SessionPool(
+            runner.session_service, name, user_id, session_pool_size
+        ),
+        result_cache=result_cache,
     )
 
   async def _run_async(
       self, query: str, output_schema: str
   ) -> AsyncGenerator[Event, None]:
-    """Runs a query on the Q-LLM session."""
-
-    qllm_session = await self.runner.session_service.create_session(
-        app_name=self.name, user_id=self.user_id
-    )
+    """Runs a query on a Q-LLM session from the pool."""
 
     qllm_query = f"{query} \n\n output_schema: {output_schema}"
     content = types.Content(role="user", parts=[types.Part(text=qllm_query)])
 
-    async for e in self.runner.run_async(
-        user_id=qllm_session.user_id,  # Session object contains user_id
-        session_id=qllm_session.id,
-        new_message=content,
-    ):
-      yield e
+    async with self.session_pool.session() as session_id:
+      async for e in self.runner.run_async(
+          user_id=self.user_id,
+          session_id=session_id,
+          new_message=content,
+      ):
+        yield e
 
-    await self.runner.session_service.delete_session(
-        app_name=self.name, user_id=self.user_id, session_id=qllm_session.id
-    )
+  def _get_running_agent_loop(self) -> asyncio.AbstractEventLoop | None:
+    """Returns the agent loop if queries can be run on it from this thread."""
+    loop = self.agent_loop
+    if loop is None or loop.is_closed() or not loop.is_running():
+      return None
+    try:
+      if asyncio.get_running_loop() is loop:
+        # Blocking on the loop from its own thread would deadlock.
+        return None
+    except RuntimeError:
+      pass
+    return loop
 
   def run(self, query: str, output_schema: str) -> Iterator[Event]:
-    """Runs the QLLM agent synchronously in a new thread.
+    """Runs the QLLM agent synchronously.
+
+    If the interpreter is run in a worker thread of the agent (see
+    `CaMelInterpreterService.execute_code_async`), the query is run on the
+    agent's event loop, so that concurrent queries (e.g., from the iterations of
+    a comprehension) share the loop. Otherwise, the query is run in a new thread
+    with its own event loop.
 
     NOTE: This sync interface is solely because the CaMeL interpreter is
     synchronous and does not suuport the `await` keyword. The
@@ -152,9 +217,6 @@ class QuarantinedLlmService(BaseModel):
     NOTE: This method is similar to the `run` method in the `runners.Runner`
     class.
 
-    TODO: Later versions of CaMeL should support asynchronous execution and
-    this method will be removed.
-
     Args:
       query: The query to run.
       output_schema: The output schema of the query.
@@ -162,6 +224,17 @@ class QuarantinedLlmService(BaseModel):
     Yields:
       The events generated by the QLLM.
     """
+    loop = self._get_running_agent_loop()
+    if loop is not None:
+
+      async def _collect_events() -> list[Event]:
+        return [e async for e in self._run_async(query, output_schema)]
+
+      yield from asyncio.run_coroutine_threadsafe(
+          _collect_events(), loop
+      ).result()
+      return
+
     event_queue = queue.Queue()
 
     async def _invoke_run_async():
@@ -251,34 +324,52 @@ class QuarantinedLlmService(BaseModel):
       if output_schema not in ["int", "str", "float", "bool"]:
         raise ValueError(f"Unsupported output schema: `{output_schema}`")
 
-      response_parts = []
+      cache_key = None
+      inputs_provenance = _query_inputs_provenance.get()
+      if self.result_cache is not None and inputs_provenance is not None:
+        cache_key = qllm_cache.make_cache_key(
+            query, output_schema, *inputs_provenance
+        )
+      response_text = (
+          self.result_cache.get(cache_key) if cache_key is not None else None
+      )
+      is_cached = response_text is not None
+
+      if not is_cached:
+        response_parts = []
 
-      for e in self.run(
-          query=query,
-          output_schema=output_schema,
-      ):
-        if e.content and self.pattern.fullmatch(e.author):
-          response_parts.extend(e.content.parts)
+        for e in self.run(
+            query=query,
+            output_schema=output_schema,
+        ):
+          if e.content and self.pattern.fullmatch(e.author):
+            response_parts.extend(e.content.parts)
 
-      response_text = "".join(map(utils.sanitized_part, response_parts))
+        response_text = "".join(map(utils.sanitized_part, response_parts))
 
       print(
           f"query_ai_assistant(query='{query}',"
-          f" output_schema='{output_schema}') -> {response_text}",
+          f" output_schema='{output_schema}') ->"
+          f" {response_text}{' (cached)' if is_cached else ''}",
           end="\n\n",
       )
 
       if output_schema == "int":
-        return int_validator(response_text)
+        output = int_validator(response_text)
       elif output_schema == "str":
-        return str(response_text)
+        output = str(response_text)
       elif output_schema == "float":
-        return float_validator(response_text)
+        output = float_validator(response_text)
       elif output_schema == "bool":
-        return bool_validator(response_text)
+        output = bool_validator(response_text)
       else:
         raise ValueError(f"Unsupported output schema: `{output_schema}`")
 
+      # Only responses that could be parsed are cached.
+      if cache_key is not None and not is_cached:
+        self.result_cache.set(cache_key, response_text)
+      return output
+
     return query_ai_assistant
 
 
@@ -299,10 +390,12 @@ class CaMelInterpreterService(BaseModel):
       model: str | BaseLlm,
       tools: list[Tool],
       eval_args: interpreter.EvalArgs,
+      qllm_result_cache: qllm_cache.QllmCache | None = None,
   ):
     quarantined_llm_service = QuarantinedLlmService(
         model=model,
         name="QLLM_Service",
+        result_cache=qllm_result_cache,
     )  # Manages interactions with the QLLM.
 
     classes_to_exclude: frozenset[str] = frozenset(
@@ -319,7 +412,11 @@ class CaMelInterpreterService(BaseModel):
 
     namespace = library.make_builtins_namespace(
         variables={
-            (func_name := f.__name__): CaMeLFunction(
+            (func_name := f.__name__): (
+                QueryAiAssistantFunction
+                if func_name == "query_ai_assistant"
+                else CaMeLFunction
+            )(
                 name=func_name,
                 py_callable=f,
                 capabilities=caps,
@@ -345,15 +442,46 @@ class CaMelInterpreterService(BaseModel):
   def get_classes_to_exclude(self) -> frozenset[str]:
     return self.classes_to_exclude
 
+  async def execute_code_async(
+      self,
+      code: str,
+      tool_calls_chain: Sequence[function_types.FunctionCall],
+      current_dependencies: tuple[Any, ...],
+      verbose: bool = False,
+  ) -> tuple[
+      str,
+      Sequence[function_types.FunctionCall],
+      CaMeLException | None,
+      camel_value.Namespace,
+      tuple[Any, ...],
+  ]:
+    """Interprets the CaMeL code in a worker thread without blocking the loop.
+
+    Queries to the Q-LLM are run on the calling event loop. Without concurrent
+    iterations, the code is interpreted in the calling thread instead.
+    """
+    if self.eval_args.max_concurrent_iterations <= 1:
+      return self.execute_code(
+          code, tool_calls_chain, current_dependencies, verbose
+      )
+    self.quarantined_llm_service.agent_loop = asyncio.get_running_loop()
+    return await asyncio.to_thread(
+        self.execute_code,
+        code,
+        tool_calls_chain,
+        current_dependencies,
+        verbose,
+    )
+
   def execute_code(
       self,
       code: str,
-      tool_calls_chain: list[function_types.FunctionCall],
+      tool_calls_chain: Sequence[function_types.FunctionCall],
       current_dependencies: tuple[Any, ...],
       verbose: bool = False,
   ) -> tuple[
       str,
-      list[function_types.FunctionCall],
+      Sequence[function_types.FunctionCall],
       CaMeLException | None,
       camel_value.Namespace,
       tuple[Any, ...],
@@ -442,7 +570,7 @@ class CaMeLInterpreter(BaseAgent):
     dependencies = ctx.session.state.get("dependencies") or ()
 
     printed_output, ad_tool_calls, error, _, dependencies = (
-        self.camel_interpreter_service.execute_code(
+        await self.camel_interpreter_service.execute_code_async(
             p_llm_code, function_calls, dependencies
         )
     )  # printed_output, ad_tool_calls, error, namespace, dependencies
@@ -508,6 +636,9 @@ class CaMeLAgent(BaseAgent):
       tools: Optional[list[Tool]] = None,
       security_policy_engine: SecurityPolicyEngine = security_policy.NoSecurityPolicyEngine(),
       eval_mode: DependenciesPropagationMode = DependenciesPropagationMode.NORMAL,
+      max_concurrent_iterations: int = 1,
+      qllm_result_cache: qllm_cache.QllmCache | None = None,
+      profiler: profiler_lib.Profiler | None = None,
   ):
 
     camel_interpreter_service = CaMelInterpreterService(
@@ -516,7 +647,10 @@ class CaMeLAgent(BaseAgent):
         eval_args=interpreter.EvalArgs(
             eval_mode=eval_mode,
             security_policy_engine=security_policy_engine,
+            max_concurrent_iterations=max_concurrent_iterations,
+            profiler=profiler,
         ),
+        qllm_result_cache=qllm_result_cache,
     )
     camel_interpreter_agent = CaMeLInterpreter(
         name="CaMeLInterpreter",
@@ -526,13 +660,8 @@ class CaMeLAgent(BaseAgent):
     pllm_agent = LlmAgent(
         name="PLLM",
         model=model,
-        instruction=prompts.generate_camel_system_prompt(
-            list(
-                map(
-                    prompts.make_function,
-                    camel_interpreter_service.get_funcs_for_pllm_prompt(),
-                )
-            ),
+        instruction=prompts.generate_camel_system_prompt_for_tools(
+            tuple(camel_interpreter_service.get_funcs_for_pllm_prompt()),
             camel_interpreter_service.get_classes_to_exclude(),
         ),
         output_key="p_llm_code",
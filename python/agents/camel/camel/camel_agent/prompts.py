@@ -14,12 +14,15 @@
 
 """Pipeline element which generates a system prompt to generate code given the tools."""
 
-from collections.abc import Callable, Iterable, Mapping, MutableMapping, Sequence
+import collections
+from collections.abc import Callable, Hashable, Iterable, Mapping, MutableMapping, Sequence
 import dataclasses
 import enum
+import functools
 import inspect
 import re
 import textwrap
+import threading
 import types
 from typing import Annotated, Any, Concatenate, TypeAlias, get_args, get_origin, get_type_hints
 
@@ -361,11 +364,11 @@ def _get_available_methods_list(
 
 
 def _get_available_classes_list(
-    methods_dict: dict[str, camel_value.CaMeLClass],
+    methods_dict: Mapping[str, Sequence[str]],
     classes_to_exclude: frozenset[str],
 ) -> str:
   return "".join(
-      f"  - `{obj_type}`:\n{''.join(f'    - `{f}`{_NEWLINE}' for f in methods_dict[obj_type].methods)}"
+      f"  - `{obj_type}`:\n{''.join(f'    - `{f}`{_NEWLINE}' for f in methods_dict[obj_type])}"
       for obj_type in methods_dict
       if obj_type not in classes_to_exclude
   )
@@ -424,6 +427,20 @@ While generating the code, follow these rules:
 """
 
 
+@functools.cache
+def _get_built_ins_lists(
+    classes_to_exclude: frozenset[str],
+) -> tuple[str, str, str]:
+  """Returns the lists of built-in functions, methods and classes."""
+  return (
+      _get_available_functions_list(library.BUILT_IN_FUNCTIONS),
+      _get_available_methods_list(camel_value.SUPPORTED_BUILT_IN_METHODS),
+      _get_available_classes_list(
+          library.BUILT_IN_CLASS_METHODS, classes_to_exclude
+      ),
+  )
+
+
 def generate_camel_system_prompt(
     functions: Sequence[function_types.Function],
     classes_to_exclude: frozenset[str] = frozenset(),
@@ -454,6 +471,10 @@ It is absolutely important that you do not assume that the type used for the fie
   else:
     types_note = ""
 
+  built_in_functions_list, built_in_methods_list, built_in_classes_list = (
+      _get_built_ins_lists(classes_to_exclude)
+  )
+
   prompt = f"""\
 You are a helpful assistant that rewrites user requests to structured Python code. You must specify the code within a fenced code block.
 
@@ -483,7 +504,7 @@ The types you can use are:
 ## Built-in functions
 
 You are allowed to use the following built-in functions:
-{_get_available_functions_list(library.BUILT_IN_FUNCTIONS)}
+{built_in_functions_list}
 
 Note that the `type` function returns a string with the type name, rather than the type itself. So you can check if, e.g., something is an `int` \
 with `if type(x) == "int"`.
@@ -491,12 +512,12 @@ with `if type(x) == "int"`.
 ## Built-in methods
 
 For each of the following types you can use the following methods:
-{_get_available_methods_list(camel_value.SUPPORTED_BUILT_IN_METHODS)}
+{built_in_methods_list}
 
 # Imported classes
 
 Moreover, you can assume that the following non-builtin classes are available:
-{_get_available_classes_list(library.BUILT_IN_CLASSES, classes_to_exclude)}
+{built_in_classes_list}
 
 
 ## Tools functions
@@ -513,6 +534,66 @@ Additionally, you have access to the following functions that allow you to use e
   return prompt
 
 
+_SYSTEM_PROMPT_CACHE_SIZE = 32
+_system_prompt_cache: collections.OrderedDict[Hashable, str] = (
+    collections.OrderedDict()
+)
+_system_prompt_cache_lock = threading.Lock()
+
+
+def _tool_key(tool: Callable[..., Any]) -> tuple[str, str, str, str | None]:
+  """Returns what the prompt depends on for `tool`, without the tool itself.
+
+  Tools such as `query_ai_assistant` are closures created for each agent, so
+  they are identified by their name, signature and docstring instead.
+
+  Args:
+    tool: The tool.
+
+  Returns:
+    The key of the tool.
+  """
+  return (
+      tool.__module__,
+      tool.__qualname__,
+      str(inspect.signature(tool)),
+      tool.__doc__,
+  )
+
+
+def generate_camel_system_prompt_for_tools(
+    tools: tuple[Callable[..., Any], ...],
+    classes_to_exclude: frozenset[str] = frozenset(),
+) -> str:
+  """Generates a system prompt for the given tools.
+
+  The prompt is cached, so agents created with tools with the same names,
+  signatures and docstrings don't generate it again. The cache does not keep
+  references to the tools.
+
+  Args:
+    tools: The tools available to the code.
+    classes_to_exclude: The built-in classes to leave out of the prompt.
+
+  Returns:
+    The system prompt.
+  """
+  key = (tuple(map(_tool_key, tools)), classes_to_exclude)
+  with _system_prompt_cache_lock:
+    prompt = _system_prompt_cache.get(key)
+    if prompt is not None:
+      _system_prompt_cache.move_to_end(key)
+      return prompt
+  prompt = generate_camel_system_prompt(
+      [make_function(tool) for tool in tools], classes_to_exclude
+  )
+  with _system_prompt_cache_lock:
+    _system_prompt_cache[key] = prompt
+    while len(_system_prompt_cache) > _SYSTEM_PROMPT_CACHE_SIZE:
+      _system_prompt_cache.popitem(last=False)
+  return prompt
+
+
 parse = docstring_parser.parse
 
 BaseModel = pydantic.BaseModel
@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Caches for the responses of the Quarantined LLM (Q-LLM)."""
+
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import typing
+from typing import Any
+
+from ..camel_library.capabilities import readers
+from ..camel_library.capabilities import sources
+
+
+def make_cache_key(
+    query: str,
+    output_schema: str,
+    inputs_readers: readers.Readers[Any],
+    inputs_sources: frozenset[sources.Source],
+) -> str:
+  """Returns the key of a Q-LLM response in the cache.
+
+  The key includes the readers and sources of the inputs of the query, so that
+  a response is only reused for inputs with the same security labels.
+
+  Args:
+    query: The query sent to the Q-LLM.
+    output_schema: The output schema of the query.
+    inputs_readers: The readers of the inputs of the query.
+    inputs_sources: The sources of the inputs of the query.
+
+  Returns:
+    The hex digest identifying the response.
+  """
+  content = json.dumps([
+      query,
+      output_schema,
+      _canonical_label(inputs_readers),
+      _canonical_label(inputs_sources),
+  ])
+  return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _canonical_label(label: Any) -> Any:
+  """Returns a JSON-serializable form of a security label.
+
+  The iteration order of sets depends on the hash seed of the process, so sets
+  are sorted, and so are the inner sources of tools, for keys to be the same
+  in every process.
+
+  Args:
+    label: The readers or sources, or one of them.
+
+  Returns:
+    The canonical form of `label`.
+  """
+  if isinstance(label, (set, frozenset)):
+    return sorted(
+        (_canonical_label(element) for element in label), key=json.dumps
+    )
+  if isinstance(label, sources.Tool):
+    return [
+        "Tool",
+        label.tool_name,
+        _canonical_label(label.inner_sources),
+    ]
+  return repr(label)
+
+
+@typing.runtime_checkable
+class QllmCache(typing.Protocol):
+  """Protocol for a cache of Q-LLM responses."""
+
+  def get(self, key: str) -> str | None:
+    """Returns the cached response for `key`, or None if there is none."""
+    ...
+
+  def set(self, key: str, response: str) -> None:
+    """Caches `response` for `key`."""
+    ...
+
+
+class InMemoryQllmCache:
+  """Q-LLM cache kept in memory, with least-recently-used eviction.
+
+  Attributes:
+    max_entries: The maximum number of cached responses.
+    ttl_seconds: How long responses are cached for. None means forever.
+  """
+
+  def __init__(self, max_entries: int = 1024, ttl_seconds: float | None = None):
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    self._lock = threading.Lock()
+    self._entries: collections.OrderedDict[str, tuple[str, float | None]] = (
+        collections.OrderedDict()
+    )
+
+  def get(self, key: str) -> str | None:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      response, expires_at = entry
+      if expires_at is not None and expires_at <= time.time():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return response
+
+  def set(self, key: str, response: str) -> None:
+    expires_at = (
+        time.time() + self.ttl_seconds if self.ttl_seconds is not None else None
+    )
+    with self._lock:
+      self._entries[key] = (response, expires_at)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+
+class SqliteQllmCache:
+  """Q-LLM cache stored in a sqlite database, with least-recently-used eviction.
+
+  Attributes:
+    path: The path of the database file.
+    max_entries: The maximum number of cached responses.
+    ttl_seconds: How long responses are cached for. None means forever.
+  """
+
+  def __init__(
+      self,
+      path: str,
+      max_entries: int = 100_000,
+      ttl_seconds: float | None = None,
+  ):
+    self.path = path
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    self._lock = threading.Lock()
+    self._connection = sqlite3.connect(path, check_same_thread=False)
+    with self._lock, self._connection:
+      self._connection.execute(
+          "CREATE TABLE IF NOT EXISTS qllm_cache (key TEXT PRIMARY KEY,"
+          " response TEXT NOT NULL, expires_at REAL, last_used REAL NOT NULL)"
+      )
+      self._connection.execute(
+          "CREATE INDEX IF NOT EXISTS qllm_cache_last_used"
+          " ON qllm_cache (last_used)"
+      )
+
+  def get(self, key: str) -> str | None:
+    now = time.time()
+    with self._lock, self._connection:
+      row = self._connection.execute(
+          "SELECT response, expires_at FROM qllm_cache WHERE key = ?", (key,)
+      ).fetchone()
+      if row is None:
+        return None
+      response, expires_at = row
+      if expires_at is not None and expires_at <= now:
+        self._connection.execute("DELETE FROM qllm_cache WHERE key = ?", (key,))
+        return None
+      self._connection.execute(
+          "UPDATE qllm_cache SET last_used = ? WHERE key = ?", (now, key)
+      )
+      return response
+
+  def set(self, key: str, response: str) -> None:
+    now = time.time()
+    expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+    with self._lock, self._connection:
+      self._connection.execute(
+          "INSERT OR REPLACE INTO qllm_cache VALUES (?, ?, ?, ?)",
+          (key, response, expires_at, now),
+      )
+      self._connection.execute(
+          "DELETE FROM qllm_cache WHERE expires_at IS NOT NULL"
+          " AND expires_at <= ?",
+          (now,),
+      )
+      self._connection.execute(
+          "DELETE FROM qllm_cache WHERE key IN (SELECT key FROM qllm_cache"
+          " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+          (self.max_entries,),
+      )
+
+  def close(self) -> None:
+    with self._lock:
+      self._connection.close()
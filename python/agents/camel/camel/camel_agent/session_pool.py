@@ -0,0 +1,249 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pool of reusable Q-LLM sessions."""
+
+import asyncio
+import collections
+from collections.abc import AsyncIterator
+import contextlib
+import dataclasses
+import threading
+import time
+
+from google.adk.sessions import base_session_service
+from google.adk.sessions import in_memory_session_service
+
+
+@dataclasses.dataclass(frozen=True)
+class SessionPoolMetrics:
+  """Snapshot of the usage of a `SessionPool`."""
+
+  size: int
+  """Maximum number of sessions in the pool."""
+  created: int
+  """Number of sessions currently created."""
+  in_use: int
+  """Number of sessions currently acquired."""
+  waiting: int
+  """Number of queries currently waiting for a session."""
+  acquisitions: int
+  """Total number of acquired sessions."""
+  waits: int
+  """Number of acquisitions that had to wait for a session to be released."""
+  total_wait_seconds: float
+  """Total time spent waiting for a session to be released."""
+  max_wait_seconds: float
+  """Longest time spent waiting for a session to be released."""
+  utilization: float
+  """Average fraction of the pool in use since the pool was created."""
+
+
+class SessionPool:
+  """A bounded pool of sessions that are reset instead of deleted after use.
+
+  Sessions are created on demand, up to `size`. When all of them are in use,
+  `acquire` waits until one is released. Released sessions have their events
+  and state cleared, so a query never sees the history of a previous one. A
+  session that can't be reset is deleted instead of being returned to the pool.
+
+  The pool can be used concurrently from multiple threads and event loops.
+  """
+
+  def __init__(
+      self,
+      session_service: base_session_service.BaseSessionService,
+      app_name: str,
+      user_id: str,
+      size: int,
+  ):
+    if size < 1:
+      raise ValueError(f"The pool size must be at least 1, got {size}.")
+    self._session_service = session_service
+    self._app_name = app_name
+    self._user_id = user_id
+    self._size = size
+    self._lock = threading.Lock()
+    self._idle: collections.deque[str] = collections.deque()
+    self._waiters: collections.deque[
+        tuple[asyncio.AbstractEventLoop, asyncio.Future[str]]
+    ] = collections.deque()
+    self._created = 0
+    self._in_use = 0
+    self._acquisitions = 0
+    self._waits = 0
+    self._total_wait_seconds = 0.0
+    self._max_wait_seconds = 0.0
+    self._start_time = time.monotonic()
+    self._last_change_time = self._start_time
+    self._busy_seconds = 0.0
+
+  @contextlib.asynccontextmanager
+  async def session(self) -> AsyncIterator[str]:
+    """Acquires a session for the duration of the context and yields its id."""
+    session_id = await self.acquire()
+    try:
+      yield session_id
+    finally:
+      await self.release(session_id)
+
+  async def acquire(self) -> str:
+    """Returns the id of a free session, waiting for one if needed."""
+    with self._lock:
+      if self._idle:
+        self._mark_acquired(0.0)
+        return self._idle.popleft()
+      if self._created < self._size:
+        self._created += 1
+        self._mark_acquired(0.0)
+        future = None
+      else:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append((loop, future))
+        wait_start = time.monotonic()
+
+    if future is None:
+      try:
+        session = await self._session_service.create_session(
+            app_name=self._app_name, user_id=self._user_id
+        )
+      except BaseException:
+        with self._lock:
+          self._created -= 1
+          self._mark_released()
+        raise
+      return session.id
+
+    try:
+      session_id = await future
+    except asyncio.CancelledError:
+      with self._lock:
+        if (loop, future) in self._waiters:
+          self._waiters.remove((loop, future))
+      if future.done() and not future.cancelled():
+        # The session was handed over right before the cancellation.
+        with self._lock:
+          self._mark_acquired(time.monotonic() - wait_start)
+        await self.release(future.result())
+      raise
+    with self._lock:
+      self._mark_acquired(time.monotonic() - wait_start)
+    return session_id
+
+  async def release(self, session_id: str) -> None:
+    """Resets the session and makes it available to other queries."""
+    try:
+      await self._reset(session_id)
+    except Exception:  # pylint: disable=broad-except
+      # Never hand over a session that may still contain a previous query.
+      with self._lock:
+        self._created -= 1
+        self._mark_released()
+      with contextlib.suppress(Exception):
+        await self._session_service.delete_session(
+            app_name=self._app_name,
+            user_id=self._user_id,
+            session_id=session_id,
+        )
+      return
+    with self._lock:
+      self._mark_released()
+      self._hand_over(session_id)
+
+  def metrics(self) -> SessionPoolMetrics:
+    """Returns a snapshot of the usage of the pool."""
+    with self._lock:
+      self._update_busy_seconds()
+      elapsed = self._last_change_time - self._start_time
+      return SessionPoolMetrics(
+          size=self._size,
+          created=self._created,
+          in_use=self._in_use,
+          waiting=len(self._waiters),
+          acquisitions=self._acquisitions,
+          waits=self._waits,
+          total_wait_seconds=self._total_wait_seconds,
+          max_wait_seconds=self._max_wait_seconds,
+          utilization=(
+              self._busy_seconds / (self._size * elapsed) if elapsed else 0.0
+          ),
+      )
+
+  async def _reset(self, session_id: str) -> None:
+    """Clears the events and the state of the session."""
+    if isinstance(
+        self._session_service, in_memory_session_service.InMemorySessionService
+    ):
+      session = self._session_service.sessions[self._app_name][self._user_id][
+          session_id
+      ]
+      session.events.clear()
+      session.state.clear()
+      return
+    # Other services don't allow clearing a session, so it is re-created with
+    # the same id.
+    await self._session_service.delete_session(
+        app_name=self._app_name, user_id=self._user_id, session_id=session_id
+    )
+    await self._session_service.create_session(
+        app_name=self._app_name, user_id=self._user_id, session_id=session_id
+    )
+
+  def _hand_over(self, session_id: str) -> None:
+    """Gives the session to the first waiter, or makes it idle.
+
+    Must be called with the lock held.
+
+    Args:
+      session_id: The id of the released session.
+    """
+    while self._waiters:
+      loop, future = self._waiters.popleft()
+      # The session is in use again until the waiter receives it (or gives it
+      # back if it was cancelled in the meantime).
+      self._in_use += 1
+      try:
+        loop.call_soon_threadsafe(self._deliver, future, session_id)
+      except RuntimeError:  # The loop of the waiter is closed.
+        self._in_use -= 1
+        continue
+      return
+    self._idle.append(session_id)
+
+  def _deliver(self, future: asyncio.Future[str], session_id: str) -> None:
+    with self._lock:
+      self._in_use -= 1
+      if not future.done():
+        future.set_result(session_id)
+        return
+      self._hand_over(session_id)
+
+  def _mark_acquired(self, wait_seconds: float) -> None:
+    self._update_busy_seconds()
+    self._in_use += 1
+    self._acquisitions += 1
+    if wait_seconds:
+      self._waits += 1
+      self._total_wait_seconds += wait_seconds
+      self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+  def _mark_released(self) -> None:
+    self._update_busy_seconds()
+    self._in_use -= 1
+
+  def _update_busy_seconds(self) -> None:
+    now = time.monotonic()
+    self._busy_seconds += self._in_use * (now - self._last_change_time)
+    self._last_change_time = now
@@ -19,6 +19,7 @@ from collections.abc import Iterable
 from google.genai import types
 
 from ..camel_library import function_types
+from ..camel_library.interpreter import tool_calls_chain
 
 
 FunctionCall = function_types.FunctionCall
@@ -57,9 +58,13 @@ def extract_print_output(
 ) -> str:
   """Extracts and concatenates arguments from print calls."""
 
-  printed_output = ""
-  print_calls = [tc for tc in tool_calls if tc.function == "print"]
-  for print_call in print_calls:
-    for arg_value in print_call.args.values():
-      printed_output += str(arg_value)
-  return printed_output
+  if isinstance(tool_calls, tool_calls_chain.ToolCallsChain):
+    # The chain keeps an index of its print calls.
+    print_calls = tool_calls.print_calls()
+  else:
+    print_calls = [tc for tc in tool_calls if tc.function == "print"]
+  return "".join(
+      str(arg_value)
+      for print_call in print_calls
+      for arg_value in print_call.args.values()
+  )
@@ -14,32 +14,65 @@
 
 """Module containing definitions for the capabilities in CaMeL."""
 
+from collections.abc import Mapping
 import dataclasses
+import types
 from typing import Any, Self
 
 from . import readers
 from . import sources
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Capabilities:
-  """Capabilities for a value."""
+  """Capabilities for a value.
+
+  The capabilities returned by `default` and `camel` are shared by all the
+  values created with them. They cannot be modified: `other_metadata` is a
+  read-only copy of the mapping it is created with.
+  """
 
   sources_set: frozenset[sources.Source]
   readers_set: readers.Readers[Any]
-  other_metadata: dict[str, Any] = dataclasses.field(default_factory=dict)
+  other_metadata: Mapping[str, Any] = dataclasses.field(default_factory=dict)
+  _hash: int | None = dataclasses.field(
+      default=None, init=False, repr=False, compare=False
+  )
 
-  def __hash__(self) -> int:
+  def __post_init__(self) -> None:
+    object.__setattr__(
+        self, "other_metadata", types.MappingProxyType(dict(self.other_metadata))
+    )
+
+  def __reduce__(self) -> tuple[Any, ...]:
+    # The read-only `other_metadata` cannot be pickled (nor `copy.deepcopy`-ed).
     return (
-        hash(self.sources_set)
-        ^ hash(self.readers_set)
-        ^ hash(tuple(self.other_metadata.items()))
+        Capabilities,
+        (self.sources_set, self.readers_set, dict(self.other_metadata)),
     )
 
+  def __hash__(self) -> int:
+    # Capabilities are hashed whenever values are, so the hash is cached.
+    if self._hash is None:
+      object.__setattr__(
+          self,
+          "_hash",
+          hash(self.sources_set)
+          ^ hash(self.readers_set)
+          ^ hash(tuple(self.other_metadata.items())),
+      )
+    return self._hash
+
   @classmethod
   def default(cls) -> Self:
-    return cls(frozenset({sources.SourceEnum.USER}), readers.Public())
+    del cls  # Unused, the capabilities are shared.
+    return _DEFAULT
 
   @classmethod
   def camel(cls) -> Self:
-    return cls(frozenset({sources.SourceEnum.CAMEL}), readers.Public())
+    del cls  # Unused, the capabilities are shared.
+    return _CAMEL
+
+
+_DEFAULT = Capabilities(frozenset({sources.SourceEnum.USER}), readers.Public())
+_CAMEL = Capabilities(frozenset({sources.SourceEnum.CAMEL}), readers.Public())
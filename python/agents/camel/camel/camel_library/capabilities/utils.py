@@ -33,6 +33,153 @@ class HasDependenciesAndCapabilities(Protocol):
     ...
 
 
+class _CircularDependencyError(Exception):
+  """Raised when the dependency graph of a value contains a cycle."""
+
+
+def _cached_summary(
+    value: HasDependenciesAndCapabilities, current_mutation_count: int
+) -> camel_value.ProvenanceSummary | None:
+  summary = getattr(value, "_provenance_summary", None)
+  if summary is None or summary.mutation_count != current_mutation_count:
+    return None
+  return summary
+
+
+def _summarize_acyclic(
+    value: HasDependenciesAndCapabilities,
+) -> camel_value.ProvenanceSummary:
+  """Summarizes readers and sources of `value` with a post-order traversal.
+
+  The summary of every traversed value is cached on the value itself, so
+  later summaries only need to look at the direct dependencies of new values.
+
+  Args:
+    value: The value to summarize.
+
+  Returns:
+    The summary of `value`.
+
+  Raises:
+    _CircularDependencyError: if the dependency graph contains a cycle, in
+      which case the summaries of the values on the cycle are not cached.
+  """
+  current_mutation_count = camel_value.mutation_count()
+  # Each frame holds the value, an iterator over its dependencies, and the
+  # readers and sources accumulated so far.
+  stack: list[list[Any]] = []
+  in_progress: set[int] = set()
+
+  def push(v: HasDependenciesAndCapabilities) -> None:
+    v_capabilities = v.capabilities
+    assert v_capabilities is not None
+    stack.append([
+        v,
+        iter(v.get_dependencies()[0]),
+        v_capabilities.readers_set,
+        v_capabilities.sources_set,
+    ])
+    in_progress.add(id(v))
+
+  push(value)
+  while True:
+    frame = stack[-1]
+    for dependency in frame[1]:
+      if isinstance(dependency, readers.Public):
+        continue
+      if dependency.capabilities is None:
+        frame[2] &= frozenset()
+        continue
+      summary = _cached_summary(dependency, current_mutation_count)
+      if summary is not None:
+        frame[2] &= summary.readers
+        frame[3] |= summary.sources
+        continue
+      if id(dependency) in in_progress:
+        raise _CircularDependencyError()
+      push(dependency)
+      break
+    else:
+      stack.pop()
+      in_progress.discard(id(frame[0]))
+      summary = camel_value.ProvenanceSummary(
+          frame[2], frame[3], current_mutation_count
+      )
+      # Only `Value`s have room for the cached summary.
+      if hasattr(type(frame[0]), "_provenance_summary"):
+        frame[0]._provenance_summary = summary  # pylint: disable=protected-access
+      if not stack:
+        return summary
+      stack[-1][2] &= summary.readers
+      stack[-1][3] |= summary.sources
+
+
+def _summarize_reachable(
+    value: HasDependenciesAndCapabilities,
+) -> camel_value.ProvenanceSummary:
+  """Summarizes readers and sources of all the values reachable from `value`.
+
+  This works on arbitrary (also cyclic) dependency graphs, but does not cache
+  anything.
+
+  Args:
+    value: The value to summarize.
+
+  Returns:
+    The summary of `value`.
+  """
+  value_readers: readers.Readers[Any] = readers.Public()
+  value_sources: frozenset[sources.Source] = frozenset()
+  visited_objects = {id(value)}
+  to_visit = [value]
+  while to_visit:
+    current = to_visit.pop()
+    current_capabilities = current.capabilities
+    if current_capabilities is None:
+      value_readers &= frozenset()
+      continue
+    value_readers &= current_capabilities.readers_set
+    value_sources |= current_capabilities.sources_set
+    for dependency in current.get_dependencies()[0]:
+      if isinstance(dependency, readers.Public):
+        continue
+      if id(dependency) not in visited_objects:
+        visited_objects.add(id(dependency))
+        to_visit.append(dependency)
+  return camel_value.ProvenanceSummary(
+      value_readers, value_sources, camel_value.mutation_count()
+  )
+
+
+def get_provenance_summary(
+    value: HasDependenciesAndCapabilities,
+) -> camel_value.ProvenanceSummary:
+  """Returns the readers and sources of a value and of all its dependencies.
+
+  Summaries are cached on the values and invalidated whenever any value is
+  mutated in place, so checking a new value only requires looking at its
+  direct dependencies. Dependencies are traversed iteratively, so deep
+  dependency chains do not hit the recursion limit.
+
+  Args:
+    value: The value to summarize.
+
+  Returns:
+    The summary of `value`.
+  """
+  if value.capabilities is None:
+    return camel_value.ProvenanceSummary(
+        frozenset(), frozenset(), camel_value.mutation_count()
+    )
+  summary = _cached_summary(value, camel_value.mutation_count())
+  if summary is not None:
+    return summary
+  try:
+    return _summarize_acyclic(value)
+  except _CircularDependencyError:
+    return _summarize_reachable(value)
+
+
 def get_all_readers(
     value: HasDependenciesAndCapabilities,
     visited_objects: frozenset[int] = frozenset(),
@@ -41,27 +188,14 @@ def get_all_readers(
 
   Args:
     value: The value to get the readers for.
-    visited_objects: The set of visited objects to avoid circular dependencies.
+    visited_objects: The set of already visited objects. Circular dependencies
+      are handled by `get_provenance_summary`, so this is only extended with
+      the id of `value`.
 
   Returns:
     A tuple containing the set of readers and the set of visited objects.
   """
-  value_capabilities = value.capabilities
-  if value_capabilities is None:
-    return frozenset(), frozenset()
-  value_readers = value_capabilities.readers_set
-  if id(value) in visited_objects:
-    # Catch circular dependencies.
-    return value_readers, visited_objects
-  for dependency in value.get_dependencies()[0]:
-    if dependency == readers.Public():
-      continue
-    new_value_readers, visited_objects = get_all_readers(
-        dependency, visited_objects | {id(value)}
-    )
-    if new_value_readers is not None:
-      value_readers &= new_value_readers
-  return value_readers, visited_objects | {id(value)}
+  return get_provenance_summary(value).readers, visited_objects | {id(value)}
 
 
 def is_public(value: HasDependenciesAndCapabilities):
@@ -89,24 +223,14 @@ def get_all_sources(
 
   Args:
     value: The value to get the sources for.
-    visited_objects: The set of visited objects to avoid circular dependencies.
+    visited_objects: The set of already visited objects. Circular dependencies
+      are handled by `get_provenance_summary`, so this is only extended with
+      the id of `value`.
 
   Returns:
     A tuple containing the set of sources and the set of visited objects.
   """
-  value_capabilities = value.capabilities
-  if value_capabilities is None:
-    return frozenset(), frozenset()
-  value_sources = value_capabilities.sources_set
-  # Catch circular dependencies.
-  if id(value) in visited_objects:
-    return value_sources, visited_objects
-  for dependency in value.get_dependencies()[0]:
-    new_value_sources, visited_objects = get_all_sources(
-        dependency, visited_objects | {id(value)}
-    )
-    value_sources |= new_value_sources
-  return value_sources, visited_objects
+  return get_provenance_summary(value).sources, visited_objects | {id(value)}
 
 
 _TRUSTED_SET = frozenset({
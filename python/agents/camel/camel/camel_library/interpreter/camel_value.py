@@ -15,12 +15,17 @@
 """CaMeL values."""
 
 import ast
+import bisect
+import collections
 from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping, MutableSequence, Sequence
 import copy
 import dataclasses
 import enum
+import functools
+import itertools
+import threading
 import types
-from typing import Any, Generic, Protocol, Self, TypeVar, runtime_checkable
+from typing import Any, Generic, NamedTuple, Protocol, Self, TypeVar, runtime_checkable
 
 import pydantic
 
@@ -29,16 +34,81 @@ from ..capabilities import readers
 from ..capabilities import sources
 
 
+_mutation_count = 0
+# Values can be mutated by concurrent comprehension iterations.
+_mutation_count_lock = threading.Lock()
+
+
+def mutation_count() -> int:
+  """Returns how many times a value has been mutated in place so far.
+
+  Cached provenance summaries are only valid as long as this number has not
+  changed since they were computed, as an in-place mutation can change the
+  dependencies of any value that (transitively) depends on the mutated one.
+  Caches must read this number before computing what they cache, so that a
+  mutation made in the meantime by another thread invalidates them.
+  """
+  return _mutation_count
+
+
+def _record_mutation() -> None:
+  global _mutation_count
+  with _mutation_count_lock:
+    _mutation_count += 1
+
+
+class ProvenanceSummary(NamedTuple):
+  """Readers and sources of a value and all of its transitive dependencies."""
+
+  readers: readers.Readers[Any]
+  sources: frozenset[sources.Source]
+  mutation_count: int
+
+
 @dataclasses.dataclass(frozen=True)
 class Namespace:
-  """A namespace for variables in CaMeL."""
+  """A namespace for variables in CaMeL.
 
-  variables: dict[str, "Value"] = dataclasses.field(default_factory=dict)
+  Variables are stored in a chain of layers (e.g., the variables defined by the
+  code, the tools, and the built-ins). Only the first layer is copied when a
+  variable is added, so the other layers are shared across namespaces instead
+  of being copied on every assignment.
+  """
 
-  def add_variables(self, variables: dict[str, "Value"]) -> Self:
+  variables: collections.ChainMap[str, "Value"] = dataclasses.field(
+      default_factory=collections.ChainMap
+  )
+
+  def __post_init__(self):
+    if not isinstance(self.variables, collections.ChainMap):
+      object.__setattr__(
+          self, "variables", collections.ChainMap(dict(self.variables))
+      )
+
+  def add_variables(self, variables: Mapping[str, "Value"]) -> Self:
     """Creates a copy of this adding the variables passed as argument."""
     return dataclasses.replace(self, variables=self.variables | variables)
 
+  def without_variable(self, name: str) -> Self:
+    """Creates a copy of this without the variable `name`."""
+    return dataclasses.replace(
+        self,
+        variables=collections.ChainMap(*(
+            {k: v for k, v in layer.items() if k != name}
+            if name in layer
+            else layer
+            for layer in self.variables.maps
+        )),
+    )
+
+  def new_scope(self) -> Self:
+    """Creates a copy of this where new variables go in a new, empty layer."""
+    return dataclasses.replace(self, variables=self.variables.new_child())
+
+  def scope_variables(self) -> Mapping[str, "Value"]:
+    """Returns the variables in the first layer, e.g. set in a `new_scope`."""
+    return self.variables.maps[0]
+
   def set_variable(self, name: str, value: "Value") -> None:
     self.variables[name] = value
 
@@ -53,10 +123,19 @@ _T = TypeVar("_T", bound=Any)
 class Value(Generic[_T], Protocol):
   """A value in CaMeL."""
 
+  __slots__ = (
+      "python_value",
+      "_capabilities",
+      "outer_dependencies",
+      "_provenance_summary",
+  )
+
   python_value: _T
   _capabilities: camel_capabilities.Capabilities
   outer_dependencies: tuple["Value", ...]
   is_builtin: bool = False
+  # Cached by `get_provenance_summary`, `None` until it is computed.
+  _provenance_summary: ProvenanceSummary | None
 
   def __repr__(self) -> str:
     return self._repr_helper(indent_level=0)
@@ -93,20 +172,23 @@ class Value(Generic[_T], Protocol):
     )
 
   def new_with_python_value(self, value: _T) -> Self:
-    new_self = copy.copy(self)
+    new_self = _shallow_copy(self)
     new_self.python_value = value
+    new_self._provenance_summary = None
     return new_self
 
   def new_with_dependencies(self, dependencies: tuple["Value", ...]) -> Self:
-    new_self = copy.copy(self)
+    new_self = _shallow_copy(self)
     new_self.outer_dependencies = self.outer_dependencies + dependencies
+    new_self._provenance_summary = None
     return new_self
 
   def new_with_capabilities(
       self, capabilities: camel_capabilities.Capabilities
   ) -> Self:
-    new_self = copy.copy(self)
+    new_self = _shallow_copy(self)
     new_self._capabilities = capabilities
+    new_self._provenance_summary = None
     return new_self
 
   @property
@@ -183,11 +265,55 @@ class Value(Generic[_T], Protocol):
     )
 
 
+_V = TypeVar("_V", bound=Value)
+
+
+@functools.cache
+def _slot_names(cls: type[Value]) -> tuple[str, ...]:
+  """Returns the names of the instance attributes of `cls` kept in slots."""
+  names = []
+  for klass in cls.__mro__:
+    for name in klass.__dict__.get("__slots__", ()):
+      # Skip slots hidden by class attributes, e.g. `CaMeLNone.python_value`.
+      if isinstance(getattr(cls, name, None), types.MemberDescriptorType):
+        names.append(name)
+  return tuple(names)
+
+
+_UNSET = object()
+
+
+def _shallow_copy(value: _V) -> _V:
+  """Returns a copy of `value` sharing its attributes, like `copy.copy`.
+
+  This is much faster than `copy.copy`, which goes through the pickle
+  protocol, and skips attributes that are not set.
+
+  Args:
+    value: The value to copy.
+
+  Returns:
+    The copy.
+  """
+  cls = type(value)
+  new_value = object.__new__(cls)
+  for name in _slot_names(cls):
+    attribute = getattr(value, name, _UNSET)
+    if attribute is not _UNSET:
+      object.__setattr__(new_value, name, attribute)
+  # Subclasses defined elsewhere may not use slots.
+  attributes = getattr(value, "__dict__", None)
+  if attributes:
+    new_value.__dict__.update(attributes)
+  return new_value
+
+
 _RT = TypeVar("_RT", bound=Value)
 
 
 @runtime_checkable
 class SupportsAdd(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def add(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -195,6 +321,7 @@ class SupportsAdd(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsSub(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def sub(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -202,6 +329,7 @@ class SupportsSub(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsMult(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def mult(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -209,6 +337,7 @@ class SupportsMult(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsTrueDiv(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def truediv(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -216,6 +345,7 @@ class SupportsTrueDiv(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsFloorDiv(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def floor_div(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -223,6 +353,7 @@ class SupportsFloorDiv(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsMod(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def mod(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -230,6 +361,7 @@ class SupportsMod(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsPow(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def pow(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -237,6 +369,7 @@ class SupportsPow(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsLShift(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def l_shift(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -244,6 +377,7 @@ class SupportsLShift(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRShift(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_shift(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -251,6 +385,7 @@ class SupportsRShift(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsBitOr(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def bit_or(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -258,6 +393,7 @@ class SupportsBitOr(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsBitXor(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def bit_xor(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -265,6 +401,7 @@ class SupportsBitXor(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsBitAnd(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def bit_and(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -272,6 +409,7 @@ class SupportsBitAnd(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRAdd(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_add(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -279,6 +417,7 @@ class SupportsRAdd(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRSub(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_sub(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -286,6 +425,7 @@ class SupportsRSub(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRMult(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_mult(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -293,6 +433,7 @@ class SupportsRMult(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRTrueDiv(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_truediv(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -300,6 +441,7 @@ class SupportsRTrueDiv(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRFloorDiv(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_floor_div(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -307,6 +449,7 @@ class SupportsRFloorDiv(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRMod(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_mod(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -314,6 +457,7 @@ class SupportsRMod(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRPow(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_pow(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -321,6 +465,7 @@ class SupportsRPow(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRLShift(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_l_shift(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -328,6 +473,7 @@ class SupportsRLShift(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRRShift(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_r_shift(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -335,6 +481,7 @@ class SupportsRRShift(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRBitOr(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_bit_or(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -342,6 +489,7 @@ class SupportsRBitOr(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRBitXor(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_bit_xor(self, other: Value) -> _RT | types.NotImplementedType:
     ...
@@ -349,14 +497,12 @@ class SupportsRBitXor(Generic[_RT], Protocol):
 
 @runtime_checkable
 class SupportsRBitAnd(Generic[_RT], Protocol):
+  __slots__ = ()
 
   def r_bit_and(self, other: Value) -> _RT | types.NotImplementedType:
     ...
 
 
-_V = TypeVar("_V", bound=Value)
-
-
 def is_value(obj: Any) -> bool:
   return isinstance(obj, Value)
 
@@ -374,6 +520,7 @@ _CT = TypeVar("_CT", bound=PythonComparable)
 
 
 class TotallyOrdered(Value[_CT]):
+  __slots__ = ()
 
   def cmp(self, y: Self) -> "CaMeLInt":
     if self.raw > y.raw:
@@ -385,6 +532,7 @@ class TotallyOrdered(Value[_CT]):
 
 @runtime_checkable
 class HasAttrs(Generic[_T], Value[_T], Protocol):
+  __slots__ = ()
 
   def attr(self, name: str) -> Value | None:
     ...
@@ -395,6 +543,7 @@ class HasAttrs(Generic[_T], Value[_T], Protocol):
 
 @runtime_checkable
 class HasSetField(Generic[_T], HasAttrs[_T], Protocol):
+  __slots__ = ()
 
   def set_field(self, name: str, value: Value) -> "CaMeLNone":
     ...
@@ -408,11 +557,13 @@ class FunctionCallWithSideEffectError(Exception):
 class CaMeLCallable(Generic[_T], Value[Callable[..., _T]], Protocol):
   """Represents a callable value in CaMeL."""
 
+  __slots__ = ("_name", "_recv", "_bound_python_value")
+
   python_value: Callable[..., _T]
   _capabilities: camel_capabilities.Capabilities
   _name: str
   _recv: Value | None
-  _bound_python_value: Callable[..., _T] | None = None
+  _bound_python_value: Callable[..., _T] | None
   is_class_method: bool = False
 
   def name(self) -> "CaMeLStr":
@@ -516,6 +667,11 @@ _IT = TypeVar("_IT", bound=Iterable)
 class CaMeLIterable(Generic[_IT, _V], Value[_IT]):
   """Represents an iterable value in CaMeL."""
 
+  __slots__ = ("_equality_index",)
+
+  # Built by `_find_equal_element`, `None` until it is needed.
+  _equality_index: "_EqualityIndex | None"
+
   def get_dependencies(
       self, visited_objects: frozenset[int] = frozenset()
   ) -> tuple[tuple["Value", ...], frozenset[int]]:
@@ -550,9 +706,7 @@ class CaMeLIterable(Generic[_IT, _V], Value[_IT]):
     return iter(self.python_value)
 
   def contains(self, other: Value) -> "CaMeLBool":
-    inner_element = next(
-        (el for el in self.iterate_python() if el.eq(other)), None
-    )
+    inner_element = _find_equal_element(self, other)
     if inner_element is not None:
       return CaMeLTrue(
           camel_capabilities.Capabilities.camel(), (self, other, inner_element)
@@ -571,6 +725,8 @@ _ST = TypeVar("_ST", bound=Sequence[Value])
 class CaMeLSequence(Generic[_ST, _V], CaMeLIterable[_ST, _V]):
   """Represents a sequence value in CaMeL."""
 
+  __slots__ = ()
+
   python_value: _ST
 
   def index(self, index: "CaMeLInt") -> _V:
@@ -602,14 +758,19 @@ _MCT = TypeVar("_MCT", bound=MutableSequence[Value])
 class CaMeLMutableSequence(Generic[_MCT, _V], CaMeLSequence[_MCT, _V]):
   """Represents a mutable sequence value in CaMeL."""
 
+  __slots__ = ()
+
   def set_index(self, index: "CaMeLInt", value: _V) -> "CaMeLNone":
     self.python_value[index.raw] = value
+    _record_mutation()
     return CaMeLNone(camel_capabilities.Capabilities.camel(), (self, index))
 
 
 class CaMeLIterator(Generic[_V], Value[Iterator[_V]]):
   """Represents an iterator value in CaMeL."""
 
+  __slots__ = ()
+
   def freeze(self) -> "CaMeLNone":
     return CaMeLNone(
         camel_capabilities.Capabilities.camel(), (self,)
@@ -624,6 +785,7 @@ class CaMeLIterator(Generic[_V], Value[Iterator[_V]]):
     self.python_value = iterator
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
   def next(self) -> _V:
     return next(self.python_value)
@@ -637,6 +799,11 @@ _VV = TypeVar("_VV", bound=Value)
 class CaMeLMapping(Generic[_MT, _KV, _VV], Value[_MT]):
   """Represents a mapping value in CaMeL."""
 
+  __slots__ = ("_equality_index",)
+
+  # Built by `_find_equal_element`, `None` until it is needed.
+  _equality_index: "_EqualityIndex | None"
+
   def get_dependencies(
       self, visited_objects: frozenset[int] = frozenset()
   ) -> tuple[tuple["Value", ...], frozenset[int]]:
@@ -652,7 +819,7 @@ class CaMeLMapping(Generic[_MT, _KV, _VV], Value[_MT]):
     return dependencies, visited_objects
 
   def get(self, key: _KV) -> _VV:
-    dict_key = next((el for el in self.iterate_python() if el.eq(key)), None)
+    dict_key = _find_equal_element(self, key)
     if dict_key is None:
       raise KeyError(key)
     return self.python_value[dict_key].new_with_dependencies((self, key))
@@ -701,9 +868,7 @@ class CaMeLMapping(Generic[_MT, _KV, _VV], Value[_MT]):
         A CaMeLBool indicating whether the mapping contains the value.
     """
     dependencies = [self, other]
-    inner_element = next(
-        (el for el in self.iterate_python() if el.eq(other)), None
-    )
+    inner_element = _find_equal_element(self, other)
     if inner_element is not None:
       return CaMeLTrue(
           camel_capabilities.Capabilities.camel(),
@@ -726,6 +891,8 @@ class CaMeLMutableMapping(
 ):
   """Represents a mutable mapping value in CaMeL."""
 
+  __slots__ = ()
+
   python_value: _MMT
 
   def set_key(self, key: _KV, value: _VV) -> "CaMeLNone":
@@ -750,12 +917,15 @@ class CaMeLMutableMapping(
     else:
       new_dict_key = dict_key
     self.python_value[new_dict_key] = value
+    _record_mutation()
     return CaMeLNone(camel_capabilities.Capabilities.camel(), (self,))
 
 
 class CaMeLNone(Value[None]):
   """Represents the None value in CaMeL."""
 
+  __slots__ = ()
+
   python_value = None
 
   def __init__(
@@ -765,6 +935,7 @@ class CaMeLNone(Value[None]):
   ) -> None:
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
   def freeze(self) -> "CaMeLNone":
     return self
@@ -773,6 +944,8 @@ class CaMeLNone(Value[None]):
 class _Bool(TotallyOrdered[bool]):
   """Base class for CaMeL boolean values."""
 
+  __slots__ = ()
+
   python_value: bool
 
   def __bool__(self):
@@ -785,16 +958,21 @@ class _Bool(TotallyOrdered[bool]):
   ) -> None:
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
   def freeze(self) -> CaMeLNone:
     return CaMeLNone(camel_capabilities.Capabilities.camel(), (self,))
 
 
 class CaMeLTrue(_Bool):  # noqa: N801
+  __slots__ = ()
+
   python_value = True
 
 
 class CaMeLFalse(_Bool):  # noqa: N801
+  __slots__ = ()
+
   python_value = False
 
 
@@ -803,6 +981,7 @@ CaMeLBool = CaMeLTrue | CaMeLFalse
 
 @runtime_checkable
 class HasUnary(Protocol):
+  __slots__ = ()
 
   def unary(self, op: ast.unaryop) -> Self | types.NotImplementedType:
     ...
@@ -828,6 +1007,8 @@ class CaMeLFloat(
 ):
   """Represents a floating point number in CaMeL."""
 
+  __slots__ = ()
+
   def __init__(
       self,
       val: float,
@@ -837,6 +1018,7 @@ class CaMeLFloat(
     self.python_value = val
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
   def freeze(self) -> CaMeLNone:
     return CaMeLNone(self._capabilities, (self, *self.outer_dependencies))
@@ -1000,6 +1182,8 @@ class CaMeLInt(
 ):
   """Represents an integer value in CaMeL."""
 
+  __slots__ = ()
+
   def __init__(
       self,
       val: int,
@@ -1009,6 +1193,7 @@ class CaMeLInt(
     self.python_value = val
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
   def freeze(self) -> CaMeLNone:
     return CaMeLNone(camel_capabilities.Capabilities.camel(), (self,))
@@ -1134,8 +1319,10 @@ class CaMeLInt(
     )
 
 
-class _Char(TotallyOrdered[str]):
-  """Represents a single character in CaMeL."""
+class _CharRun(Value[str]):
+  """Represents a run of characters of a string sharing the same provenance."""
+
+  __slots__ = ()
 
   def __init__(
       self,
@@ -1146,16 +1333,16 @@ class _Char(TotallyOrdered[str]):
     self.python_value = val
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
 
-  def __gt__(self, other) -> bool:
-    if not isinstance(other, _Char):
-      return NotImplemented
-    return self.python_value > other.python_value
-
-  def __lt__(self, other) -> bool:
-    if not isinstance(other, _Char):
-      return NotImplemented
-    return self.python_value < other.python_value
+  def has_same_provenance(self, other: "_CharRun") -> bool:
+    return (
+        self._capabilities is other._capabilities
+        or self._capabilities == other._capabilities
+    ) and (
+        self.outer_dependencies is other.outer_dependencies
+        or self.outer_dependencies == other.outer_dependencies
+    )
 
   def freeze(self) -> CaMeLNone:
     return CaMeLNone(
@@ -1163,28 +1350,114 @@ class _Char(TotallyOrdered[str]):
     )  # already immutable
 
 
+def _merge_runs(runs: Iterable[_CharRun]) -> tuple[_CharRun, ...]:
+  """Drops empty runs and merges adjacent runs with the same provenance."""
+  groups: list[list[_CharRun]] = []
+  for run in runs:
+    if not run.python_value:
+      continue
+    if groups and groups[-1][0].has_same_provenance(run):
+      groups[-1].append(run)
+    else:
+      groups.append([run])
+  return tuple(
+      group[0]
+      if len(group) == 1
+      else _CharRun(
+          "".join(run.python_value for run in group),
+          group[0]._capabilities,
+          group[0].outer_dependencies,
+      )
+      for group in groups
+  )
+
+
 class CaMeLStr(
-    TotallyOrdered[tuple[_Char, ...]],
+    TotallyOrdered[str],
     HasAttrs,
-    CaMeLSequence[tuple[_Char, ...], _Char],
+    CaMeLSequence[str, "CaMeLStr"],
     SupportsAdd["CaMeLStr"],
     SupportsMult["CaMeLStr"],
     SupportsRMult["CaMeLStr"],
 ):
-  """Represents a string in CaMeL."""
+  """Represents a string in CaMeL.
+
+  The raw string is stored as-is, while the provenance of its characters is
+  tracked as a tuple of runs of characters sharing the same capabilities and
+  dependencies. Strings coming from a single source (i.e., most strings) have a
+  single run, no matter how long they are. Per-character values are only
+  created when a string is indexed or iterated over.
+  """
+
+  __slots__ = ("_runs", "_run_ends")
+
+  python_value: str
 
   def __init__(
       self,
-      string: Sequence[_Char],
+      string: str,
       capabilities: camel_capabilities.Capabilities,
       dependencies: tuple[Value, ...],
+      runs: Sequence[_CharRun] | None = None,
   ) -> None:
-    self.python_value = tuple(string)
+    self.python_value = string
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+    self._equality_index = None
+    if runs is None:
+      runs = (_CharRun(string, capabilities, dependencies),) if string else ()
+    self._runs = tuple(runs)
+    self._run_ends: tuple[int, ...] | None = None
+
+  def __eq__(self, other) -> bool:
+    return super().__eq__(other) and self._runs == other._runs
+
+  def __hash__(self) -> int:
+    return super().__hash__()
+
+  def _run_at(self, index: int) -> _CharRun:
+    if self._run_ends is None:
+      self._run_ends = tuple(
+          itertools.accumulate(len(run.python_value) for run in self._runs)
+      )
+    if index < 0:
+      index += len(self.python_value)
+    return self._runs[bisect.bisect_right(self._run_ends, index)]
+
+  def _slice_runs(self, start: int, stop: int) -> tuple[_CharRun, ...]:
+    runs = []
+    run_start = 0
+    for run in self._runs:
+      run_stop = run_start + len(run.python_value)
+      if run_stop > start and run_start < stop:
+        if start <= run_start and run_stop <= stop:
+          runs.append(run)
+        else:
+          runs.append(
+              _CharRun(
+                  run.python_value[
+                      max(start - run_start, 0) : stop - run_start
+                  ],
+                  run._capabilities,
+                  run.outer_dependencies,
+              )
+          )
+      run_start = run_stop
+    return tuple(runs)
+
+  def get_dependencies(
+      self, visited_objects: frozenset[int] = frozenset()
+  ) -> tuple[tuple["Value", ...], frozenset[int]]:
+    dependencies = self.outer_dependencies
+    if id(self) in visited_objects:
+      return dependencies, visited_objects
+    for run in self._runs:
+      dependencies += run.outer_dependencies
+    return dependencies, visited_objects | {id(self)}
 
   def contains(self, other: Value) -> "CaMeLBool":
-    if not isinstance(other, CaMeLStr | _Char):
+    if not isinstance(other, CaMeLStr):
       raise TypeError(
           f"in <string>' requires string as left operand, not {other.raw_type}"
       )
@@ -1207,10 +1480,22 @@ class CaMeLStr(
       capabilities: camel_capabilities.Capabilities,
       dependencies: tuple[Value, ...],
   ) -> Self:
+    return cls(string, capabilities, dependencies)
+
+  @classmethod
+  def concat(
+      cls,
+      strings: Iterable["CaMeLStr"],
+      capabilities: camel_capabilities.Capabilities,
+      dependencies: tuple[Value, ...],
+  ) -> Self:
+    """Concatenates `strings` preserving the provenance of their characters."""
+    strings = list(strings)
     return cls(
-        tuple(_Char(c, capabilities, dependencies) for c in string),
+        "".join(s.python_value for s in strings),
         capabilities,
         dependencies,
+        _merge_runs(run for s in strings for run in s._runs),
     )
 
   def attr(self, name) -> Value | None:
@@ -1230,20 +1515,75 @@ class CaMeLStr(
         camel_capabilities.Capabilities.camel(), (self,)
     )  # already immutable
 
+  def new_with_python_value(self, value: str) -> Self:
+    return type(self)(value, self._capabilities, self.outer_dependencies)
+
   @property
   def raw(self) -> str:
-    s = ""
-    for c in self.python_value:
-      s += c.python_value
-    return s
+    return self.python_value
 
-  def iterate(self) -> CaMeLIterator["CaMeLStr"]:
-    strings_iterator = iter(
-        CaMeLStr([c], camel_capabilities.Capabilities.camel(), (self,))
-        for c in self.python_value
+  def index(self, index: "CaMeLInt") -> "CaMeLStr":
+    char = self.python_value[index.raw]
+    run = self._run_at(index.raw)
+    return CaMeLStr.from_raw(
+        char, run._capabilities, (*run.outer_dependencies, self, index)
+    )
+
+  def slice(
+      self,
+      start: "CaMeLInt | CaMeLNone",
+      end: "CaMeLInt | CaMeLNone",
+      step: "CaMeLInt | CaMeLNone",
+  ) -> Self:
+    s = slice(start.raw, end.raw, step.raw)
+    start_idx, stop_idx, step_idx = s.indices(len(self.python_value))
+    if step_idx == 1:
+      runs = self._slice_runs(start_idx, stop_idx)
+    else:
+      runs = _merge_runs(
+          _CharRun(
+              self.python_value[i],
+              self._run_at(i)._capabilities,
+              self._run_at(i).outer_dependencies,
+          )
+          for i in range(start_idx, stop_idx, step_idx)
+      )
+    return type(self)(
+        self.python_value[s],
+        self._capabilities,
+        (*self.outer_dependencies, self, start, end, step),
+        runs,
+    )
+
+  def len(self) -> "CaMeLInt":
+    return CaMeLInt(
+        len(self.python_value),
+        camel_capabilities.Capabilities.camel(),
+        (self, *self._runs),
     )
+
+  def eq(self, value: "Value") -> "CaMeLBool":
+    if (
+        isinstance(value, CaMeLStr)
+        and self.python_value == value.python_value
+    ):
+      return CaMeLTrue(camel_capabilities.Capabilities.camel(), (self, value))
+    return CaMeLFalse(camel_capabilities.Capabilities.camel(), (self, value))
+
+  def iterate_python(self) -> Iterator["CaMeLStr"]:
+    camel_metadata = camel_capabilities.Capabilities.camel()
+    for run in self._runs:
+      for c in run.python_value:
+        yield CaMeLStr(
+            c,
+            camel_metadata,
+            (self,),
+            (_CharRun(c, run._capabilities, run.outer_dependencies),),
+        )
+
+  def iterate(self) -> CaMeLIterator["CaMeLStr"]:
     return CaMeLIterator(
-        strings_iterator, camel_capabilities.Capabilities.camel(), (self,)
+        self.iterate_python(), camel_capabilities.Capabilities.camel(), (self,)
     )
 
   @property
@@ -1253,10 +1593,8 @@ class CaMeLStr(
   def add(self, other: Value) -> "CaMeLStr | types.NotImplementedType":
     if not isinstance(other, CaMeLStr):
       return NotImplemented
-    return CaMeLStr(
-        self.python_value + other.python_value,
-        camel_capabilities.Capabilities.camel(),
-        (self, other),
+    return CaMeLStr.concat(
+        (self, other), camel_capabilities.Capabilities.camel(), (self, other)
     )
 
   def mult(self, other: Value) -> "CaMeLStr | types.NotImplementedType":
@@ -1266,6 +1604,7 @@ class CaMeLStr(
         self.python_value * other.python_value,
         camel_capabilities.Capabilities.camel(),
         (self, other),
+        _merge_runs(self._runs * max(other.python_value, 0)),
     )
 
   r_mult = mult
@@ -1281,6 +1620,8 @@ class CaMeLTuple(
 ):
   """Represents a tuple in CaMeL."""
 
+  __slots__ = ()
+
   def __init__(
       self,
       it: Iterable[_V],
@@ -1290,6 +1631,8 @@ class CaMeLTuple(
     self._capabilities = capabilities
     self.python_value = tuple(it)
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+    self._equality_index = None
 
   @property
   def raw(self) -> tuple[Any, ...]:
@@ -1327,9 +1670,12 @@ class CaMeLList(
     SupportsAdd["CaMeLList"],
     SupportsMult["CaMeLList"],
     SupportsRMult["CaMeLList"],
+    HasAttrs,
 ):
   """Represents a list in CaMeL."""
 
+  __slots__ = ("_frozen",)
+
   def __init__(
       self,
       it: Iterable[_V],
@@ -1340,6 +1686,8 @@ class CaMeLList(
     self._frozen = False
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+    self._equality_index = None
 
   @property
   def raw(self) -> list[Any]:
@@ -1393,6 +1741,8 @@ class CaMeLSet(
 ):
   """Represents a set in CaMeL."""
 
+  __slots__ = ("_frozen",)
+
   def __init__(
       self,
       it: Iterable[_V],
@@ -1402,6 +1752,8 @@ class CaMeLSet(
     self.python_value = set(it)
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+    self._equality_index = None
 
   @property
   def raw(self) -> set[Any]:
@@ -1459,6 +1811,8 @@ class CaMeLDict(
 ):
   """Represents a dictionary in CaMeL."""
 
+  __slots__ = ("_frozen",)
+
   def __init__(
       self,
       it: Mapping[_KV, _VV],
@@ -1469,6 +1823,8 @@ class CaMeLDict(
     self._frozen = False
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+    self._equality_index = None
 
   @property
   def raw(self) -> dict[Any, Any]:
@@ -1524,6 +1880,13 @@ def _get_class_attr_names(instance: Any | type[Any]) -> set[str]:
 class CaMeLClass(Generic[_T], CaMeLCallable[_T], HasAttrs):
   """Represents a class in CaMeL."""
 
+  __slots__ = (
+      "methods",
+      "_base_classes",
+      "_is_totally_ordered",
+      "is_builtin",
+  )
+
   def __init__(
       self,
       name: str,
@@ -1540,12 +1903,14 @@ class CaMeLClass(Generic[_T], CaMeLCallable[_T], HasAttrs):
     self._name = name
     self._base_classes = base_classes
     self._recv: Value | None = None
+    self._bound_python_value = None
     inherited_methods = {}
     for base_class in base_classes:
       inherited_methods.update(base_class.methods)
     self.methods = methods | inherited_methods
     self._is_totally_ordered = is_totally_ordered
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
     self.is_builtin = is_builtin
 
   def __hash__(self) -> int:
@@ -1639,6 +2004,8 @@ class CaMeLClass(Generic[_T], CaMeLCallable[_T], HasAttrs):
 class CaMeLClassInstance(Generic[_T], HasSetField[_T]):
   """Represents an instance of a class in CaMeL."""
 
+  __slots__ = ("_camel_class", "_namespace", "_frozen", "cmp")
+
   def __init__(
       self,
       value: _T,
@@ -1652,6 +2019,7 @@ class CaMeLClassInstance(Generic[_T], HasSetField[_T]):
     self._capabilities = capabilities
     self._namespace = namespace
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
     self._frozen = False
 
     if self._camel_class._is_totally_ordered:
@@ -1713,6 +2081,7 @@ class CaMeLClassInstance(Generic[_T], HasSetField[_T]):
     if self._frozen:
       raise ValueError("instance is frozen")
     setattr(self.python_value, name, value)
+    _record_mutation()
     return CaMeLNone(camel_capabilities.Capabilities.default(), ())
 
   def attr(self, name: str) -> Value | None:
@@ -1740,6 +2109,8 @@ class ValueAsWrapper(Generic[_T], CaMeLClassInstance[_T]):
   and we need to wrap it as a CaMeL value.
   """
 
+  __slots__ = ()
+
   _camel_class: CaMeLClass[_T]
   _namespace: Namespace
   _frozen: bool
@@ -1781,6 +2152,7 @@ class ValueAsWrapper(Generic[_T], CaMeLClassInstance[_T]):
     if self._frozen:
       raise ValueError("instance is frozen")
     setattr(self.python_value, name, value.raw)
+    _record_mutation()
     return CaMeLNone(camel_capabilities.Capabilities.default(), ())
 
   def freeze(self) -> CaMeLNone:
@@ -1792,6 +2164,8 @@ class ValueAsWrapper(Generic[_T], CaMeLClassInstance[_T]):
 class CaMeLFunction(Generic[_T], CaMeLCallable[_T]):
   """Represents a function in CaMeL."""
 
+  __slots__ = ()
+
   def __init__(
       self,
       name: str,
@@ -1802,8 +2176,10 @@ class CaMeLFunction(Generic[_T], CaMeLCallable[_T]):
     self.python_value = py_callable
     self._capabilities = capabilities
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
     self._name = name
     self._recv: Value | None = None
+    self._bound_python_value = None
 
   def make_args_by_keyword_preserve_values(
       self, args: "CaMeLTuple", kwargs: "CaMeLDict[CaMeLStr, Value]"
@@ -1925,6 +2301,8 @@ def value_from_raw(
 class CaMeLBuiltin(Generic[_T], CaMeLCallable[_T]):
   """Represents a built-in function or method in CaMeL."""
 
+  __slots__ = ("is_class_method", "is_pure")
+
   is_builtin: bool = True
 
   def __init__(
@@ -1934,13 +2312,36 @@ class CaMeLBuiltin(Generic[_T], CaMeLCallable[_T]):
       capabilities: camel_capabilities.Capabilities,
       dependencies: tuple[Value, ...],
       is_class_method: bool = False,
+      is_pure: bool = False,
   ):
     self.python_value = py_callable
     self._capabilities = capabilities
     self._name = name
     self._recv: Value | None = None
+    self._bound_python_value = None
     self.is_class_method = is_class_method
+    self.is_pure = is_pure
     self.outer_dependencies = dependencies
+    self._provenance_summary = None
+
+  def call(
+      self,
+      args: "CaMeLTuple",
+      kwargs: "CaMeLDict[CaMeLStr, Value]",
+      namespace: Namespace,
+  ) -> tuple[Value[_T], dict[str, Any]]:
+    if not self.is_pure:
+      return super().call(args, kwargs, namespace)
+    # Pure built-ins don't modify their arguments, so these are converted to
+    # Python values only once, and are not compared again after the call.
+    raw_args = args.raw
+    raw_kwargs = kwargs.raw
+    output = self.python_value(*raw_args, **raw_kwargs)
+    wrapped_output = self.wrap_output(output, args, kwargs, namespace)
+    args_by_keyword = {
+        str(i): raw_arg for i, raw_arg in enumerate(raw_args)
+    } | raw_kwargs
+    return wrapped_output, args_by_keyword
 
   def freeze(self) -> CaMeLNone:
     if self._recv is not None:
@@ -1978,68 +2379,193 @@ class CaMeLBuiltin(Generic[_T], CaMeLCallable[_T]):
     }
 
 
+_MIN_INDEXED_SIZE = 16
+"""Smaller containers are scanned, as it's faster than indexing them."""
+
+
+class _EqualityIndex(NamedTuple):
+  """Index of the elements of a container by their Python value."""
+
+  version: tuple[int, int, int]
+  """The mutation count, id and length of the container when indexed."""
+  elements: dict[Any, Value] | None
+  """The first element for each Python value, None if not all are indexable."""
+
+
+def _is_indexable(value: Value) -> bool:
+  # Only for these types `eq` is the same as comparing the Python values with
+  # `==`, which is consistent with their hashes.
+  return type(value) in (
+      CaMeLStr,
+      CaMeLInt,
+      CaMeLFloat,
+      CaMeLTrue,
+      CaMeLFalse,
+      CaMeLNone,
+  )
+
+
+def _find_equal_element(
+    container: CaMeLIterable[Any, Any] | CaMeLMapping[Any, Any, Any],
+    other: Value,
+) -> Value | None:
+  """Returns the first element (or key) of `container` that equals `other`.
+
+  Large containers of strings, numbers, booleans and None are indexed with a
+  hash table on the first lookup, so that the next ones don't scan all the elements.
+  The index is rebuilt if the container may have been mutated in the meantime.
+
+  Args:
+    container: The container to look `other` up in.
+    other: The value to look up.
+
+  Returns:
+    The element equal to `other`, or None if there is none.
+  """
+  raw_other = other.raw
+  # NaN is not equal to itself, but can be found in a hash table.
+  if (
+      len(container.python_value) >= _MIN_INDEXED_SIZE
+      and _is_indexable(other)
+      and raw_other == raw_other
+  ):
+    version = (
+        mutation_count(),
+        id(container.python_value),
+        len(container.python_value),
+    )
+    index = getattr(container, "_equality_index", None)
+    if index is None or index.version != version:
+      elements = {}
+      for el in container.iterate_python():
+        if not _is_indexable(el):
+          elements = None
+          break
+        elements.setdefault(el.raw, el)
+      index = _EqualityIndex(version, elements)
+      container._equality_index = index  # pylint: disable=protected-access
+    if index.elements is not None:
+      return index.elements.get(raw_other)
+  return next((el for el in container.iterate_python() if el.eq(other)), None)
+
+
 def make_builtin(
-    name: str, fn: Callable[..., _T], is_class_method: bool = False
+    name: str,
+    fn: Callable[..., _T],
+    is_class_method: bool = False,
+    is_pure: bool = False,
 ) -> CaMeLBuiltin[_T]:
   return CaMeLBuiltin[_T](
-      name, fn, camel_capabilities.Capabilities.camel(), (), is_class_method
+      name,
+      fn,
+      camel_capabilities.Capabilities.camel(),
+      (),
+      is_class_method,
+      is_pure,
   )
 
 
-SUPPORTED_BUILT_IN_METHODS: dict[str, dict[str, CaMeLBuiltin]] = {
-    "dict": {
-        # "clear": make_builtin("clear", dict.clear),
-        "get": make_builtin("get", dict.get),
-        "items": make_builtin("items", lambda d: list(d.items())),
-        "keys": make_builtin("keys", lambda d: list(d.keys())),
-        # "pop": make_builtin("pop", dict.pop),
-        # "popitem": make_builtin("popitem", dict.popitem),
-        # "setdefault": make_builtin("setdefault", dict.setdefault),
-        # "update": make_builtin("update", dict.update),
-        "values": make_builtin("values", lambda d: list(d.values())),
-    },
-    "list": {
-        # "append": make_builtin("append", list.append),
-        # "clear": make_builtin("clear", list.clear),
-        # "extend": make_builtin("extend", list.extend),
-        "index": make_builtin("index", list.index),
-        # "insert": make_builtin("insert", list.insert),
-        # "pop": make_builtin("pop", list.pop),
-        # "remove": make_builtin("remove", list.remove),
-    },
-    "str": {
-        "capitalize": make_builtin("capitalize", str.capitalize),
-        "count": make_builtin("count", str.count),
-        "endswith": make_builtin("endswith", str.endswith),
-        "find": make_builtin("find", str.find),
-        "format": make_builtin("format", str.format),
-        "index": make_builtin("index", str.index),
-        "isalnum": make_builtin("isalnum", str.isalnum),
-        "isalpha": make_builtin("isalpha", str.isalpha),
-        "isdigit": make_builtin("isdigit", str.isdigit),
-        "islower": make_builtin("islower", str.islower),
-        "isspace": make_builtin("isspace", str.isspace),
-        "istitle": make_builtin("istitle", str.istitle),
-        "isupper": make_builtin("isupper", str.isupper),
-        "join": make_builtin("join", str.join),
-        "lower": make_builtin("lower", str.lower),
-        "lstrip": make_builtin("lstrip", str.lstrip),
-        "partition": make_builtin("partition", str.partition),
-        "removeprefix": make_builtin("removeprefix", str.removeprefix),
-        "removesuffix": make_builtin("removesuffix", str.removesuffix),
-        "replace": make_builtin("replace", str.replace),
-        "rfind": make_builtin("rfind", str.rfind),
-        "rindex": make_builtin("rindex", str.rindex),
-        "rpartition": make_builtin("rpartition", str.rpartition),
-        "rsplit": make_builtin("rsplit", str.rsplit),
-        "rstrip": make_builtin("rstrip", str.rstrip),
-        "split": make_builtin("split", str.split),
-        "splitlines": make_builtin("splitlines", str.splitlines),
-        "startswith": make_builtin("startswith", str.startswith),
-        "strip": make_builtin("strip", str.strip),
-        "title": make_builtin("title", str.title),
-        "upper": make_builtin("upper", str.upper),
-    },
+class LazyMapping(Generic[_V], Mapping[str, _V]):
+  """A read-only mapping whose values are only created when first looked up.
+
+  Used for the built-ins, so that those that the code doesn't use are never
+  created.
+  """
+
+  def __init__(self, factories: Mapping[str, Callable[[], _V]]):
+    self._factories = factories
+    self._values: dict[str, _V] = {}
+
+  def __getitem__(self, key: str) -> _V:
+    value = self._values.get(key)
+    if value is None:
+      # `setdefault` keeps a single value if two threads create it at once.
+      value = self._values.setdefault(key, self._factories[key]())
+    return value
+
+  def __contains__(self, key: object) -> bool:
+    return key in self._factories
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(self._factories)
+
+  def __len__(self) -> int:
+    return len(self._factories)
+
+
+def make_builtins(
+    functions: Mapping[str, Callable[..., Any]],
+) -> LazyMapping[CaMeLBuiltin]:
+  """Returns built-ins wrapping `functions`, created when first looked up.
+
+  The functions must not modify their arguments, as the built-ins are pure.
+
+  Args:
+    functions: The functions to wrap, by name.
+
+  Returns:
+    The built-ins, by name.
+  """
+  return LazyMapping({
+      name: functools.partial(make_builtin, name, fn, is_pure=True)
+      for name, fn in functions.items()
+  })
+
+
+SUPPORTED_BUILT_IN_METHODS: dict[str, Mapping[str, CaMeLBuiltin]] = {
+    "dict": make_builtins({
+        # "clear": dict.clear,
+        "get": dict.get,
+        "items": lambda d: list(d.items()),
+        "keys": lambda d: list(d.keys()),
+        # "pop": dict.pop,
+        # "popitem": dict.popitem,
+        # "setdefault": dict.setdefault,
+        # "update": dict.update,
+        "values": lambda d: list(d.values()),
+    }),
+    "list": make_builtins({
+        # "append": list.append,
+        # "clear": list.clear,
+        # "extend": list.extend,
+        "index": list.index,
+        # "insert": list.insert,
+        # "pop": list.pop,
+        # "remove": list.remove,
+    }),
+    "str": make_builtins({
+        "capitalize": str.capitalize,
+        "count": str.count,
+        "endswith": str.endswith,
+        "find": str.find,
+        "format": str.format,
+        "index": str.index,
+        "isalnum": str.isalnum,
+        "isalpha": str.isalpha,
+        "isdigit": str.isdigit,
+        "islower": str.islower,
+        "isspace": str.isspace,
+        "istitle": str.istitle,
+        "isupper": str.isupper,
+        "join": str.join,
+        "lower": str.lower,
+        "lstrip": str.lstrip,
+        "partition": str.partition,
+        "removeprefix": str.removeprefix,
+        "removesuffix": str.removesuffix,
+        "replace": str.replace,
+        "rfind": str.rfind,
+        "rindex": str.rindex,
+        "rpartition": str.rpartition,
+        "rsplit": str.rsplit,
+        "rstrip": str.rstrip,
+        "split": str.split,
+        "splitlines": str.splitlines,
+        "startswith": str.startswith,
+        "strip": str.strip,
+        "title": str.title,
+        "upper": str.upper,
+    }),
 }
 """Built-in methods supported in Starlark (plus or minus some extra).
 
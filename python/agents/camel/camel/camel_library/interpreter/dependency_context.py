@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Dependencies of the control flow of CaMeL code."""
+
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from . import camel_value
+
+
+class DependencyContext(Sequence[camel_value.Value[Any]]):
+  """The values the current control flow depends on, without duplicates.
+
+  Values are deduplicated by identity, and counted, so that a value added by
+  nested statements (e.g., nested loops over the same list) is only removed
+  when the outermost one removes it.
+
+  Contexts are immutable: adding or removing values returns a new context.
+  """
+
+  __slots__ = ("_values", "_counts")
+
+  def __init__(self, values: Iterable[camel_value.Value[Any]] = ()):
+    self._values: tuple[camel_value.Value[Any], ...] = ()
+    self._counts: dict[int, int] = {}
+    self._add_in_place(values)
+
+  @classmethod
+  def of(
+      cls, dependencies: Iterable[camel_value.Value[Any]]
+  ) -> "DependencyContext":
+    """Returns `dependencies` if it is a context, or a context with them."""
+    if isinstance(dependencies, DependencyContext):
+      return dependencies
+    return cls(dependencies)
+
+  def add(self, *values: camel_value.Value[Any]) -> "DependencyContext":
+    """Returns a new context that also depends on `values`."""
+    context = self._copy()
+    context._add_in_place(values)
+    return context
+
+  def remove(self, value: camel_value.Value[Any]) -> "DependencyContext":
+    """Returns a new context where `value` was removed once.
+
+    Args:
+      value: The value to remove, which must have been added before.
+
+    Returns:
+      The new context.
+
+    Raises:
+      ValueError: If `value` is not in the context.
+    """
+    count = self._counts.get(id(value))
+    if count is None:
+      raise ValueError(f"{value!r} is not in the dependency context")
+    context = self._copy()
+    if count > 1:
+      context._counts[id(value)] = count - 1
+      return context
+    del context._counts[id(value)]
+    position = next(i for i, v in enumerate(self._values) if v is value)
+    context._values = self._values[:position] + self._values[position + 1 :]
+    return context
+
+  def _copy(self) -> "DependencyContext":
+    context = DependencyContext()
+    context._values = self._values
+    context._counts = dict(self._counts)
+    return context
+
+  def _add_in_place(self, values: Iterable[camel_value.Value[Any]]) -> None:
+    new_values = []
+    for value in values:
+      count = self._counts.get(id(value), 0)
+      self._counts[id(value)] = count + 1
+      if not count:
+        new_values.append(value)
+    if new_values:
+      self._values = (*self._values, *new_values)
+
+  def __len__(self) -> int:
+    return len(self._values)
+
+  def __getitem__(self, index):
+    return self._values[index]
+
+  def __iter__(self) -> Iterator[camel_value.Value[Any]]:
+    return iter(self._values)
+
+  def __repr__(self) -> str:
+    return f"DependencyContext({list(self._values)!r})"
@@ -22,9 +22,12 @@ calls would create circular imports.
 
 import ast
 from collections.abc import Callable, Iterable, Mapping, Sequence
+from concurrent import futures
 import dataclasses
 import enum
+import functools
 import re
+import threading
 from typing import Any, Generic, NamedTuple, TypeAlias, TypeVar
 
 import pydantic
@@ -37,7 +40,10 @@ from ..capabilities import capabilities as camel_capabilities
 from ..capabilities import readers
 from ..capabilities import sources
 from . import camel_value
+from . import dependency_context
 from . import library
+from . import profiler as profiler_lib
+from . import tool_calls_chain as tool_calls_chain_lib
 
 
 ExceptionASTNodes: TypeAlias = ast.expr | ast.stmt | ast.excepthandler
@@ -137,6 +143,33 @@ class EvalArgs:
   """The list of security policies to apply."""
   eval_mode: DependenciesPropagationMode
   """The evaluation mode, either `STRICT` or `NORMAL`."""
+  max_concurrent_iterations: int = 1
+  """Maximum number of comprehension iterations evaluated concurrently.
+
+  Only comprehensions that call tools are evaluated concurrently, and only in
+  `NORMAL` mode, where iterations cannot change the dependencies of each other.
+  """
+  in_concurrent_iteration: bool = False
+  """Whether the code is evaluated in a concurrent comprehension iteration."""
+  iterations_cancelled: threading.Event | None = None
+  """Set when the result of the concurrent iteration is no longer needed."""
+  profiler: profiler_lib.Profiler | None = None
+  """If set, records the cost of evaluating each node and calling each tool."""
+
+
+class _SideEffectInConcurrentIterationError(Exception):
+  """Raised when a concurrent comprehension iteration calls a tool with side effects.
+
+  The iteration is then evaluated again sequentially.
+  """
+
+
+class _ConcurrentIterationCancelledError(Exception):
+  """Raised when a concurrent comprehension iteration is no longer needed.
+
+  E.g., because a previous iteration failed, so that the iteration does not
+  call any more tools.
+  """
 
 
 def _eval_formatted_value(
@@ -332,7 +365,7 @@ def _eval_iterable(
           # This is only the container capabilities of v as the elements'
           # capabilities are being preserved in the elements themselves
           iter_dependencies = (*iter_dependencies, v)
-          evaled_elts.extend(v.python_value)
+          evaled_elts.extend(v.iterate_python())
         case _:
           raise ValueError("Invalid eval result type")
     else:
@@ -402,14 +435,12 @@ def _eval_joined_str(
     case _:
       raise ValueError("Invalid eval result type")
 
-  string = camel_value.CaMeLStr.from_raw(
-      "", camel_capabilities.Capabilities.camel(), ()
+  string = camel_value.CaMeLStr.concat(
+      (d.string() for d in evaled_data.iterate_python()),
+      camel_capabilities.Capabilities.camel(),
+      (),
   )
 
-  for d in evaled_data.iterate_python():
-    string.python_value = (*string.python_value, *d.string().python_value)
-    # string = string.new_with_dependencies((d,))
-
   return EvalResult(
       result.Ok(string), namespace, tool_calls_chain, dependencies
   )
@@ -999,8 +1030,7 @@ def _assign_name(
         dependencies,
     )
 
-  updated_variables = namespace.variables | {name.id: v}
-  new_namespace = dataclasses.replace(namespace, variables=updated_variables)
+  new_namespace = namespace.add_variables({name.id: v})
   return EvalResult(
       result.Ok(
           camel_value.CaMeLNone(camel_capabilities.Capabilities.default(), ())
@@ -1060,7 +1090,9 @@ def _assign_tuple_list(
         tool_calls_chain,
         dependencies,
     )
-  data_to_assign: Sequence[camel_value.Value[Any]] = v.python_value
+  data_to_assign: Sequence[camel_value.Value[Any]] = tuple(
+      v.iterate_python()
+  )
   if len(names.elts) != len(data_to_assign):
     return EvalResult(
         result.Error(
@@ -1558,24 +1590,252 @@ def _restore_or_delete_variables(
 
   Args:
       original_namespace: The original namespace before the comprehension.
-      updated_namespace: The updated namespace after the comprehension.
+      updated_namespace: The updated namespace after the comprehension, a
+        `new_scope` of `original_namespace`.
       comprehension_variables: The set of variables assigned in the
         comprehension.
 
   Returns:
-      The updated namespace with variables restored or deleted.
+      The original namespace, updated with the variables set in the
+      comprehension other than `comprehension_variables` (e.g., by named
+      expressions).
   """
-  restored_variables = {}
-  for var_name in comprehension_variables:
-    if var_name in original_namespace.variables:
-      restored_variables[var_name] = original_namespace.variables[var_name]
-    else:
-      del updated_namespace.variables[var_name]
-  updated_namespace = dataclasses.replace(
-      updated_namespace,
-      variables=updated_namespace.variables | restored_variables,
+  leaked_variables = {
+      var_name: value
+      for var_name, value in updated_namespace.scope_variables().items()
+      if var_name not in comprehension_variables
+  }
+  if not leaked_variables:
+    return original_namespace
+  return original_namespace.add_variables(leaked_variables)
+
+
+def _eval_comprehension_iteration(
+    element: camel_value.Value[Any],
+    generators: list[ast.comprehension],
+    elts: tuple[ast.expr] | tuple[ast.expr, ast.expr],  # pylint: disable=g-one-element-tuple
+    namespace: camel_value.Namespace,
+    tool_calls_chain: Sequence[function_types.FunctionCall[Any]],
+    dependencies: Iterable[camel_value.Value[Any]],
+    eval_args: EvalArgs,
+    evaled_iterators: tuple[camel_value.Value[Any], ...],
+) -> tuple[EvalResult, tuple[camel_value.Value[Any], ...]]:
+  """Evaluates the comprehension for one element of its first generator.
+
+  Args:
+      element: The element of the first generator.
+      generators: The AST nodes representing the comprehension generators.
+      elts: The AST nodes representing the comprehension elements.
+      namespace: The current namespace.
+      tool_calls_chain: The current chain of tool calls.
+      dependencies: The current dependencies.
+      eval_args: The evaluation arguments.
+      evaled_iterators: The iterators that have been evaluated so far.
+
+  Returns:
+      The result of the evaluation and the evaluated iterators. The result is a
+      tuple with the elements to add for each of `elts`, which is empty if the
+      element is filtered out by the `if`s of the generator.
+  """
+  current_comprehension = generators[0]
+  inner_namespace = namespace.new_scope()
+  assign_res, inner_namespace, tool_calls_chain, dependencies = _assign(
+      element,
+      current_comprehension.target,
+      inner_namespace,
+      tool_calls_chain,
+      dependencies,
+      eval_args,
   )
-  return updated_namespace
+  if isinstance(assign_res, result.Error):
+    return (
+        EvalResult(assign_res, namespace, tool_calls_chain, dependencies),
+        evaled_iterators,
+    )
+
+  # evaluate ifs
+  for if_expr in current_comprehension.ifs:
+    if_res, inner_namespace, tool_calls_chain, dependencies = camel_eval(
+        if_expr, inner_namespace, tool_calls_chain, dependencies, eval_args
+    )
+    if isinstance(if_res, result.Error):
+      return (
+          EvalResult(if_res, namespace, tool_calls_chain, dependencies),
+          evaled_iterators,
+      )
+    if not if_res.value.truth().raw:
+      return (
+          EvalResult(
+              result.Ok(
+                  camel_value.CaMeLTuple(
+                      (), camel_capabilities.Capabilities.default(), ()
+                  )
+              ),
+              namespace,
+              tool_calls_chain,
+              dependencies,
+          ),
+          evaled_iterators,
+      )
+
+  (
+      recursive_res,
+      resulting_namespace,
+      tool_calls_chain,
+      dependencies,
+  ), evaled_iterators = _eval_comprehensions(
+      generators[1:],
+      elts,
+      inner_namespace,
+      tool_calls_chain,
+      dependencies,
+      eval_args,
+      evaled_iterators,
+  )
+
+  namespace = _restore_or_delete_variables(
+      namespace,
+      resulting_namespace,
+      _get_assigned_names(current_comprehension.target),
+  )
+  return (
+      EvalResult(recursive_res, namespace, tool_calls_chain, dependencies),
+      evaled_iterators,
+  )
+
+
+def _can_eval_iterations_concurrently(
+    generators: list[ast.comprehension],
+    elts: tuple[ast.expr] | tuple[ast.expr, ast.expr],  # pylint: disable=g-one-element-tuple
+    namespace: camel_value.Namespace,
+    eval_args: EvalArgs,
+    n_elements: int,
+) -> bool:
+  """Checks whether the iterations of the first generator can run concurrently.
+
+  This is only worth it when the iterations call tools (e.g.,
+  `query_ai_assistant`), and only safe when they can't affect each other: in
+  `NORMAL` mode iterations don't change the dependencies, and without named
+  expressions they can't assign variables outside of the comprehension. Tools
+  with side effects must be called sequentially, so comprehensions calling them
+  are not evaluated concurrently either.
+
+  Args:
+      generators: The AST nodes representing the comprehension generators.
+      elts: The AST nodes representing the comprehension elements.
+      namespace: The current namespace.
+      eval_args: The evaluation arguments.
+      n_elements: The number of elements of the first generator.
+
+  Returns:
+      Whether the iterations can be evaluated concurrently.
+  """
+  if (
+      eval_args.max_concurrent_iterations <= 1
+      or eval_args.in_concurrent_iteration
+      or eval_args.eval_mode != DependenciesPropagationMode.NORMAL
+      or n_elements <= 1
+  ):
+    return False
+  calls_tools = False
+  for root in (*generators[0].ifs, *generators[1:], *elts):
+    for node in ast.walk(root):
+      if isinstance(node, ast.NamedExpr):
+        return False
+      if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        fn = namespace.get(node.func.id)
+        if isinstance(fn, camel_value.CaMeLFunction):
+          if not _is_side_effect_free(fn, eval_args):
+            # The iterations would be evaluated again sequentially.
+            return False
+          calls_tools = True
+  return calls_tools
+
+
+def _eval_iterations_concurrently(
+    elements: list[camel_value.Value[Any]],
+    generators: list[ast.comprehension],
+    elts: tuple[ast.expr] | tuple[ast.expr, ast.expr],  # pylint: disable=g-one-element-tuple
+    namespace: camel_value.Namespace,
+    dependencies: Iterable[camel_value.Value[Any]],
+    eval_args: EvalArgs,
+) -> list[tuple[EvalResult, tuple[camel_value.Value[Any], ...]]]:
+  """Evaluates the iterations of the first generator concurrently.
+
+  Each iteration runs in a new scope of the namespace, starting with an empty
+  chain of tool calls, and may only call tools without side effects. The
+  results are returned in the order of the elements, up to (and including) the
+  first iteration that returns an error, and up to (excluding) the first
+  iteration that tries to call a tool with side effects, which has to be
+  evaluated again sequentially together with all the following ones. The
+  iterations after these are cancelled.
+
+  Args:
+      elements: The elements of the first generator.
+      generators: The AST nodes representing the comprehension generators.
+      elts: The AST nodes representing the comprehension elements.
+      namespace: The current namespace.
+      dependencies: The current dependencies.
+      eval_args: The evaluation arguments.
+
+  Returns:
+      The results of the iterations and their evaluated iterators.
+  """
+  dependencies = list(dependencies)
+  # The iterations after one that fails are not needed, so they stop before
+  # their next call instead of querying the Q-LLM for nothing.
+  cancelled = [threading.Event() for _ in elements]
+
+  def cancel_after(i: int) -> None:
+    for event in cancelled[i + 1 :]:
+      event.set()
+
+  def eval_iteration(
+      i: int,
+  ) -> tuple[EvalResult, tuple[camel_value.Value[Any], ...]]:
+    if cancelled[i].is_set():
+      raise _ConcurrentIterationCancelledError()
+    try:
+      iteration_result = _eval_comprehension_iteration(
+          elements[i],
+          generators,
+          elts,
+          namespace,
+          [],
+          dependencies,
+          dataclasses.replace(
+              eval_args,
+              in_concurrent_iteration=True,
+              iterations_cancelled=cancelled[i],
+          ),
+          (),
+      )
+    except _SideEffectInConcurrentIterationError:
+      cancel_after(i)
+      raise
+    if isinstance(iteration_result[0].result, result.Error):
+      cancel_after(i)
+    return iteration_result
+
+  results = []
+  executor = futures.ThreadPoolExecutor(
+      max_workers=min(eval_args.max_concurrent_iterations, len(elements))
+  )
+  try:
+    for future in [
+        executor.submit(eval_iteration, i) for i in range(len(elements))
+    ]:
+      try:
+        iteration_result = future.result()
+      except _SideEffectInConcurrentIterationError:
+        break
+      results.append(iteration_result)
+      if isinstance(iteration_result[0].result, result.Error):
+        break
+  finally:
+    cancel_after(-1)
+    executor.shutdown(wait=True, cancel_futures=True)
+  return results
 
 
 def _eval_comprehensions(
@@ -1673,65 +1933,50 @@ def _eval_comprehensions(
       camel_value.CaMeLList([], camel_capabilities.Capabilities.camel(), ())
       for _ in elts
   )
-  for element in iterable.iterate_python():
-    inner_namespace = dataclasses.replace(namespace)
-    assign_res, inner_namespace, tool_calls_chain, dependencies = _assign(
-        element,
-        current_comprehension.target,
-        inner_namespace,
-        tool_calls_chain,
-        dependencies,
-        eval_args,
+  elements = list(iterable.iterate_python())
+  concurrent_results = []
+  if _can_eval_iterations_concurrently(
+      generators, elts, namespace, eval_args, len(elements)
+  ):
+    concurrent_results = _eval_iterations_concurrently(
+        elements, generators, elts, namespace, dependencies, eval_args
     )
-    if isinstance(assign_res, result.Error):
-      return (
-          EvalResult(assign_res, namespace, tool_calls_chain, dependencies),
-          (),
-      )
-
-    # evaluate ifs
-    all_ifs_true = True
-    for if_expr in current_comprehension.ifs:
-      if_res, inner_namespace, tool_calls_chain, dependencies = camel_eval(
-          if_expr, inner_namespace, tool_calls_chain, dependencies, eval_args
+  for i, element in enumerate(elements):
+    if i < len(concurrent_results):
+      (
+          (iteration_res, _, iteration_tool_calls_chain, _),
+          iteration_evaled_iterators,
+      ) = concurrent_results[i]
+      # Concurrent iterations start with an empty chain of tool calls, and
+      # cannot change the dependencies in `NORMAL` mode.
+      tool_calls_chain = tool_calls_chain_lib.ToolCallsChain.of(
+          tool_calls_chain
+      ).extend(iteration_tool_calls_chain)
+      evaled_iterators = (*evaled_iterators, *iteration_evaled_iterators)
+    else:
+      (
+          iteration_res,
+          namespace,
+          tool_calls_chain,
+          dependencies,
+      ), evaled_iterators = _eval_comprehension_iteration(
+          element,
+          generators,
+          elts,
+          namespace,
+          tool_calls_chain,
+          dependencies,
+          eval_args,
+          evaled_iterators,
       )
-      if isinstance(if_res, result.Error):
-        return EvalResult(if_res, namespace, tool_calls_chain, dependencies), ()
-      if not if_res.value.truth().raw:
-        all_ifs_true = False
-        break
-    if not all_ifs_true:
-      continue
-
-    (
-        recursive_res,
-        resulting_namespace,
-        tool_calls_chain,
-        dependencies,
-    ), evaled_iterators = _eval_comprehensions(
-        generators[1:],
-        elts,
-        inner_namespace,
-        tool_calls_chain,
-        dependencies,
-        eval_args,
-        evaled_iterators,
-    )
-
-    namespace = _restore_or_delete_variables(
-        namespace,
-        resulting_namespace,
-        _get_assigned_names(current_comprehension.target),
-    )
-
-    if isinstance(recursive_res, result.Error):
+    if isinstance(iteration_res, result.Error):
       return (
-          EvalResult(recursive_res, namespace, tool_calls_chain, dependencies),
+          EvalResult(iteration_res, namespace, tool_calls_chain, dependencies),
           (),
       )
 
     for acc_res, rec_res in zip(
-        accumulated_results, recursive_res.value.python_value
+        accumulated_results, iteration_res.value.python_value
     ):
       acc_res.python_value.extend(rec_res.python_value)
 
@@ -2578,7 +2823,7 @@ def _eval_if(
         node.body,
         namespace,
         tool_calls_chain,
-        [*dependencies, test],
+        dependency_context.DependencyContext.of(dependencies).add(test),
         eval_args,
     )
   elif node.orelse:
@@ -2586,7 +2831,7 @@ def _eval_if(
         node.orelse,
         namespace,
         tool_calls_chain,
-        [*dependencies, test],
+        dependency_context.DependencyContext.of(dependencies).add(test),
         eval_args,
     )
   # If/else statements can't be assigned, so what is returned is meaningless.
@@ -2600,8 +2845,9 @@ def _eval_if(
         dependencies,
     )
 
-  dependencies = list(dependencies)
-  dependencies.remove(test)
+  dependencies = dependency_context.DependencyContext.of(dependencies).remove(
+      test
+  )
 
   if isinstance(body_res, result.Error):
     return EvalResult(body_res, namespace, tool_calls_chain, dependencies)
@@ -2646,7 +2892,9 @@ def _eval_if_exp(
     case _:
       raise ValueError("Invalid eval result type")
 
-  inner_dependencies = [*dependencies, test]
+  inner_dependencies = dependency_context.DependencyContext.of(
+      dependencies
+  ).add(test)
   if test.truth().python_value:
     body_res, namespace, tool_calls_chain, dependencies = camel_eval(
         node.body,
@@ -2660,8 +2908,9 @@ def _eval_if_exp(
         node.orelse, namespace, tool_calls_chain, inner_dependencies, eval_args
     )
 
-  dependencies = list(dependencies)
-  dependencies.remove(test)
+  dependencies = dependency_context.DependencyContext.of(dependencies).remove(
+      test
+  )
 
   if isinstance(body_res, result.Error):
     return EvalResult(body_res, namespace, tool_calls_chain, dependencies)
@@ -2739,7 +2988,9 @@ def _eval_for(
         dependencies,
     )
 
-  dependencies = [*dependencies, iterable]
+  dependencies = dependency_context.DependencyContext.of(dependencies).add(
+      iterable
+  )
   for elt in iterable.iterate_python():
     assign_res, namespace, tool_calls_chain, dependencies = _assign(
         elt,
@@ -2768,8 +3019,9 @@ def _eval_for(
           final_val_res, namespace, tool_calls_chain, dependencies
       )
 
-  dependencies = list(dependencies)
-  dependencies.remove(iterable)
+  dependencies = dependency_context.DependencyContext.of(dependencies).remove(
+      iterable
+  )
 
   return EvalResult(
       result.Ok(
@@ -3017,6 +3269,19 @@ def _eval_keywords(
   )
 
 
+def _is_side_effect_free(
+    fn: camel_value.CaMeLCallable[Any], eval_args: EvalArgs
+) -> bool:
+  """Returns whether calling `fn` has no side effects outside the interpreter."""
+  if isinstance(fn, camel_value.CaMeLBuiltin | camel_value.CaMeLClass):
+    return True
+  name = fn.name().raw
+  return (
+      name == "query_ai_assistant"
+      or name in eval_args.security_policy_engine.no_side_effect_tools
+  )
+
+
 def _eval_call(
     node: ast.Call,
     namespace: camel_value.Namespace,
@@ -3101,6 +3366,14 @@ def _eval_call(
         dependencies,
     )
 
+  if eval_args.in_concurrent_iteration:
+    if eval_args.iterations_cancelled is not None and (
+        eval_args.iterations_cancelled.is_set()
+    ):
+      raise _ConcurrentIterationCancelledError()
+    if not _is_side_effect_free(evaled_fn, eval_args):
+      raise _SideEffectInConcurrentIterationError(evaled_fn.name().raw)
+
   try:
     # make sure policy evaluation is constant time to prevent side-channels
     policy_check_result = eval_args.security_policy_engine.check_policy(
@@ -3132,16 +3405,24 @@ def _eval_call(
       evaled_fn.name().raw == "query_ai_assistant"
       and eval_args.eval_mode == DependenciesPropagationMode.STRICT
   ):
-    dependencies = [
-        *dependencies,
+    dependencies = dependency_context.DependencyContext.of(dependencies).add(
         *evaled_args.python_value,
         *evaled_kwargs.python_value.values(),
-    ]
+    )
 
   try:
-    ret_res, args_by_keyword = evaled_fn.call(
-        evaled_args, evaled_kwargs, namespace
-    )
+    if eval_args.profiler is not None and not isinstance(
+        evaled_fn, camel_value.CaMeLBuiltin | camel_value.CaMeLClass
+    ):
+      ret_res, args_by_keyword = eval_args.profiler.profile_tool_call(
+          evaled_fn.name().raw,
+          dependencies,
+          lambda: evaled_fn.call(evaled_args, evaled_kwargs, namespace),
+      )
+    else:
+      ret_res, args_by_keyword = evaled_fn.call(
+          evaled_args, evaled_kwargs, namespace
+      )
   except Exception as e:  # pylint: disable=broad-except  # catch all exceptions to be able to return them to the P-LLM
     if isinstance(e, library.NotEnoughInformationError):
       return EvalResult(
@@ -3221,7 +3502,9 @@ def _eval_call(
   return EvalResult(
       result.Ok(ret_res),
       namespace,
-      [*tool_calls_chain, tool_call],
+      tool_calls_chain_lib.ToolCallsChain.of(tool_calls_chain).append(
+          tool_call
+      ),
       dependencies,
   )
 
@@ -3602,6 +3885,64 @@ def _eval_function_def(
   )
 
 
+_NODE_EVALUATORS: Mapping[
+    type[ast.AST],
+    Callable[
+        [
+            Any,
+            camel_value.Namespace,
+            Sequence[function_types.FunctionCall[Any]],
+            Iterable[camel_value.Value[Any]],
+            EvalArgs,
+        ],
+        EvalResult,
+    ],
+] = {
+    # Literals
+    ast.Constant: _eval_constant,
+    ast.FormattedValue: _eval_formatted_value,
+    ast.JoinedStr: _eval_joined_str,
+    ast.List: _eval_list,
+    ast.Tuple: _eval_tuple,
+    ast.Set: _eval_set,
+    ast.Dict: _eval_dict,
+    # namespace, attribute and subscript loading
+    ast.Name: _eval_name_load,
+    ast.Attribute: _eval_attribute_load,
+    ast.Subscript: _eval_subscript_load,
+    # Statements
+    ast.Assign: _eval_assign,
+    ast.AnnAssign: _eval_ann_assign,
+    ast.AugAssign: _eval_aug_assign,
+    # Comprehensions
+    ast.ListComp: _eval_list_comp,
+    ast.SetComp: _eval_set_comp,
+    ast.DictComp: _eval_dict_comp,
+    # Expressions
+    ast.Expr: _eval_expr,
+    ast.NamedExpr: _eval_named_expr,
+    ast.UnaryOp: _eval_unary_op,
+    ast.BinOp: _eval_bin_op,
+    ast.BoolOp: _eval_bool_op,
+    ast.Compare: _eval_compare,
+    # Control flow
+    ast.If: _eval_if,
+    ast.IfExp: _eval_if_exp,
+    ast.For: _eval_for,
+    ast.Call: _eval_call,
+    # Rest
+    ast.Module: _eval_module,
+    ast.ClassDef: _eval_class_def,
+    ast.FunctionDef: _eval_function_def,
+    ast.Raise: _eval_raise,
+}
+"""Evaluators of the supported node types, keyed by their exact type.
+
+Looking the evaluator up by type avoids going through all the `case`s of
+`camel_eval` for every node that is evaluated.
+"""
+
+
 def camel_eval(
     node: ast.AST,
     namespace: camel_value.Namespace,
@@ -3610,49 +3951,29 @@ def camel_eval(
     eval_args: EvalArgs,
 ) -> EvalResult:
   """Interprets the given AST enforcing security policies."""
+  if eval_args.profiler is not None:
+    return eval_args.profiler.profile_node(
+        node,
+        lambda: _camel_eval_node(
+            node, namespace, tool_calls_chain, dependencies, eval_args
+        ),
+    )
+  return _camel_eval_node(
+      node, namespace, tool_calls_chain, dependencies, eval_args
+  )
+
+
+def _camel_eval_node(
+    node: ast.AST,
+    namespace: camel_value.Namespace,
+    tool_calls_chain: Sequence[function_types.FunctionCall[Any]],
+    dependencies: Iterable[camel_value.Value[Any]],
+    eval_args: EvalArgs,
+) -> EvalResult:
+  evaluator = _NODE_EVALUATORS.get(type(node))
+  if evaluator is not None:
+    return evaluator(node, namespace, tool_calls_chain, dependencies, eval_args)
   match node:
-    # Literals
-    case ast.Constant():
-      return _eval_constant(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.FormattedValue():
-      return _eval_formatted_value(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.JoinedStr():
-      return _eval_joined_str(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.List():
-      return _eval_list(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Tuple():
-      return _eval_tuple(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Set():
-      return _eval_set(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Dict():
-      return _eval_dict(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    # namespace, attribute and subscript loading
-    case ast.Name():
-      return _eval_name_load(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Attribute():
-      return _eval_attribute_load(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Subscript():
-      return _eval_subscript_load(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
     case ast.Slice():
       return EvalResult(
           _make_not_implemented_error(
@@ -3663,91 +3984,6 @@ def camel_eval(
           tool_calls_chain,
           dependencies,
       )
-    # Statements
-    case ast.Assign():
-      return _eval_assign(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.AnnAssign():
-      return _eval_ann_assign(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.AugAssign():
-      return _eval_aug_assign(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    # Comprehensions
-    case ast.ListComp():
-      return _eval_list_comp(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.SetComp():
-      return _eval_set_comp(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.DictComp():
-      return _eval_dict_comp(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    # Expressions
-    case ast.Expr():
-      return _eval_expr(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.NamedExpr():
-      return _eval_named_expr(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.UnaryOp():
-      return _eval_unary_op(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.BinOp():
-      return _eval_bin_op(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.BoolOp():
-      return _eval_bool_op(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Compare():
-      return _eval_compare(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    # Control flow
-    case ast.If():
-      return _eval_if(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.IfExp():
-      return _eval_if_exp(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.For():
-      return _eval_for(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Call():
-      return _eval_call(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    # Rest
-    case ast.Module():
-      return _eval_module(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.ClassDef():
-      return _eval_class_def(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.FunctionDef():
-      return _eval_function_def(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
-    case ast.Raise():
-      return _eval_raise(
-          node, namespace, tool_calls_chain, dependencies, eval_args
-      )
     case ast.Pass():
       return EvalResult(
           result.Ok(
@@ -3947,8 +4183,9 @@ def camel_eval(
               dependencies,
           )
         if alias.asname is not None:
-          namespace.variables[alias.asname] = namespace.variables[alias.name]
-          del namespace.variables[alias.name]
+          namespace = namespace.add_variables(
+              {alias.asname: namespace.variables[alias.name]}
+          ).without_variable(alias.name)
       return EvalResult(
           result.Ok(
               camel_value.CaMeLNone(camel_capabilities.Capabilities.camel(), ())
@@ -3958,6 +4195,12 @@ def camel_eval(
           dependencies,
       )
     case _:
+      # Subclasses of the supported node types are not in `_NODE_EVALUATORS`.
+      for node_type, evaluator in _NODE_EVALUATORS.items():
+        if isinstance(node, node_type):
+          return evaluator(
+              node, namespace, tool_calls_chain, dependencies, eval_args
+          )
       raise NotImplementedError(
           f"Node of type {type(node).__name__} is not supported."
       )
@@ -4003,6 +4246,30 @@ def extract_code_block(markdown_text: str) -> str:
   return code_fences[0]
 
 
+_PARSED_CODE_CACHE_SIZE = 128
+
+
+@functools.lru_cache(maxsize=_PARSED_CODE_CACHE_SIZE)
+def _parse_code_block(markdown_text: str) -> ast.Module:
+  """Extracts the code block from the given Markdown text and parses it.
+
+  The parsed modules are cached, so that re-running the same program (e.g.,
+  when the P-LLM retries with the same code) does not parse it again. The
+  interpreter never modifies the AST, so the cached modules can be shared.
+
+  Args:
+      markdown_text: The Markdown text containing the code block.
+
+  Returns:
+      The parsed code.
+
+  Raises:
+      InvalidOutputError: If the text does not contain exactly one code block.
+      SyntaxError: If the code cannot be parsed.
+  """
+  return ast.parse(extract_code_block(markdown_text))
+
+
 def parse_and_interpret_code(
     code: str,
     namespace: camel_value.Namespace,
@@ -4023,7 +4290,7 @@ def parse_and_interpret_code(
       The result of the evaluation.
   """
   try:
-    code = extract_code_block(code)
+    parsed_code = _parse_code_block(code)
   except InvalidOutputError as e:
     error_nodes: tuple[ExceptionASTNodes, ...] = (
         ast.expr(
@@ -4037,8 +4304,6 @@ def parse_and_interpret_code(
         tool_calls_chain,
         dependencies,
     )
-  try:
-    parsed_code = ast.parse(code)
   except SyntaxError as e:
     error_nodes: tuple[ExceptionASTNodes, ...] = (
         ast.expr(
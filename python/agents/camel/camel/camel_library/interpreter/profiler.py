@@ -0,0 +1,286 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Profiler for the CaMeL interpreter.
+
+Pass a `Profiler` as `profiler` in `EvalArgs` to record, for each evaluated AST
+node and each tool call:
+
+- the wall time, both including and excluding the nested nodes,
+- the net number of memory blocks allocated by the whole process while
+  evaluating it, which includes the allocations of other threads (e.g., of
+  concurrent comprehension iterations),
+- the size of the dependency graphs of the resulting value and of the control
+  flow, i.e., the number of values they (transitively) depend on.
+
+The time spent by the profiler measuring the dependency graphs is excluded
+from the wall time of the nodes.
+
+The results can be exported as folded stacks (the input format of flame graph
+tools such as `flamegraph.pl` or speedscope) and as a summary table.
+"""
+
+import ast
+import collections
+from collections.abc import Callable, Iterable, Sized
+import dataclasses
+import sys
+import threading
+import time
+from typing import Any, TypeVar
+
+from .. import result
+
+_T = TypeVar("_T")
+
+
+@dataclasses.dataclass
+class Stats:
+  """Aggregated statistics of the evaluations of a node or a tool."""
+
+  count: int = 0
+  """Number of evaluations."""
+  total_seconds: float = 0.0
+  """Wall time, including the nested nodes and tool calls."""
+  self_seconds: float = 0.0
+  """Wall time, excluding the nested nodes and tool calls."""
+  allocated_blocks: int = 0
+  """Net number of memory blocks allocated by the process, see `Profiler`."""
+  max_value_dependencies: int = 0
+  """Largest number of values the resulting value transitively depends on."""
+  max_context_dependencies: int = 0
+  """Largest number of values the control flow transitively depends on."""
+
+
+@dataclasses.dataclass
+class _Frame:
+  label: str
+  start_time: float
+  start_blocks: int
+  children_seconds: float = 0.0
+  profiling_seconds: float = 0.0
+  """Time spent by the profiler in the nested frames, excluded from this one."""
+
+
+def node_label(node: ast.AST) -> str:
+  """Returns a short label identifying the node in the reports."""
+  name = type(node).__name__
+  if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+    name = f"{name}({node.func.id})"
+  elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+    name = f"{name}(.{node.func.attr})"
+  elif isinstance(node, ast.Name):
+    name = f"{name}({node.id})"
+  lineno = getattr(node, "lineno", None)
+  return name if lineno is None else f"{name}@L{lineno}"
+
+
+def _dependency_graph_size(dependencies: Iterable[Any]) -> int:
+  """Returns the number of values reachable from `dependencies`."""
+  visited = set()
+  to_visit = list(dependencies)
+  while to_visit:
+    value = to_visit.pop()
+    # Dependencies can also be readers, which have no dependencies.
+    if id(value) in visited or not hasattr(value, "get_dependencies"):
+      continue
+    visited.add(id(value))
+    to_visit.extend(value.get_dependencies()[0])
+  return len(visited)
+
+
+def _count_dependencies(eval_result: Any) -> tuple[int, int]:
+  """Returns the dependency graph sizes of the value and the control flow."""
+  value_result, _, _, dependencies = eval_result
+  if isinstance(value_result, result.Ok):
+    value_dependencies = _dependency_graph_size(
+        value_result.value.get_dependencies()[0]
+    )
+  else:
+    value_dependencies = 0
+  return value_dependencies, _count_context_dependencies(dependencies)
+
+
+def _count_context_dependencies(dependencies: Iterable[Any]) -> int:
+  # Other iterables are not consumed, as they may be single-use.
+  if not isinstance(dependencies, Sized):
+    return 0
+  return _dependency_graph_size(dependencies)
+
+
+class Profiler:
+  """Records the cost of evaluating AST nodes and calling tools.
+
+  Can be shared by concurrently evaluated code: each thread keeps its own stack
+  of nodes being evaluated, so the nodes evaluated in concurrent comprehension
+  iterations appear at the root of the folded stacks.
+  """
+
+  def __init__(self) -> None:
+    self._lock = threading.Lock()
+    self._local = threading.local()
+    self.node_stats: dict[str, Stats] = collections.defaultdict(Stats)
+    """Statistics for each node, by `node_label`."""
+    self.tool_stats: dict[str, Stats] = collections.defaultdict(Stats)
+    """Statistics for each tool, by tool name."""
+    self._folded_stacks: dict[str, float] = collections.defaultdict(float)
+
+  def profile_node(self, node: ast.AST, evaluate: Callable[[], _T]) -> _T:
+    """Evaluates a node with `evaluate` and records its cost.
+
+    Args:
+      node: The node being evaluated.
+      evaluate: Evaluates the node and returns its `EvalResult`.
+
+    Returns:
+      The result of `evaluate`.
+    """
+    frame = self._push(node_label(node))
+    eval_result = None
+    try:
+      eval_result = evaluate()
+      return eval_result
+    finally:
+      self._pop(
+          frame,
+          self.node_stats,
+          lambda: (
+              _count_dependencies(eval_result)
+              if eval_result is not None
+              else None
+          ),
+      )
+
+  def profile_tool_call(
+      self,
+      tool_name: str,
+      context_dependencies: Iterable[Any],
+      call: Callable[[], _T],
+  ) -> _T:
+    """Calls a tool with `call` and records its cost.
+
+    Args:
+      tool_name: The name of the tool.
+      context_dependencies: The control flow dependencies of the call.
+      call: Calls the tool and returns the wrapped output and the arguments.
+
+    Returns:
+      The result of `call`.
+    """
+    frame = self._push(f"tool:{tool_name}")
+    output = None
+
+    def count_dependencies() -> tuple[int, int] | None:
+      if output is None:
+        return None
+      return (
+          _dependency_graph_size(output[0].get_dependencies()[0]),
+          _count_context_dependencies(context_dependencies),
+      )
+
+    try:
+      output = call()
+      return output
+    finally:
+      self._pop(frame, self.tool_stats, count_dependencies, key=tool_name)
+
+  def folded_stacks(self) -> str:
+    """Returns the self time of each stack, in microseconds, as folded stacks."""
+    with self._lock:
+      return "".join(
+          f"{stack} {round(seconds * 1e6)}\n"
+          for stack, seconds in sorted(self._folded_stacks.items())
+      )
+
+  def write_folded_stacks(self, path: str) -> None:
+    """Writes the folded stacks to `path`, e.g. to render a flame graph."""
+    with open(path, "w") as f:
+      f.write(self.folded_stacks())
+
+  def summary_table(self, limit: int = 20) -> str:
+    """Returns a table of the nodes and tools with the highest self time.
+
+    Args:
+      limit: The maximum number of nodes and tools in the table.
+
+    Returns:
+      The formatted table.
+    """
+    with self._lock:
+      rows = [*self.node_stats.items(), *self.tool_stats.items()]
+      tool_names = set(self.tool_stats)
+    rows.sort(key=lambda row: row[1].self_seconds, reverse=True)
+    header = (
+        f"{'node':<40} {'count':>7} {'total ms':>10} {'self ms':>10}"
+        f" {'proc blocks':>11} {'value deps':>10} {'ctx deps':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for label, stats in rows[:limit]:
+      if label in tool_names:
+        label = f"tool:{label}"
+      lines.append(
+          f"{label[:40]:<40} {stats.count:>7}"
+          f" {stats.total_seconds * 1e3:>10.3f}"
+          f" {stats.self_seconds * 1e3:>10.3f}"
+          f" {stats.allocated_blocks:>11}"
+          f" {stats.max_value_dependencies:>10}"
+          f" {stats.max_context_dependencies:>8}"
+      )
+    return "\n".join(lines)
+
+  def _stack(self) -> list[_Frame]:
+    stack = getattr(self._local, "stack", None)
+    if stack is None:
+      stack = self._local.stack = []
+    return stack
+
+  def _push(self, label: str) -> _Frame:
+    frame = _Frame(label, time.perf_counter(), sys.getallocatedblocks())
+    self._stack().append(frame)
+    return frame
+
+  def _pop(
+      self,
+      frame: _Frame,
+      stats_by_key: dict[str, Stats],
+      count_dependencies: Callable[[], tuple[int, int] | None],
+      key: str | None = None,
+  ) -> None:
+    end_time = time.perf_counter()
+    elapsed = end_time - frame.start_time - frame.profiling_seconds
+    allocated_blocks = sys.getallocatedblocks() - frame.start_blocks
+    dependencies = count_dependencies()
+    stack = self._stack()
+    folded_stack = ";".join(f.label for f in stack)
+    stack.pop()
+    if stack:
+      stack[-1].children_seconds += elapsed
+      stack[-1].profiling_seconds += (
+          frame.profiling_seconds + time.perf_counter() - end_time
+      )
+    self_seconds = elapsed - frame.children_seconds
+    with self._lock:
+      stats = stats_by_key[key or frame.label]
+      stats.count += 1
+      stats.total_seconds += elapsed
+      stats.self_seconds += self_seconds
+      stats.allocated_blocks += allocated_blocks
+      if dependencies is not None:
+        stats.max_value_dependencies = max(
+            stats.max_value_dependencies, dependencies[0]
+        )
+        stats.max_context_dependencies = max(
+            stats.max_context_dependencies, dependencies[1]
+        )
+      self._folded_stacks[folded_stack] += self_seconds
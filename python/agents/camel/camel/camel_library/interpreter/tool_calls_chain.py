@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent chain of the tool calls made by CaMeL code."""
+
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, overload
+
+from .. import function_types
+
+_FunctionCall = function_types.FunctionCall[Any]
+
+
+class ToolCallsChain(Sequence[_FunctionCall]):
+  """An immutable, append-only sequence of tool calls.
+
+  Appending returns a new chain that shares all the previous calls with the
+  original one, so it takes constant time and memory, instead of copying the
+  whole history of calls. The `print` calls are linked to each other, so that
+  the printed output can be collected without scanning all the calls.
+  """
+
+  __slots__ = ("_previous", "_call", "_len", "_last_print", "_items")
+
+  def __init__(
+      self,
+      previous: "ToolCallsChain | None" = None,
+      call: _FunctionCall | None = None,
+  ):
+    """Creates an empty chain, or `previous` followed by `call`.
+
+    Use `ToolCallsChain()` for an empty chain and `append` to add calls.
+
+    Args:
+      previous: The chain of calls before `call`.
+      call: The last call of the chain.
+    """
+    self._previous = previous
+    self._call = call
+    self._len = 0 if previous is None else previous._len + 1
+    if call is not None and call.function == "print":
+      self._last_print: ToolCallsChain | None = self
+    elif previous is not None:
+      self._last_print = previous._last_print
+    else:
+      self._last_print = None
+    self._items: tuple[_FunctionCall, ...] | None = None
+
+  @classmethod
+  def of(cls, calls: Iterable[_FunctionCall]) -> "ToolCallsChain":
+    """Returns `calls` if it is a chain, or a chain with the same calls."""
+    if isinstance(calls, ToolCallsChain):
+      return calls
+    return cls().extend(calls)
+
+  def append(self, call: _FunctionCall) -> "ToolCallsChain":
+    """Returns a new chain with `call` added at the end."""
+    return ToolCallsChain(self, call)
+
+  def extend(self, calls: Iterable[_FunctionCall]) -> "ToolCallsChain":
+    """Returns a new chain with `calls` added at the end."""
+    chain = self
+    for call in calls:
+      chain = ToolCallsChain(chain, call)
+    return chain
+
+  def print_calls(self) -> list[_FunctionCall]:
+    """Returns the `print` calls in the chain, in order."""
+    calls = []
+    chain = self._last_print
+    while chain is not None:
+      calls.append(chain._call)
+      chain = chain._previous._last_print if chain._previous else None
+    calls.reverse()
+    return calls
+
+  def _as_tuple(self) -> tuple[_FunctionCall, ...]:
+    if self._items is None:
+      calls = []
+      chain = self
+      while chain._previous is not None and chain._items is None:
+        calls.append(chain._call)
+        chain = chain._previous
+      calls.reverse()
+      self._items = (chain._items or ()) + tuple(calls)
+      # The calls are only kept by the last chain they were computed for, so
+      # that using many chains of the same history doesn't take quadratic
+      # memory.
+      if chain is not self:
+        chain._items = None
+    return self._items
+
+  def __len__(self) -> int:
+    return self._len
+
+  @overload
+  def __getitem__(self, index: int) -> _FunctionCall:
+    ...
+
+  @overload
+  def __getitem__(self, index: slice) -> Sequence[_FunctionCall]:
+    ...
+
+  def __getitem__(self, index):
+    if isinstance(index, int) and index in (-1, self._len - 1) and self._len:
+      return self._call
+    return self._as_tuple()[index]
+
+  def __iter__(self) -> Iterator[_FunctionCall]:
+    return iter(self._as_tuple())
+
+  def __eq__(self, other: object) -> bool:
+    if not isinstance(other, Sequence) or isinstance(other, str):
+      return NotImplemented
+    return len(self) == len(other) and all(
+        a == b for a, b in zip(self, other)
+    )
+
+  def __repr__(self) -> str:
+    return f"ToolCallsChain({list(self._as_tuple())!r})"
+
+  def __copy__(self) -> "ToolCallsChain":
+    return self  # Immutable.
+
+  def __reduce__(self) -> tuple[Any, ...]:
+    # The default would pickle (and `copy.deepcopy`) the linked calls
+    # recursively, which exceeds the recursion limit for long chains, e.g. the
+    # ones stored in the state of ADK sessions.
+    return (ToolCallsChain.of, (self._as_tuple(),))
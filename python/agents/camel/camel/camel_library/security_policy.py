@@ -115,6 +115,8 @@ class SecurityPolicyEngine(typing.Protocol):
     """
     if tool_name in self.no_side_effect_tools:
       return Allowed()
+    # Every dependency is checked, without stopping early, so that the time
+    # taken does not reveal whether the control flow depends on private values.
     non_public_variables = [
         d.raw for d in dependencies if not capabilities_utils.is_public(d)
     ]
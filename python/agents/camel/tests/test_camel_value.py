@@ -0,0 +1,118 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the attributes of freshly built CaMeL values."""
+
+import pickle
+
+from camel.camel_library import result as result_lib
+from camel.camel_library import security_policy
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.capabilities import readers
+from camel.camel_library.capabilities import sources
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import interpreter
+from camel.camel_library.interpreter import library
+import pytest
+
+
+def _run(code: str) -> result_lib.Result:
+  eval_args = interpreter.EvalArgs(
+      security_policy.NoSecurityPolicyEngine(),
+      interpreter.DependenciesPropagationMode.NORMAL,
+  )
+  result, *_ = interpreter.parse_and_interpret_code(
+      f"```python\n{code}\n```",
+      library.make_builtins_namespace(),
+      [],
+      (),
+      eval_args,
+  )
+  return result
+
+
+def _values() -> list[camel_value.Value]:
+  caps = capabilities.Capabilities.default()
+  one = camel_value.CaMeLInt(1, caps, ())
+  return [
+      camel_value.CaMeLNone(caps, ()),
+      camel_value.CaMeLInt(1, caps, ()),
+      camel_value.CaMeLFloat(1.0, caps, ()),
+      camel_value.CaMeLStr.from_raw("a", caps, ()),
+      camel_value.CaMeLTuple([one], caps, ()),
+      camel_value.CaMeLList([one], caps, ()),
+      camel_value.CaMeLSet([one], caps, ()),
+      camel_value.CaMeLDict({one: one}, caps, ()),
+  ]
+
+
+@pytest.mark.parametrize("value", _values(), ids=lambda v: type(v).__name__)
+def test_caches_are_empty_until_computed(value):
+  # The slots must be set for the runtime checkable protocols to match.
+  assert value._provenance_summary is None  # pylint: disable=protected-access
+  copied = camel_value._shallow_copy(value)  # pylint: disable=protected-access
+  assert copied._provenance_summary is None  # pylint: disable=protected-access
+  if isinstance(value, (camel_value.CaMeLIterable, camel_value.CaMeLMapping)):
+    assert value._equality_index is None  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize(
+    "value",
+    [v for v in _values() if hasattr(type(v), "attr")],
+    ids=lambda v: type(v).__name__,
+)
+def test_values_with_attributes_have_attrs(value):
+  assert isinstance(value, camel_value.HasAttrs)
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        ("[1, 2].index(2)", 1),
+        ("x = [1, 2]\nx.index(2)", 1),
+        ("{'a': 1}.get('a')", 1),
+        ("'ab'.upper()", "AB"),
+    ],
+)
+def test_methods_of_fresh_values(code, expected):
+  result = _run(code)
+  assert isinstance(result, result_lib.Ok), result
+  assert result.value.raw == expected
+
+
+@pytest.mark.parametrize("code", ["(1, 2).count(1)", "{1, 2}.union({3})"])
+def test_unsupported_methods(code):
+  result = _run(code)
+  assert isinstance(result, result_lib.Error)
+  assert isinstance(result.error.exception, AttributeError)
+
+
+def test_shared_capabilities_cannot_be_modified():
+  caps = capabilities.Capabilities.default()
+  with pytest.raises(TypeError):
+    caps.other_metadata["key"] = "value"
+  assert capabilities.Capabilities.default().other_metadata == {}
+
+
+def test_capabilities_copy_the_metadata():
+  metadata = {"key": "value"}
+  caps = capabilities.Capabilities(
+      frozenset({sources.SourceEnum.USER}), readers.Public(), metadata
+  )
+  expected_hash = hash(caps)
+  metadata["key"] = "other"
+  assert caps.other_metadata == {"key": "value"}
+  assert hash(caps) == expected_hash
+  copied = pickle.loads(pickle.dumps(caps))
+  assert copied == caps and hash(copied) == expected_hash
@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the dependencies of the control flow."""
+
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import dependency_context
+import pytest
+
+DependencyContext = dependency_context.DependencyContext
+
+
+def _public_int(raw: int) -> camel_value.CaMeLInt:
+  return camel_value.CaMeLInt(raw, capabilities.Capabilities.default(), ())
+
+
+def test_values_are_deduplicated_and_counted():
+  value = _public_int(1)
+  other = _public_int(1)  # Equal, but a different value.
+
+  context = DependencyContext([value]).add(value, other)
+
+  assert list(context) == [value, other]
+  assert list(context.remove(value)) == [value, other]
+  assert list(context.remove(value).remove(value)) == [other]
+
+
+def test_remove_missing_value():
+  with pytest.raises(ValueError):
+    DependencyContext([_public_int(1)]).remove(_public_int(1))
+
+
+def test_contexts_are_immutable():
+  value = _public_int(1)
+  context = DependencyContext()
+
+  added = context.add(value)
+  removed = added.remove(value)
+
+  assert not context
+  assert list(added) == [value]
+  assert not removed
+  assert DependencyContext.of(added) is added
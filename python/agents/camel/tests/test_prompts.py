@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the system prompt of the P-LLM."""
+
+import collections
+import gc
+import weakref
+
+from camel.camel_agent import camel_agent
+from camel.camel_agent import prompts
+from camel.camel_library.capabilities import capabilities
+from camel.camel_library.interpreter import camel_value
+from camel.camel_library.interpreter import library
+
+
+def send_email(to: str, body: str) -> str:
+  """Sends an email.
+
+  Args:
+    to: The recipient of the email.
+    body: The body of the email.
+  """
+  return f"Sent to {to}"
+
+
+def test_system_prompt_is_cached_across_agents(monkeypatch):
+  generated = []
+  generate = prompts.generate_camel_system_prompt
+
+  def counting_generate(*args, **kwargs):
+    generated.append(args)
+    return generate(*args, **kwargs)
+
+  monkeypatch.setattr(
+      prompts, "generate_camel_system_prompt", counting_generate
+  )
+  monkeypatch.setattr(
+      prompts, "_system_prompt_cache", collections.OrderedDict()
+  )
+  tools = [(send_email, capabilities.Capabilities.camel(), ())]
+
+  first = camel_agent.CaMeLAgent(name="first", tools=tools)
+  service = weakref.ref(
+      first.camel_interpreter_agent.camel_interpreter_service
+  )
+  second = camel_agent.CaMeLAgent(name="second", tools=tools)
+
+  assert len(generated) == 1
+  assert first.pllm_agent.instruction == second.pllm_agent.instruction
+  assert "def send_email(to: str, body: str) -> str:" in (
+      second.pllm_agent.instruction
+  )
+  del first, generated[:]
+  gc.collect()
+  # The cache doesn't keep the tools of the agents alive.
+  assert service() is None
+
+
+def test_class_methods_table_matches_built_in_classes():
+  assert list(library.BUILT_IN_CLASS_METHODS) == list(library.BUILT_IN_CLASSES)
+  for name, methods in library.BUILT_IN_CLASS_METHODS.items():
+    assert methods == tuple(library.BUILT_IN_CLASSES[name].methods), name
+
+
+def test_system_prompt_does_not_create_built_in_classes(monkeypatch):
+  def fail():
+    raise AssertionError("Built-in class created")
+
+  monkeypatch.setattr(
+      library,
+      "BUILT_IN_CLASSES",
+      camel_value.LazyMapping(dict.fromkeys(library.BUILT_IN_CLASSES, fail)),
+  )
+  prompts._get_built_ins_lists.cache_clear()  # pylint: disable=protected-access
+  prompt = prompts.generate_camel_system_prompt([])
+  assert "    - `strftime`" in prompt
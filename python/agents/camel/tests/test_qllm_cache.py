@@ -0,0 +1,217 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the caches of Q-LLM responses."""
+
+from collections.abc import Callable
+import os
+import subprocess
+import sys
+
+from camel.camel_agent import camel_agent
+from camel.camel_agent import qllm_cache
+from camel.camel_library import security_policy
+from camel.camel_library.capabilities import readers
+from camel.camel_library.capabilities import sources
+from camel.camel_library.interpreter import interpreter
+import pytest
+
+_TOOL = sources.Tool("read_document")
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 1000.0
+
+  def time(self) -> float:
+    return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch) -> _FakeClock:
+  clock = _FakeClock()
+  monkeypatch.setattr(qllm_cache, "time", clock)
+  return clock
+
+
+def test_key_depends_on_the_inputs_labels():
+  key = qllm_cache.make_cache_key(
+      "query", "str", readers.Public(), frozenset({_TOOL})
+  )
+
+  assert key == qllm_cache.make_cache_key(
+      "query", "str", readers.Public(), frozenset({_TOOL})
+  )
+  assert key != qllm_cache.make_cache_key(
+      "query", "int", readers.Public(), frozenset({_TOOL})
+  )
+  assert key != qllm_cache.make_cache_key(
+      "query", "str", frozenset({"a@example.com"}), frozenset({_TOOL})
+  )
+  assert key != qllm_cache.make_cache_key(
+      "query",
+      "str",
+      readers.Public(),
+      frozenset({_TOOL, sources.SourceEnum.USER}),
+  )
+
+
+def test_key_does_not_depend_on_the_order_of_the_labels():
+  assert qllm_cache.make_cache_key(
+      "query",
+      "str",
+      frozenset({"a@example.com", "b@example.com"}),
+      frozenset({_TOOL, sources.SourceEnum.USER}),
+  ) == qllm_cache.make_cache_key(
+      "query",
+      "str",
+      frozenset({"b@example.com", "a@example.com"}),
+      frozenset({sources.SourceEnum.USER, _TOOL}),
+  )
+
+
+_KEY_SCRIPT = """
+from camel.camel_agent import qllm_cache
+from camel.camel_library.capabilities import sources
+
+tool = sources.Tool(
+    "read_email", frozenset({"a@example.com", "b@example.com", "c@example.com"})
+)
+print(qllm_cache.make_cache_key(
+    "query",
+    "str",
+    frozenset({"a@example.com", "b@example.com", "c@example.com"}),
+    frozenset({tool, sources.Tool("search"), sources.SourceEnum.USER}),
+))
+"""
+
+
+def test_key_is_the_same_in_every_process():
+  # Set iteration order depends on the hash seed of the process.
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  keys = set()
+  for hash_seed in ("1", "2", "3"):
+    env = dict(os.environ, PYTHONHASHSEED=hash_seed, PYTHONPATH=root)
+    keys.add(
+        subprocess.run(
+            [sys.executable, "-c", _KEY_SCRIPT],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    )
+  assert len(keys) == 1
+
+
+@pytest.fixture(name="cache", params=["memory", "sqlite"])
+def fixture_cache(
+    request, tmp_path, clock
+) -> Callable[..., qllm_cache.QllmCache]:
+  del clock  # Only needed to control expiration.
+
+  def make_cache(**kwargs) -> qllm_cache.QllmCache:
+    if request.param == "memory":
+      return qllm_cache.InMemoryQllmCache(**kwargs)
+    cache = qllm_cache.SqliteQllmCache(str(tmp_path / "cache.db"), **kwargs)
+    request.addfinalizer(cache.close)
+    return cache
+
+  return make_cache
+
+
+def test_get_returns_set_response(cache):
+  c = cache()
+  assert c.get("key") is None
+
+  c.set("key", "response")
+
+  assert c.get("key") == "response"
+  assert isinstance(c, qllm_cache.QllmCache)
+
+
+def test_evicts_least_recently_used(cache, clock):
+  c = cache(max_entries=2)
+  c.set("a", "1")
+  clock.now += 1
+  c.set("b", "2")
+  clock.now += 1
+  c.get("a")
+  clock.now += 1
+
+  c.set("c", "3")
+
+  assert c.get("a") == "1"
+  assert c.get("b") is None
+  assert c.get("c") == "3"
+
+
+def test_responses_expire(cache, clock):
+  c = cache(ttl_seconds=10)
+  c.set("key", "response")
+
+  clock.now += 9
+  assert c.get("key") == "response"
+  clock.now += 1
+  assert c.get("key") is None
+
+
+def test_sqlite_cache_persists(tmp_path):
+  path = str(tmp_path / "cache.db")
+  cache = qllm_cache.SqliteQllmCache(path)
+  cache.set("key", "response")
+  cache.close()
+
+  cache = qllm_cache.SqliteQllmCache(path)
+  try:
+    assert cache.get("key") == "response"
+  finally:
+    cache.close()
+
+
+def test_query_ai_assistant_uses_cached_response(monkeypatch):
+  def run(self, query, output_schema):
+    raise AssertionError(f"The Q-LLM was queried: {query}, {output_schema}")
+
+  monkeypatch.setattr(camel_agent.QuarantinedLlmService, "run", run)
+  cache = qllm_cache.InMemoryQllmCache()
+  # The literals in the code are public, and come from the user.
+  cache.set(
+      qllm_cache.make_cache_key(
+          "How many?",
+          "int",
+          readers.Public(),
+          frozenset({sources.SourceEnum.USER}),
+      ),
+      "42",
+  )
+  service = camel_agent.CaMelInterpreterService(
+      model="gemini-2.5-flash",
+      tools=[],
+      eval_args=interpreter.EvalArgs(
+          security_policy_engine=security_policy.NoSecurityPolicyEngine(),
+          eval_mode=interpreter.DependenciesPropagationMode.NORMAL,
+      ),
+      qllm_result_cache=cache,
+  )
+
+  output, _, error, _, _ = service.execute_code(
+      "```python\nprint(query_ai_assistant('How many?', 'int') + 1)\n```",
+      [],
+      (),
+  )
+
+  assert error is None
+  assert output == "43"
@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the pool of Q-LLM sessions."""
+
+import asyncio
+
+from camel.camel_agent import session_pool
+from google.adk.events import event
+from google.adk.sessions import in_memory_session_service
+import pytest
+
+_APP_NAME = "app"
+_USER_ID = "user"
+
+
+def _make_pool(size: int) -> session_pool.SessionPool:
+  return session_pool.SessionPool(
+      in_memory_session_service.InMemorySessionService(),
+      _APP_NAME,
+      _USER_ID,
+      size,
+  )
+
+
+def test_rejects_empty_pool():
+  with pytest.raises(ValueError):
+    _make_pool(0)
+
+
+def test_reuses_released_session():
+  pool = _make_pool(2)
+
+  async def run() -> list[str]:
+    session_ids = []
+    for _ in range(3):
+      async with pool.session() as session_id:
+        session_ids.append(session_id)
+    return session_ids
+
+  session_ids = asyncio.run(run())
+
+  assert len(set(session_ids)) == 1
+  metrics = pool.metrics()
+  assert metrics.created == 1
+  assert metrics.in_use == 0
+  assert metrics.acquisitions == 3
+
+
+def test_released_session_is_reset():
+  service = in_memory_session_service.InMemorySessionService()
+  pool = session_pool.SessionPool(service, _APP_NAME, _USER_ID, 1)
+
+  async def run() -> str:
+    async with pool.session() as session_id:
+      session = await service.get_session(
+          app_name=_APP_NAME, user_id=_USER_ID, session_id=session_id
+      )
+      await service.append_event(
+          session, event.Event(author="user", invocation_id="query")
+      )
+      stored = service.sessions[_APP_NAME][_USER_ID][session_id]
+      stored.state["key"] = "value"
+      assert stored.events
+    return session_id
+
+  session_id = asyncio.run(run())
+
+  stored = service.sessions[_APP_NAME][_USER_ID][session_id]
+  assert not stored.events
+  assert not stored.state
+
+
+def test_concurrent_queries_wait_for_a_session():
+  pool = _make_pool(2)
+  max_in_use = 0
+
+  async def query() -> None:
+    nonlocal max_in_use
+    async with pool.session():
+      max_in_use = max(max_in_use, pool.metrics().in_use)
+      await asyncio.sleep(0.01)
+
+  async def run() -> None:
+    await asyncio.gather(*(query() for _ in range(6)))
+
+  asyncio.run(run())
+
+  metrics = pool.metrics()
+  assert max_in_use == 2
+  assert metrics.created == 2
+  assert metrics.in_use == 0
+  assert metrics.waiting == 0
+  assert metrics.acquisitions == 6
+  assert metrics.waits == 4
+
+
+def test_cancelled_waiter_does_not_keep_a_session():
+  pool = _make_pool(1)
+
+  async def run() -> None:
+    session_id = await pool.acquire()
+    waiter = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+      await waiter
+    await pool.release(session_id)
+    async with pool.session() as next_session_id:
+      assert next_session_id == session_id
+
+  asyncio.run(run())
+
+  metrics = pool.metrics()
+  assert metrics.in_use == 0
+  assert metrics.waiting == 0
+
+
+def test_sessions_are_shared_across_event_loops():
+  pool = _make_pool(1)
+
+  async def query() -> str:
+    async with pool.session() as session_id:
+      return session_id
+
+  session_ids = {asyncio.run(query()) for _ in range(3)}
+
+  assert len(session_ids) == 1
+  assert pool.metrics().created == 1
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the persistent chain of tool calls."""
+
+import asyncio
+import copy
+import pickle
+
+from camel.camel_agent import utils
+from camel.camel_library import function_types
+from camel.camel_library.interpreter import tool_calls_chain
+from google.adk.sessions import in_memory_session_service
+
+ToolCallsChain = tool_calls_chain.ToolCallsChain
+
+
+def _call(function: str, **args) -> function_types.FunctionCall:
+  return function_types.FunctionCall(
+      function=function,
+      object_type=None,
+      args=args,
+      output=None,
+      is_builtin=function == "print",
+  )
+
+
+def _long_chain(length: int) -> ToolCallsChain:
+  return ToolCallsChain().extend(
+      _call("print", value=str(i)) if i % 2 else _call("search", query=str(i))
+      for i in range(length)
+  )
+
+
+def test_append_shares_the_previous_calls():
+  first = ToolCallsChain().append(_call("search", query="a"))
+  second = first.append(_call("print", value="b"))
+  third = first.append(_call("print", value="c"))
+
+  assert len(first) == 1
+  assert list(second) == [_call("search", query="a"), _call("print", value="b")]
+  assert list(third) == [_call("search", query="a"), _call("print", value="c")]
+
+
+def test_behaves_like_a_sequence():
+  calls = [_call("search", query=str(i)) for i in range(5)]
+  chain = ToolCallsChain.of(calls)
+
+  assert ToolCallsChain.of(chain) is chain
+  assert len(chain) == 5
+  assert chain[0] == calls[0]
+  assert chain[-1] == calls[-1]
+  assert list(chain[1:3]) == calls[1:3]
+  assert chain == calls
+  assert chain != calls[:4]
+  assert not ToolCallsChain()
+
+
+def test_print_calls():
+  chain = ToolCallsChain.of([
+      _call("print", value="Hello, "),
+      _call("search", query="name"),
+      _call("print", value="World"),
+  ])
+
+  assert chain.print_calls() == [chain[0], chain[2]]
+  assert utils.extract_print_output(chain) == "Hello, World"
+  assert utils.extract_print_output(list(chain)) == "Hello, World"
+
+
+def test_only_the_last_chain_of_a_history_keeps_its_calls():
+  chains = [ToolCallsChain()]
+  for i in range(100):
+    chains.append(chains[-1].append(_call("search", query=str(i))))
+
+  for i, chain in enumerate(chains):
+    assert list(chain) == [_call("search", query=str(j)) for j in range(i)]
+  # pylint: disable-next=protected-access
+  kept = [i for i, chain in enumerate(chains) if chain._items is not None]
+  assert kept == [100]
+  assert list(chains[50]) == list(chains[-1])[:50]
+
+
+def test_long_chains_can_be_copied_and_pickled():
+  chain = _long_chain(10_000)
+
+  for copied in (copy.deepcopy(chain), pickle.loads(pickle.dumps(chain))):
+    assert isinstance(copied, ToolCallsChain)
+    assert copied == chain
+    assert len(copied.print_calls()) == 5_000
+  assert copy.copy(chain) is chain
+
+
+def test_long_chains_can_be_stored_in_the_session_state():
+  service = in_memory_session_service.InMemorySessionService()
+  chain = _long_chain(10_000)
+
+  async def run():
+    # The session service makes deep copies of the state.
+    session = await service.create_session(
+        app_name="app", user_id="user", state={"function_calls": chain}
+    )
+    return await service.get_session(
+        app_name="app", user_id="user", session_id=session.id
+    )
+
+  session = asyncio.run(run())
+
+  assert session.state["function_calls"] == chain
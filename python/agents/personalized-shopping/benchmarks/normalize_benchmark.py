@@ -0,0 +1,123 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the color and size normalization of buying options.
+
+Reports the cost per call of normalizing option values as it used to be done
+("before": searching each of SIZE_PATTERNS as is), of the precompiled patterns
+without their cache, and of the memoized normalization once every value was
+seen.
+
+The `normalize` module is loaded from its file, without importing the
+`personalized_shopping` package, which loads the products. Run from the
+`personalized-shopping` agent directory with:
+
+  python benchmarks/normalize_benchmark.py
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import re
+import timeit
+
+_NORMALIZE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "personalized_shopping",
+    "shared_libraries",
+    "web_agent_site",
+    "engine",
+    "normalize.py",
+)
+
+# Words found in option values besides colors and sizes.
+_OTHER_WORDS = ["pack of 2", "cotton", "with lid", "3.5", "12", "(new)", "|"]
+
+
+def _load_normalize():
+    spec = importlib.util.spec_from_file_location("normalize", _NORMALIZE_PATH)
+    normalize = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(normalize)
+    return normalize
+
+
+def _option_values(normalize, count, seed=0):
+    """Option values made of colors, sizes and other words"""
+    rng = random.Random(seed)
+    words = normalize.COLOR_SET + normalize.SIZE_SET + _OTHER_WORDS
+    return [" ".join(rng.choices(words, k=rng.randint(1, 4))) for _ in range(count)]
+
+
+def color_before(normalize, color_string):
+    """Normalizes a color by checking each of COLOR_SET"""
+    for norm_color in normalize.COLOR_SET:
+        if norm_color in color_string:
+            return norm_color
+    return color_string
+
+
+def size_before(normalize, size_string):
+    """Normalizes a size by searching each of SIZE_PATTERNS"""
+    for pattern in normalize.SIZE_PATTERNS:
+        if re.search(pattern, size_string) is not None:
+            return pattern.pattern
+    if size_string.replace(".", "", 1).isdigit():
+        return "numeric_size"
+    return "not_matched"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--values", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    normalize = _load_normalize()
+    values = _option_values(normalize, args.values)
+    for value in values:
+        assert normalize.normalize_color(value) == color_before(normalize, value)
+        assert normalize.normalize_size(value) == size_before(normalize, value)
+
+    # Memoized functions are timed once all the values are cached.
+    cases = {
+        "color": {
+            "before": lambda v: color_before(normalize, v),
+            "uncached": normalize._find_color,
+            "memoized": normalize.normalize_color,
+        },
+        "size": {
+            "before": lambda v: size_before(normalize, v),
+            "uncached": normalize.normalize_size.__wrapped__,
+            "memoized": normalize.normalize_size,
+        },
+    }
+    print(f"{'':6} {'before':>10} {'uncached':>10} {'memoized':>10}  (us/call)")
+    for name, functions in cases.items():
+        costs = []
+        for function in functions.values():
+            seconds = min(
+                timeit.repeat(
+                    lambda: [function(v) for v in values],
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            costs.append(seconds / len(values) * 1e6)
+        print(f"{name:6} {costs[0]:10.2f} {costs[1]:10.2f} {costs[2]:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
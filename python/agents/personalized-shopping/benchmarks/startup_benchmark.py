@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the startup of the simulated WebShop server.
+
+Reports the time to load the products, to build their goals, and to construct
+a whole `SimServer` (which also opens the search engine and samples the goals
+of its sessions), and the peak memory of the process. The products are read from
+the catalog when it is fresh (see `web_agent_site.engine.catalog`), otherwise
+from the items file.
+
+`web_agent_site` is imported from `shared_libraries`, without importing the
+`personalized_shopping` package, which loads the products. The data files and
+search indexes must be set up as in the README. Run from the
+`personalized-shopping` agent directory with:
+
+  python benchmarks/startup_benchmark.py
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "personalized_shopping",
+        "shared_libraries",
+    ),
+)
+
+from web_agent_site.engine.engine import load_products  # noqa: E402
+from web_agent_site.engine.goal import get_goals  # noqa: E402
+from web_agent_site.envs.web_agent_text_env import SimServer  # noqa: E402
+from web_agent_site.utils import DEFAULT_FILE_PATH  # noqa: E402
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-products", type=int, default=50000)
+    parser.add_argument("--human-goals", action="store_true")
+    args = parser.parse_args()
+
+    (products, _, prices, _), load_seconds = _timed(
+        lambda: load_products(DEFAULT_FILE_PATH, args.num_products, args.human_goals)
+    )
+    goals, goals_seconds = _timed(lambda: get_goals(products, prices, args.human_goals))
+    print(f"load_products {load_seconds:8.2f} s  ({len(products)} products)")
+    print(f"get_goals     {goals_seconds:8.2f} s  ({len(goals)} goals)")
+    del products, prices, goals
+    gc.collect()
+
+    # Like the environment of `init_env`.
+    _, server_seconds = _timed(
+        lambda: SimServer(
+            "http://127.0.0.1:3000",
+            DEFAULT_FILE_PATH,
+            num_products=args.num_products,
+            human_goals=args.human_goals,
+            structured_pages=True,
+        )
+    )
+    print(f"SimServer     {server_seconds:8.2f} s")
+    # Kilobytes on Linux.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"max RSS       {max_rss / 1024:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
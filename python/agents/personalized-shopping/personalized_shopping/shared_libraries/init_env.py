@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+import contextlib
+import threading
+
 import gym
 
 gym.envs.registration.register(
@@ -22,11 +26,14 @@ gym.envs.registration.register(
 )
 
 
-def init_env(num_products):
+def init_env(num_products, server=None, session=None):
     env = gym.make(
         "WebAgentTextEnv-v0",
         observation_mode="text",
         num_products=num_products,
+        structured_pages=True,
+        server=server,
+        session=session,
     )
     return env
 
@@ -35,3 +42,91 @@ num_product_items = 50000
 webshop_env = init_env(num_product_items)
 webshop_env.reset()
 print(f"Finished initializing WebshopEnv with {num_product_items} items.")
+
+# Environments of the ADK sessions, by session ID, the most recently used last.
+# They all share the server of `webshop_env`, so the products are only loaded
+# once. ADK doesn't tell when a session ends, so past `MAX_SESSION_ENVS`, the
+# environment of the session used least recently is closed, unless an action
+# of the session is using it (see `use_webshop_env`).
+MAX_SESSION_ENVS = 256
+_session_envs = OrderedDict()
+# Number of actions using the environment of each session.
+_session_env_users = dict()
+_session_envs_lock = threading.Lock()
+
+
+def _get_session_env(session_id):
+    # Called with `_session_envs_lock` held.
+    env = _session_envs.get(session_id)
+    if env is None:
+        env = init_env(num_product_items, server=webshop_env.server, session=session_id)
+        # `gym.make` wraps the environment, which only steps once the wrapper
+        # was reset.
+        env.reset(session=session_id)
+        _session_envs[session_id] = env
+    else:
+        _session_envs.move_to_end(session_id)
+    return env
+
+
+def _pop_evicted_envs():
+    # Called with `_session_envs_lock` held. Environments in use are skipped,
+    # they are evicted once they are not.
+    evicted_envs = []
+    if len(_session_envs) > MAX_SESSION_ENVS:
+        for session_id in list(_session_envs):
+            if session_id not in _session_env_users:
+                evicted_envs.append(_session_envs.pop(session_id))
+                if len(_session_envs) <= MAX_SESSION_ENVS:
+                    break
+    return evicted_envs
+
+
+def _close_envs(envs):
+    # Closing waits for the running action of the session, if any.
+    for env in envs:
+        env.close()
+
+
+def get_webshop_env(session_id):
+    """Returns the environment of an ADK session, creating it on first use.
+
+    A session whose environment was closed gets a new one, at the search page.
+    The environment may be closed as soon as other sessions need one; actions
+    use `use_webshop_env` instead.
+    """
+    with _session_envs_lock:
+        env = _get_session_env(session_id)
+        evicted_envs = _pop_evicted_envs()
+    _close_envs(evicted_envs)
+    return env
+
+
+@contextlib.contextmanager
+def use_webshop_env(session_id):
+    """Yields the environment of an ADK session, like `get_webshop_env`.
+
+    The environment isn't closed for other sessions until the block ends.
+    """
+    with _session_envs_lock:
+        env = _get_session_env(session_id)
+        _session_env_users[session_id] = _session_env_users.get(session_id, 0) + 1
+        evicted_envs = _pop_evicted_envs()
+    _close_envs(evicted_envs)
+    try:
+        yield env
+    finally:
+        with _session_envs_lock:
+            _session_env_users[session_id] -= 1
+            if _session_env_users[session_id] == 0:
+                del _session_env_users[session_id]
+            evicted_envs = _pop_evicted_envs()
+        _close_envs(evicted_envs)
+
+
+def close_webshop_env(session_id):
+    """Closes the environment of an ADK session, if it has one."""
+    with _session_envs_lock:
+        env = _session_envs.pop(session_id, None)
+    if env is not None:
+        env.close()
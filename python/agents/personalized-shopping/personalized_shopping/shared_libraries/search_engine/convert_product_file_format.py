@@ -12,18 +12,106 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Converts the products to the documents indexed by the search engine.
+
+The items file is read one product at a time, and each document is written
+once to every resources directory whose size it fits in, so the products are
+never all in memory. Documents only have the fields the search engine needs,
+the product itself is read from the items file (or catalog) by the web
+environment.
+
+Run from the `search_engine` directory, then index the documents with
+`run_indexing.sh`:
+
+    python convert_product_file_format.py [--items items file]
+
+With `--append`, the products missing from the documents of each size are
+appended to them, and also written to `resources_<size>_append` directories,
+which `run_indexing.sh --append` adds to the existing indexes. This assumes
+new products were appended to the items file.
+"""
+
+import argparse
 import json
+import os
 import sys
-from tqdm import tqdm
 
 sys.path.insert(0, "../")
 
-from web_agent_site.engine.engine import load_products
+from web_agent_site.engine.engine import _iter_processed_products
+
+DEFAULT_ITEMS_PATH = "../data/items_shuffle.json"
+DOCUMENTS_FILE = "documents.jsonl"
+APPEND_SUFFIX = "_append"
+
+# Resources directory of each index, with its number of products.
+RESOURCES = {
+    "resources_100": 100,
+    "resources_1k": 1000,
+    "resources_10k": 10000,
+    "resources_50k": 50000,
+}
+
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = " \t\n\r"
+# Characters a number may continue with, in the next chunk.
+_NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+def iter_json_array(f, chunk_size=_CHUNK_SIZE):
+    """Yields the elements of the JSON array in the file `f`, one at a time."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
 
-all_products, *_ = load_products(filepath="../data/items_shuffle.json")
+    def next_token():
+        # Skips whitespace, reading chunks until a token is found.
+        nonlocal buffer, position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            buffer, position = f.read(chunk_size), 0
+            if not buffer:
+                raise ValueError("Unexpected end of the JSON array")
 
-docs = []
-for p in tqdm(all_products, total=len(all_products)):
+    def read_chunk():
+        # Appends the next chunk to the buffer, from `position`.
+        nonlocal buffer, position
+        chunk = f.read(chunk_size)
+        buffer, position = buffer[position:] + chunk, 0
+        return bool(chunk)
+
+    if next_token() != "[":
+        raise ValueError("Expected a JSON array")
+    position += 1
+    if next_token() == "]":
+        return
+    while True:
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element continues in the next chunk.
+            if not read_chunk():
+                raise
+            continue
+        if not buffer[end:].lstrip(_NUMBER_CHARACTERS) and read_chunk():
+            # A number at the end of the buffer may continue in the next chunk.
+            continue
+        position = end
+        separator = next_token()
+        if separator not in ",]":
+            raise ValueError(f"Expected ',' or ']' after an element, got {separator!r}")
+        position += 1
+        yield element
+        if separator == "]":
+            return
+        next_token()
+
+
+def product_document(p):
+    """Document of a processed product, as indexed by the search engine."""
     option_texts = []
     options = p.get("options", {})
     for option_name, option_contents in options.items():
@@ -41,21 +129,76 @@ for p in tqdm(all_products, total=len(all_products)):
             option_text,
         ]
     ).lower()
-    doc["product"] = p
-    docs.append(doc)
+    return doc
+
+
+def iter_documents(items_path, num_products):
+    """Yields the documents of the first `num_products` products."""
+    with open(items_path) as f:
+        # The attributes of the products aren't part of the documents.
+        products = _iter_processed_products(iter_json_array(f), attributes={})
+        for n, (_, p) in enumerate(products):
+            if n >= num_products:
+                return
+            yield product_document(p)
+
+
+def _indexed_asins(documents_path):
+    if not os.path.exists(documents_path):
+        return set()
+    with open(documents_path) as f:
+        return {json.loads(line)["id"] for line in f}
+
+
+def convert(items_path, append=False):
+    """Writes the documents of all the resources directories in one pass."""
+    files = dict()
+    indexed = dict()
+    try:
+        for resources, num_products in RESOURCES.items():
+            os.makedirs(resources, exist_ok=True)
+            documents_path = os.path.join(resources, DOCUMENTS_FILE)
+            if append:
+                indexed[resources] = _indexed_asins(documents_path)
+                os.makedirs(resources + APPEND_SUFFIX, exist_ok=True)
+                files[resources] = (
+                    open(documents_path, "a"),
+                    open(os.path.join(resources + APPEND_SUFFIX, DOCUMENTS_FILE), "w"),
+                )
+            else:
+                files[resources] = (open(documents_path, "w"),)
+
+        added = dict.fromkeys(RESOURCES, 0)
+        docs = iter_documents(items_path, max(RESOURCES.values()))
+        for i, doc in enumerate(docs):
+            line = json.dumps(doc) + "\n"
+            for resources, num_products in RESOURCES.items():
+                if i >= num_products:
+                    continue
+                if append and doc["id"] in indexed[resources]:
+                    continue
+                for f in files[resources]:
+                    f.write(line)
+                added[resources] += 1
+    finally:
+        for resources_files in files.values():
+            for f in resources_files:
+                f.close()
+    for resources, count in added.items():
+        print(f"{count} documents {'appended to' if append else 'in'} {resources}.")
 
-with open("./resources_100/documents.jsonl", "w+") as f:
-    for doc in docs[:100]:
-        f.write(json.dumps(doc) + "\n")
 
-with open("./resources_1k/documents.jsonl", "w+") as f:
-    for doc in docs[:1000]:
-        f.write(json.dumps(doc) + "\n")
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", default=DEFAULT_ITEMS_PATH)
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Only add the products missing from the documents",
+    )
+    args = parser.parse_args()
+    convert(args.items, append=args.append)
 
-with open("./resources_10k/documents.jsonl", "w+") as f:
-    for doc in docs[:10000]:
-        f.write(json.dumps(doc) + "\n")
 
-with open("./resources_50k/documents.jsonl", "w+") as f:
-    for doc in docs[:50000]:
-        f.write(json.dumps(doc) + "\n")
+if __name__ == "__main__":
+    main()
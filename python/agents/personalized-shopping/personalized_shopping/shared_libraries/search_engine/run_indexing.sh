@@ -13,35 +13,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Indexes the documents written by convert_product_file_format.py. With
+# --append, only the documents it appended (to resources_<size>_append) are
+# added to the existing indexes, instead of rebuilding them.
+set -e
 
-python -m pyserini.index.lucene \
-  --collection JsonCollection \
-  --input resources_100 \
-  --index indexes_100 \
-  --generator DefaultLuceneDocumentGenerator \
-  --threads 1 \
-  --storePositions --storeDocvectors --storeRaw
+if [ "$1" == "--append" ]; then
+  suffix="_append"
+  append="--append"
+else
+  suffix=""
+  append=""
+fi
 
-python -m pyserini.index.lucene \
-  --collection JsonCollection \
-  --input resources_1k \
-  --index indexes_1k \
-  --generator DefaultLuceneDocumentGenerator \
-  --threads 1 \
-  --storePositions --storeDocvectors --storeRaw
-
-python -m pyserini.index.lucene \
-  --collection JsonCollection \
-  --input resources_10k \
-  --index indexes_10k \
-  --generator DefaultLuceneDocumentGenerator \
-  --threads 1 \
-  --storePositions --storeDocvectors --storeRaw
-
-python -m pyserini.index.lucene \
-  --collection JsonCollection \
-  --input resources_50k \
-  --index indexes_50k \
-  --generator DefaultLuceneDocumentGenerator \
-  --threads 1 \
-  --storePositions --storeDocvectors --storeRaw
+for size in 100 1k 10k 50k; do
+  input="resources_${size}${suffix}"
+  if [ -n "$append" ] && [ ! -s "$input/documents.jsonl" ]; then
+    echo "No documents to append to indexes_${size}."
+    continue
+  fi
+  python -m pyserini.index.lucene \
+    --collection JsonCollection \
+    --input "$input" \
+    --index "indexes_${size}" \
+    --generator DefaultLuceneDocumentGenerator \
+    --threads 1 \
+    --storePositions --storeDocvectors --storeRaw \
+    $append
+done
@@ -0,0 +1,483 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Product catalog preprocessed into a memory-mapped sqlite file.
+
+Loading the items file parses and processes every product on each start. The
+catalog stores the processed products once, with the attribute index and the
+pricing of each product, so that starting only reads the asins and pricings,
+and products are decoded lazily, when they are accessed. The fields of the
+products that goals are made of have columns of their own, so goals are built
+without decoding any product. It also stores the nouns of the product names,
+which the type reward of goals compares.
+
+Build the catalog next to the default items file, from the `shared_libraries`
+directory, with:
+
+    python -m web_agent_site.engine.catalog [items file]
+"""
+
+from collections import defaultdict
+from collections.abc import Iterator, Mapping, Sequence
+import functools
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+CATALOG_VERSION = 3
+CATALOG_SUFFIX = ".catalog.sqlite"
+
+# sqlite clamps this to the size of the file, and to its compile time limit.
+_MMAP_SIZE = 1 << 40
+_PRODUCT_CACHE_SIZE = 4096
+_BATCH_SIZE = 1000
+
+# The products are stored last, so that reading the other columns doesn't go
+# through the pages of their JSON.
+_SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE products (
+    position INTEGER PRIMARY KEY,
+    source_index INTEGER NOT NULL,
+    asin TEXT NOT NULL UNIQUE,
+    category TEXT,
+    query TEXT,
+    name TEXT,
+    title TEXT,
+    product_category TEXT,
+    options TEXT NOT NULL,
+    pricing TEXT NOT NULL,
+    human_instructions TEXT,
+    instruction_text TEXT,
+    instruction_attributes TEXT,
+    product TEXT NOT NULL
+);
+CREATE TABLE attributes (
+    attribute TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE type_nouns (name TEXT PRIMARY KEY, nouns TEXT NOT NULL);
+"""
+
+_INDEXES = """
+CREATE INDEX attributes_by_attribute ON attributes (attribute, position);
+"""
+
+
+def catalog_path_for(filepath):
+    """Returns the path of the catalog built from the items file `filepath`."""
+    return os.path.splitext(filepath)[0] + CATALOG_SUFFIX
+
+
+def _source_stats(source_paths):
+    stats = {}
+    for path in source_paths:
+        stat = os.stat(path)
+        stats[os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def write_catalog(catalog_path, products, source_paths, type_nouns=None):
+    """Writes processed products to a new catalog at `catalog_path`.
+
+    Arguments:
+
+    catalog_path (`str`) -- Where to write the catalog. Replaced atomically.
+    products (`Iterable[tuple[int, dict, dict]]`) -- The index of each product
+      in the items file, the processed product, and its instruction fields
+      (`instructions`, `instruction_text` and `instruction_attributes`) for
+      human and synthetic goals.
+    source_paths (`list[str]`) -- The files the products were built from; the
+      catalog is stale when any of them changes.
+    type_nouns (`func`) -- Returns the nouns of each of a batch of product
+      names, as a `dict`. No nouns are stored without it.
+    """
+    tmp_path = f"{catalog_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript(_SCHEMA)
+        product_rows = []
+        attribute_rows = []
+        names = []
+
+        def flush():
+            connection.executemany(
+                "INSERT INTO products "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                product_rows,
+            )
+            connection.executemany(
+                "INSERT INTO attributes VALUES (?, ?)", attribute_rows
+            )
+            if type_nouns is not None:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO type_nouns VALUES (?, ?)",
+                    [
+                        (name, json.dumps(nouns))
+                        for name, nouns in type_nouns(names).items()
+                    ],
+                )
+            product_rows.clear()
+            attribute_rows.clear()
+            names.clear()
+
+        for position, (source_index, product, instructions) in enumerate(products):
+            human_instructions = instructions.get("instructions")
+            instruction_attributes = instructions.get("instruction_attributes")
+            product_rows.append(
+                (
+                    position,
+                    source_index,
+                    product["asin"],
+                    product["category"],
+                    product["query"],
+                    product["name"],
+                    product["Title"],
+                    product["product_category"],
+                    json.dumps(product["options"]),
+                    json.dumps(product["pricing"]),
+                    (
+                        None
+                        if human_instructions is None
+                        else json.dumps(human_instructions)
+                    ),
+                    instructions.get("instruction_text"),
+                    (
+                        None
+                        if instruction_attributes is None
+                        else json.dumps(instruction_attributes)
+                    ),
+                    json.dumps(product),
+                )
+            )
+            attribute_rows.extend(
+                (attribute, position) for attribute in product["Attributes"]
+            )
+            names.append(product["name"])
+            if len(product_rows) >= _BATCH_SIZE:
+                flush()
+        flush()
+        connection.executescript(_INDEXES)
+        connection.executemany(
+            "INSERT INTO metadata VALUES (?, ?)",
+            [
+                ("version", str(CATALOG_VERSION)),
+                ("sources", json.dumps(_source_stats(source_paths))),
+            ],
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, catalog_path)
+
+
+def is_catalog_fresh(catalog_path, source_paths):
+    """Returns whether the catalog exists and was built from `source_paths`."""
+    if not os.path.exists(catalog_path):
+        return False
+    try:
+        connection = sqlite3.connect(f"file:{catalog_path}?mode=ro", uri=True)
+        try:
+            metadata = dict(connection.execute("SELECT key, value FROM metadata"))
+        finally:
+            connection.close()
+        return metadata.get("version") == str(CATALOG_VERSION) and json.loads(
+            metadata.get("sources", "null")
+        ) == _source_stats(source_paths)
+    except (sqlite3.Error, OSError):
+        return False
+
+
+class ProductIndex:
+    """Asins of the products by category, query and attribute.
+
+    Each mapping lists the asins in the order of the products, so special
+    searches (`<c>`, `<q>` and `<a>`) return products in the same order as
+    scanning all of them would.
+    """
+
+    def __init__(self, category_to_asins, query_to_asins, attribute_to_asins):
+        self.category_to_asins = category_to_asins
+        self.query_to_asins = query_to_asins
+        self.attribute_to_asins = attribute_to_asins
+
+    @classmethod
+    def from_products(cls, products):
+        """Builds the index of processed products in one pass over them."""
+        category_to_asins = defaultdict(list)
+        query_to_asins = defaultdict(list)
+        attribute_to_asins = defaultdict(list)
+        for p in products:
+            asin = p["asin"]
+            category_to_asins[p["category"]].append(asin)
+            query_to_asins[p["query"]].append(asin)
+            # A product is listed once, even if an attribute is repeated.
+            for attribute in dict.fromkeys(p["Attributes"]):
+                attribute_to_asins[attribute].append(asin)
+        return cls(
+            dict(category_to_asins), dict(query_to_asins), dict(attribute_to_asins)
+        )
+
+
+class ProductCatalog:
+    """Read-only view of a catalog, decoding products only when accessed.
+
+    The catalog is shared by all the threads of the process, which read it
+    through a single memory-mapped connection.
+    """
+
+    def __init__(self, catalog_path, num_products=None, human_goals=True):
+        """Opens the catalog.
+
+        Arguments:
+
+        catalog_path (`str`) -- The catalog, written by `write_catalog`.
+        num_products (`int`) -- Only use the products among the first
+          `num_products` of the items file, like `load_products`.
+        human_goals (`bool`) -- Whether products get the instructions of human
+          goals, or of synthetic ones.
+        """
+        self._connection = sqlite3.connect(
+            f"file:{catalog_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._connection.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+        self._lock = threading.Lock()
+        self._human_goals = human_goals
+        self._max_source_index = sys.maxsize if num_products is None else num_products
+        rows = self._execute(
+            "SELECT asin, pricing, category, query FROM products "
+            "WHERE source_index < ? ORDER BY position",
+            (self._max_source_index,),
+        )
+        self.asins = [asin for asin, *_ in rows]
+        self.pricings = [json.loads(pricing) for _, pricing, *_ in rows]
+        self._positions = {asin: i for i, asin in enumerate(self.asins)}
+        category_to_asins = defaultdict(list)
+        query_to_asins = defaultdict(list)
+        for asin, _, category, query in rows:
+            category_to_asins[category].append(asin)
+            query_to_asins[query].append(asin)
+        self._get_product = functools.lru_cache(maxsize=_PRODUCT_CACHE_SIZE)(
+            self._load_product
+        )
+        self.products = _CatalogProducts(self)
+        self.product_item_dict = _CatalogProductDict(self)
+        # Attributes are looked up in the catalog, there are too many of them
+        # to read them all up front.
+        self.product_index = ProductIndex(
+            dict(category_to_asins), dict(query_to_asins), _CatalogAttributes(self)
+        )
+        self.type_nouns = _CatalogTypeNouns(self)
+
+    def _execute(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _materialize(self, row):
+        product, *instructions = row
+        return self._add_instructions(json.loads(product), *instructions)
+
+    def _add_instructions(
+        self, product, human_instructions, instruction_text, instruction_attributes
+    ):
+        if self._human_goals:
+            if human_instructions is not None:
+                product["instructions"] = json.loads(human_instructions)
+        else:
+            product["instruction_text"] = instruction_text
+            product["instruction_attributes"] = (
+                None
+                if instruction_attributes is None
+                else json.loads(instruction_attributes)
+            )
+        return product
+
+    def _load_product(self, asin):
+        (row,) = self._execute(
+            "SELECT product, human_instructions, instruction_text, "
+            "instruction_attributes FROM products WHERE asin = ?",
+            (asin,),
+        )
+        return self._materialize(row)
+
+    def _iter_rows(self, columns):
+        """Yields `columns` of the products within `num_products`, in order."""
+        position = -1
+        while True:
+            rows = self._execute(
+                f"SELECT position, {columns} FROM products "
+                "WHERE source_index < ? AND position > ? ORDER BY position LIMIT ?",
+                (self._max_source_index, position, _BATCH_SIZE),
+            )
+            if not rows:
+                return
+            position = rows[-1][0]
+            for _, *row in rows:
+                yield row
+
+    def _iter_products(self):
+        # Not cached, so that iterating over all the products doesn't hold
+        # them all in memory.
+        for row in self._iter_rows(
+            "product, human_instructions, instruction_text, instruction_attributes"
+        ):
+            yield self._materialize(row)
+
+    def goal_records(self):
+        """Yields the fields of each product that goals are made of.
+
+        The records have the keys of the products read by `get_goals`, and are
+        read from their own columns, without decoding the products.
+        """
+        for (
+            asin,
+            category,
+            query,
+            name,
+            title,
+            product_category,
+            options,
+            *instructions,
+        ) in self._iter_rows(
+            "asin, category, query, name, title, product_category, options, "
+            "human_instructions, instruction_text, instruction_attributes"
+        ):
+            record = {
+                "asin": asin,
+                "category": category,
+                "query": query,
+                "name": name,
+                "Title": title,
+                "product_category": product_category,
+                "options": json.loads(options),
+            }
+            yield self._add_instructions(record, *instructions)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class _CatalogProducts(Sequence):
+    """The products of a catalog, in the order of the items file."""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+    def __len__(self):
+        return len(self._catalog.asins)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._catalog._get_product(a) for a in self._catalog.asins[index]]
+        return self._catalog._get_product(self._catalog.asins[index])
+
+    def __iter__(self) -> Iterator[dict]:
+        return self._catalog._iter_products()
+
+    def goal_records(self):
+        """Same as `ProductCatalog.goal_records`."""
+        return self._catalog.goal_records()
+
+
+class _CatalogProductDict(Mapping):
+    """The products of a catalog by asin."""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+    def __getitem__(self, asin):
+        if asin not in self._catalog._positions:
+            raise KeyError(asin)
+        return self._catalog._get_product(asin)
+
+    def __contains__(self, asin):
+        return asin in self._catalog._positions
+
+    def __iter__(self):
+        return iter(self._catalog.asins)
+
+    def __len__(self):
+        return len(self._catalog.asins)
+
+
+class _CatalogAttributes(Mapping):
+    """The asins of the products of a catalog by attribute, in product order."""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+    def __getitem__(self, attribute):
+        rows = self._catalog._execute(
+            "SELECT products.asin FROM attributes JOIN products "
+            "ON attributes.position = products.position "
+            "WHERE attributes.attribute = ? AND products.source_index < ? "
+            "GROUP BY attributes.position ORDER BY attributes.position",
+            (attribute, self._catalog._max_source_index),
+        )
+        if not rows:
+            raise KeyError(attribute)
+        return [asin for (asin,) in rows]
+
+    def __iter__(self):
+        rows = self._catalog._execute(
+            "SELECT DISTINCT attributes.attribute FROM attributes JOIN products "
+            "ON attributes.position = products.position "
+            "WHERE products.source_index < ?",
+            (self._catalog._max_source_index,),
+        )
+        return (attribute for (attribute,) in rows)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _CatalogTypeNouns(Mapping):
+    """The nouns of the product names of a catalog, looked up by name."""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+
+    def __getitem__(self, name):
+        rows = self._catalog._execute(
+            "SELECT nouns FROM type_nouns WHERE name = ?", (name,)
+        )
+        if not rows:
+            raise KeyError(name)
+        return json.loads(rows[0][0])
+
+    def __iter__(self):
+        rows = self._catalog._execute("SELECT name FROM type_nouns")
+        return (name for (name,) in rows)
+
+    def __len__(self):
+        ((count,),) = self._catalog._execute("SELECT COUNT(*) FROM type_nouns")
+        return count
+
+
+def main():
+    from ..utils import DEFAULT_FILE_PATH
+    from .engine import build_catalog
+
+    filepath = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE_PATH
+    catalog_path = build_catalog(filepath)
+    print(f"Catalog written to {catalog_path}.")
+
+
+if __name__ == "__main__":
+    main()
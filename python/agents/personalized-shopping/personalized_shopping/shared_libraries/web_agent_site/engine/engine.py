@@ -15,14 +15,16 @@
 """ """
 
 from ast import literal_eval
-from collections import defaultdict
+from collections.abc import Sized
 from decimal import Decimal
+import functools
 import json
 import os
 import random
 import re
 
-from flask import render_template_string
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader
 from pyserini.search.lucene import LuceneSearcher
 from rich import print
 from tqdm import tqdm
@@ -32,10 +34,19 @@ from ..utils import (
     DEFAULT_ATTR_PATH,
     HUMAN_ATTR_PATH,
 )
+from .catalog import (
+    ProductCatalog,
+    ProductIndex,
+    catalog_path_for,
+    is_catalog_fresh,
+    write_catalog,
+)
+from .goal import compute_type_nouns, use_type_nouns
 
 TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
 
 SEARCH_RETURN_N = 50
+SEARCH_THREADS = min(8, os.cpu_count() or 1)
 PRODUCT_WINDOW = 10
 TOP_K_ATTR = 10
 
@@ -55,16 +66,14 @@ ACTION_TO_TEMPLATE = {
 def map_action_to_html(action, **kwargs):
     action_name, action_arg = parse_action(action)
     if action_name == "start":
-        path = os.path.join(TEMPLATE_DIR, "search_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+        html = _render_template(
+            "search_page.html",
             session_id=kwargs["session_id"],
             instruction_text=kwargs["instruction_text"],
         )
     elif action_name == "search":
-        path = os.path.join(TEMPLATE_DIR, "results_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+        html = _render_template(
+            "results_page.html",
             session_id=kwargs["session_id"],
             products=kwargs["products"],
             keywords=kwargs["keywords"],
@@ -73,9 +82,8 @@ def map_action_to_html(action, **kwargs):
             instruction_text=kwargs["instruction_text"],
         )
     elif action_name == "click" and action_arg == END_BUTTON:
-        path = os.path.join(TEMPLATE_DIR, "done_page.html")
-        html = render_template_string(
-            read_html_template(path),
+        html = _render_template(
+            "done_page.html",
             session_id=kwargs["session_id"],
             reward=kwargs["reward"],
             asin=kwargs["asin"],
@@ -90,9 +98,8 @@ def map_action_to_html(action, **kwargs):
             product_category=kwargs.get("product_category"),
         )
     elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
-        path = os.path.join(TEMPLATE_DIR, ACTION_TO_TEMPLATE[action_arg])
-        html = render_template_string(
-            read_html_template(path),
+        html = _render_template(
+            ACTION_TO_TEMPLATE[action_arg],
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -102,9 +109,8 @@ def map_action_to_html(action, **kwargs):
             instruction_text=kwargs.get("instruction_text"),
         )
     elif action_name == "click":
-        path = os.path.join(TEMPLATE_DIR, "item_page.html")
-        html = render_template_string(
-            read_html_template(path),
+        html = _render_template(
+            "item_page.html",
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -119,10 +125,29 @@ def map_action_to_html(action, **kwargs):
     return html
 
 
-def read_html_template(path):
-    with open(path) as f:
-        template = f.read()
-    return template
+@functools.cache
+def _template_environment(app):
+    """Returns the Jinja environment of the templates in `TEMPLATE_DIR`.
+
+    It shares the globals of the environment of the Flask `app` (e.g.
+    `url_for`). All the templates are compiled once, when it is created, and
+    the compiled code is cached on disk for the next processes.
+    """
+    environment = app.jinja_env.overlay(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=FileSystemBytecodeCache(),
+        auto_reload=False,
+    )
+    for name in environment.list_templates():
+        environment.get_template(name)
+    return environment
+
+
+def _render_template(name, **context):
+    """Renders a template of `TEMPLATE_DIR`, like `flask.render_template`."""
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    return _template_environment(app).get_template(name).render(context)
 
 
 def parse_action(action):
@@ -159,47 +184,120 @@ def get_top_n_product_from_keywords(
     search_engine,
     all_products,
     product_item_dict,
-    attribute_to_asins=None,
+    product_index=None,
+):
+    top_n_asins = get_top_n_asins_from_keywords(
+        keywords, search_engine, all_products, product_item_dict, product_index
+    )
+    return [product_item_dict[asin] for asin in top_n_asins]
+
+
+def get_top_n_asins_from_keywords(
+    keywords,
+    search_engine,
+    all_products,
+    product_item_dict,
+    product_index=None,
 ):
+    """Returns the asins of the products found by searching `keywords`."""
+    if product_index is None and keywords[0] in ("<a>", "<c>", "<q>"):
+        product_index = ProductIndex.from_products(all_products)
     if keywords[0] == "<r>":
-        top_n_products = random.sample(all_products, k=SEARCH_RETURN_N)
+        top_n_asins = [
+            p["asin"] for p in random.sample(all_products, k=SEARCH_RETURN_N)
+        ]
     elif keywords[0] == "<a>":
         attribute = " ".join(keywords[1:]).strip()
-        asins = attribute_to_asins[attribute]
-        top_n_products = [p for p in all_products if p["asin"] in asins]
+        top_n_asins = list(product_index.attribute_to_asins.get(attribute, []))
     elif keywords[0] == "<c>":
         category = keywords[1].strip()
-        top_n_products = [p for p in all_products if p["category"] == category]
+        top_n_asins = list(product_index.category_to_asins.get(category, []))
     elif keywords[0] == "<q>":
         query = " ".join(keywords[1:]).strip()
-        top_n_products = [p for p in all_products if p["query"] == query]
+        top_n_asins = list(product_index.query_to_asins.get(query, []))
     else:
         keywords = " ".join(keywords)
         hits = search_engine.search(keywords, k=SEARCH_RETURN_N)
-        docs = [search_engine.doc(hit.docid) for hit in hits]
-        top_n_asins = [json.loads(doc.raw())["id"] for doc in docs]
-        top_n_products = [
-            product_item_dict[asin] for asin in top_n_asins if asin in product_item_dict
-        ]
-    return top_n_products
+        top_n_asins = _hits_to_asins(hits, product_item_dict)
+    return top_n_asins
+
+
+def batch_get_top_n_asins_from_keywords(
+    keywords_list,
+    search_engine,
+    all_products,
+    product_item_dict,
+    product_index=None,
+    threads=SEARCH_THREADS,
+):
+    """Returns the asins found by each search of `keywords_list`.
+
+    Text searches are run together by the search engine, with `threads`
+    threads; special searches are looked up as in
+    `get_top_n_asins_from_keywords`.
+    """
+    results = [None] * len(keywords_list)
+    queries = dict()
+    for i, keywords in enumerate(keywords_list):
+        if keywords[0] in ("<r>", "<a>", "<c>", "<q>"):
+            results[i] = get_top_n_asins_from_keywords(
+                keywords, search_engine, all_products, product_item_dict, product_index
+            )
+        else:
+            queries[str(i)] = " ".join(keywords)
+    if queries:
+        hits = search_engine.batch_search(
+            list(queries.values()),
+            list(queries),
+            k=SEARCH_RETURN_N,
+            threads=threads,
+        )
+        for qid in queries:
+            results[int(qid)] = _hits_to_asins(hits[qid], product_item_dict)
+    return results
+
+
+def _hits_to_asins(hits, product_item_dict):
+    # The documents are indexed with their asin as id (see
+    # `convert_product_file_format.py`), so the documents themselves, which
+    # hold the whole product, don't need to be fetched and decoded.
+    return [hit.docid for hit in hits if hit.docid in product_item_dict]
+
+
+def search_cache_key(keywords):
+    """Returns a key identifying the results of searching `keywords`.
+
+    Keywords giving the same results have the same key. Random searches (`<r>`)
+    have no key, as their results can't be reused.
+    """
+    if keywords[0] == "<r>":
+        return None
+    elif keywords[0] == "<c>":
+        return ("<c>", keywords[1].strip())
+    elif keywords[0] in ("<a>", "<q>"):
+        return (keywords[0], " ".join(keywords[1:]).strip())
+    else:
+        # The search engine ignores case and spacing.
+        return ("", " ".join(" ".join(keywords).lower().split()))
 
 
 def get_product_per_page(top_n_products, page):
     return top_n_products[(page - 1) * PRODUCT_WINDOW : page * PRODUCT_WINDOW]
 
 
+def _sample_price(pricing):
+    if not pricing:
+        return 100.0
+    elif len(pricing) == 1:
+        return pricing[0]
+    else:
+        return random.uniform(*pricing[:2])
+
+
 def generate_product_prices(all_products):
     product_prices = dict()
     for product in all_products:
-        asin = product["asin"]
-        pricing = product["pricing"]
-        if not pricing:
-            price = 100.0
-        elif len(pricing) == 1:
-            price = pricing[0]
-        else:
-            price = random.uniform(*pricing[:2])
-        product_prices[asin] = price
+        product_prices[product["asin"]] = _sample_price(product["pricing"])
     return product_prices
 
 
@@ -244,37 +342,24 @@ def clean_product_keys(products):
     return products
 
 
-def load_products(filepath, num_products=None, human_goals=True):
-    # TODO: move to preprocessing step -> enforce single source of truth
-    with open(filepath) as f:
-        products = json.load(f)
-    print("Products loaded.")
-    products = clean_product_keys(products)
+def _catalog_sources(filepath):
+    return [filepath, DEFAULT_ATTR_PATH, HUMAN_ATTR_PATH]
 
-    # with open(DEFAULT_REVIEW_PATH) as f:
-    #     reviews = json.load(f)
+
+def _iter_processed_products(products, attributes):
+    """Yields the index and processed version of each valid, unique product."""
     all_reviews = dict()
     all_ratings = dict()
+    # with open(DEFAULT_REVIEW_PATH) as f:
+    #     reviews = json.load(f)
     # for r in reviews:
     #     all_reviews[r['asin']] = r['reviews']
     #     all_ratings[r['asin']] = r['average_rating']
 
-    if human_goals:
-        with open(HUMAN_ATTR_PATH) as f:
-            human_attributes = json.load(f)
-    with open(DEFAULT_ATTR_PATH) as f:
-        attributes = json.load(f)
-    with open(HUMAN_ATTR_PATH) as f:
-        human_attributes = json.load(f)
-    print("Attributes loaded.")
-
     asins = set()
-    all_products = []
-    attribute_to_asins = defaultdict(set)
-    if num_products is not None:
-        # using item_shuffle.json, we assume products already shuffled
-        products = products[:num_products]
-    for i, p in tqdm(enumerate(products), total=len(products)):
+    # Products may be streamed, without a known length.
+    total = len(products) if isinstance(products, Sized) else None
+    for i, p in tqdm(enumerate(products), total=total):
         asin = p["asin"]
         if asin == "nan" or len(asin) > 10:
             continue
@@ -284,22 +369,18 @@ def load_products(filepath, num_products=None, human_goals=True):
         else:
             asins.add(asin)
 
-        products[i]["category"] = p["category"]
-        products[i]["query"] = p["query"]
-        products[i]["product_category"] = p["product_category"]
-
-        products[i]["Title"] = p["name"]
-        products[i]["Description"] = p["full_description"]
-        products[i]["Reviews"] = all_reviews.get(asin, [])
-        products[i]["Rating"] = all_ratings.get(asin, "N.A.")
-        for r in products[i]["Reviews"]:
+        p["Title"] = p["name"]
+        p["Description"] = p["full_description"]
+        p["Reviews"] = all_reviews.get(asin, [])
+        p["Rating"] = all_ratings.get(asin, "N.A.")
+        for r in p["Reviews"]:
             if "score" not in r:
                 r["score"] = r.pop("stars")
             if "review" not in r:
                 r["body"] = ""
             else:
                 r["body"] = r.pop("review")
-        products[i]["BulletPoints"] = (
+        p["BulletPoints"] = (
             p["small_description"]
             if isinstance(p["small_description"], list)
             else [p["small_description"]]
@@ -319,8 +400,8 @@ def load_products(filepath, num_products=None, human_goals=True):
             else:
                 price_tag = f"${pricing[0]} to ${pricing[1]}"
                 pricing = pricing[:2]
-        products[i]["pricing"] = pricing
-        products[i]["Price"] = price_tag
+        p["pricing"] = pricing
+        p["Price"] = price_tag
 
         options = dict()
         customization_options = p["customization_options"]
@@ -341,44 +422,114 @@ def load_products(filepath, num_products=None, human_goals=True):
                     option_values.append(option_value)
                     option_to_image[option_value] = option_image
                 options[option_name] = option_values
-        products[i]["options"] = options
-        products[i]["option_to_image"] = option_to_image
-
-        # without color, size, price, availability
-        # if asin in attributes and 'attributes' in attributes[asin]:
-        #     products[i]['Attributes'] = attributes[asin]['attributes']
-        # else:
-        #     products[i]['Attributes'] = ['DUMMY_ATTR']
-        # products[i]['instruction_text'] = \
-        #     attributes[asin].get('instruction', None)
-        # products[i]['instruction_attributes'] = \
-        #     attributes[asin].get('instruction_attributes', None)
+        p["options"] = options
+        p["option_to_image"] = option_to_image
 
         # without color, size, price, availability
         if asin in attributes and "attributes" in attributes[asin]:
-            products[i]["Attributes"] = attributes[asin]["attributes"]
+            p["Attributes"] = attributes[asin]["attributes"]
         else:
-            products[i]["Attributes"] = ["DUMMY_ATTR"]
+            p["Attributes"] = ["DUMMY_ATTR"]
 
+        p["MainImage"] = p["images"][0]
+        p["query"] = p["query"].lower().strip()
+        yield i, p
+
+
+def load_products(filepath, num_products=None, human_goals=True):
+    catalog_path = catalog_path_for(filepath)
+    if is_catalog_fresh(catalog_path, _catalog_sources(filepath)):
+        return load_products_from_catalog(catalog_path, num_products, human_goals)
+
+    # Without a catalog (see `build_catalog`), process all the products.
+    with open(filepath) as f:
+        products = json.load(f)
+    print("Products loaded.")
+    products = clean_product_keys(products)
+
+    with open(DEFAULT_ATTR_PATH) as f:
+        attributes = json.load(f)
+    if human_goals:
+        with open(HUMAN_ATTR_PATH) as f:
+            human_attributes = json.load(f)
+    print("Attributes loaded.")
+
+    all_products = []
+    if num_products is not None:
+        # using item_shuffle.json, we assume products already shuffled
+        products = products[:num_products]
+    for _, p in _iter_processed_products(products, attributes):
+        asin = p["asin"]
         if human_goals:
             if asin in human_attributes:
-                products[i]["instructions"] = human_attributes[asin]
+                p["instructions"] = human_attributes[asin]
         else:
-            products[i]["instruction_text"] = attributes[asin].get("instruction", None)
+            p["instruction_text"] = attributes[asin].get("instruction", None)
 
-            products[i]["instruction_attributes"] = attributes[asin].get(
+            p["instruction_attributes"] = attributes[asin].get(
                 "instruction_attributes", None
             )
+        all_products.append(p)
+
+    product_index = ProductIndex.from_products(all_products)
+    product_item_dict = {p["asin"]: p for p in all_products}
+    product_prices = generate_product_prices(all_products)
+    return all_products, product_item_dict, product_prices, product_index
+
+
+def load_products_from_catalog(catalog_path, num_products=None, human_goals=True):
+    """Same as `load_products`, with products read lazily from a catalog."""
+    catalog = ProductCatalog(catalog_path, num_products, human_goals)
+    print(f"Catalog of {len(catalog.asins)} products loaded.")
+    use_type_nouns(catalog.type_nouns)
+    product_prices = {
+        asin: _sample_price(pricing)
+        for asin, pricing in zip(catalog.asins, catalog.pricings)
+    }
+    return (
+        catalog.products,
+        catalog.product_item_dict,
+        product_prices,
+        catalog.product_index,
+    )
 
-        products[i]["MainImage"] = p["images"][0]
-        products[i]["query"] = p["query"].lower().strip()
 
-        all_products.append(products[i])
+def build_catalog(filepath, catalog_path=None):
+    """Processes all the products of `filepath` once and stores them in a catalog.
 
-    for p in all_products:
-        for a in p["Attributes"]:
-            attribute_to_asins[a].add(p["asin"])
+    `load_products` then reads the products from the catalog instead of
+    processing them again, as long as the items and attributes files don't
+    change. The nouns of the product names are tagged here too, in batches,
+    for the rewards.
+    """
+    if catalog_path is None:
+        catalog_path = catalog_path_for(filepath)
+    with open(filepath) as f:
+        products = json.load(f)
+    products = clean_product_keys(products)
+    with open(DEFAULT_ATTR_PATH) as f:
+        attributes = json.load(f)
+    with open(HUMAN_ATTR_PATH) as f:
+        human_attributes = json.load(f)
 
-    product_item_dict = {p["asin"]: p for p in all_products}
-    product_prices = generate_product_prices(all_products)
-    return all_products, product_item_dict, product_prices, attribute_to_asins
+    def with_instructions():
+        for i, p in _iter_processed_products(products, attributes):
+            asin = p["asin"]
+            # Both kinds of instructions, `load_products` picks one of them.
+            instructions = dict()
+            if asin in human_attributes:
+                instructions["instructions"] = human_attributes[asin]
+            if asin in attributes:
+                instructions["instruction_text"] = attributes[asin].get("instruction")
+                instructions["instruction_attributes"] = attributes[asin].get(
+                    "instruction_attributes"
+                )
+            yield i, p, instructions
+
+    write_catalog(
+        catalog_path,
+        with_instructions(),
+        _catalog_sources(filepath),
+        type_nouns=compute_type_nouns,
+    )
+    return catalog_path
@@ -14,9 +14,13 @@
 
 """Functions for specifying goals and reward calculations."""
 
-from collections import defaultdict
-import itertools
+from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
+import functools
+import math
 import random
+import threading
+import numpy as np
 from rich import print
 import spacy
 from thefuzz import fuzz
@@ -26,8 +30,29 @@ nlp = spacy.load("en_core_web_sm")
 
 PRICE_RANGE = [10.0 * i for i in range(1, 100)]
 
+TYPE_POS = ("PNOUN", "NOUN", "PROPN")
+# Part-of-speech tags only need the tagger, and the attribute ruler mapping its
+# tags to `pos_`; the parser, lemmatizer and NER are skipped.
+_TYPE_PIPES = ("tok2vec", "tagger", "attribute_ruler")
+_DISABLED_PIPES = [name for name in nlp.pipe_names if name not in _TYPE_PIPES]
+_NLP_BATCH_SIZE = 256
+_TEXT_CACHE_SIZE = 4096
+_MATCH_CACHE_SIZE = 1 << 16
+_TYPE_NOUNS_CACHE_SIZE = 1 << 16
+
+# Nouns of the product names used most recently, and the ones precomputed in
+# the catalog (see `use_type_nouns`).
+_type_nouns = OrderedDict()
+_type_nouns_lock = threading.Lock()
+_stored_type_nouns = {}
+
 
 def get_goals(all_products, product_prices, human_goals=True):
+    # Products read from a catalog list the fields of goals without decoding
+    # the products.
+    goal_records = getattr(all_products, "goal_records", None)
+    if goal_records is not None:
+        all_products = goal_records()
     if human_goals:
         return get_human_goals(all_products, product_prices)
     else:
@@ -83,65 +108,234 @@ def get_human_goals(all_products, product_prices):
 
 
 def get_synthetic_goals(all_products, product_prices):
-    goals = []
-    cnt_atts = defaultdict(int)
-    for product in all_products:
-        if "instruction_text" not in product or product["instruction_text"] is None:
-            continue
-        product_goals = []
-        asin = product["asin"]
-        attributes = product["instruction_attributes"]
-        assert len(attributes) > 0
-
-        if product_prices is not None:
-            price = product_prices[asin]
-            price_range = [p for p in PRICE_RANGE if p > price][:4]
-            if len(price_range) >= 2:
-                _, price_upper = sorted(random.sample(price_range, 2))
-                price_text = f", and price lower than {price_upper:.2f} dollars"
+    return SyntheticGoals(all_products, product_prices)
+
+
+class SyntheticGoals(Sequence):
+    """Synthetic goals of all the option combinations of the products.
+
+    A product has a goal for each combination of its options, in the order of
+    `itertools.product`. Goals are only made into dicts when accessed, from
+    the index of their product and of their combination, so that products
+    with many options don't take memory for all of their goals.
+    """
+
+    def __init__(self, all_products, product_prices):
+        self._products = []
+        counts = []
+        cnt_atts = defaultdict(int)
+        for product in all_products:
+            if "instruction_text" not in product or product["instruction_text"] is None:
+                continue
+            asin = product["asin"]
+            attributes = product["instruction_attributes"]
+            assert len(attributes) > 0
+
+            if product_prices is not None:
+                price = product_prices[asin]
+                price_range = [p for p in PRICE_RANGE if p > price][:4]
+                if len(price_range) >= 2:
+                    _, price_upper = sorted(random.sample(price_range, 2))
+                    price_text = f", and price lower than {price_upper:.2f} dollars"
+                else:
+                    price_upper = 1000000
+                    price_text = ""
             else:
                 price_upper = 1000000
                 price_text = ""
-        else:
-            price_upper = 1000000
-            price_text = ""
-
-        instruction_text = product["instruction_text"]
 
-        options = product["options"]
-        option_names = sorted(options)
-        combinations = list(
-            itertools.product(*(options[option_name] for option_name in option_names))
-        )
-        for combination in combinations:
-            goal_options = dict()
-            for i, o in enumerate(combination):
-                #                option_text.append(f'{option_names[i]}: {o}')
-                goal_options[option_names[i]] = o
-            option_text = ", and ".join([f"{k}: {v}" for k, v in goal_options.items()])
-            option_text = " with " + option_text if option_text else ""
-            product_goals.append(
+            options = product["options"]
+            option_names = sorted(options)
+            count = math.prod(len(options[name]) for name in option_names)
+            if count == 0:
+                # An option without values, the product has no goals.
+                continue
+            self._products.append(
                 {
                     "asin": asin,
                     "category": product["category"],
                     "query": product["query"],
                     "name": product["name"],
                     "product_category": product["product_category"],
-                    "instruction_text": f"{instruction_text}{option_text}{price_text}",
+                    "instruction_text": product["instruction_text"],
                     "attributes": attributes,
                     "price_upper": price_upper,
-                    "goal_options": goal_options,
+                    "price_text": price_text,
+                    "options": [(name, options[name]) for name in option_names],
                     "title": product["Title"],
                 }
             )
+            counts.append(count)
             for att in attributes:
-                cnt_atts[att] += 1
-        goals += product_goals
-    for goal in goals:
-        goal["weight"] = sum(1.0 / cnt_atts[att] for att in goal["attributes"]) / len(
-            goal["attributes"]
+                cnt_atts[att] += count
+        # All the goals of a product have the same weight.
+        self._product_weights = np.array(
+            [
+                sum(1.0 / cnt_atts[att] for att in p["attributes"])
+                / len(p["attributes"])
+                for p in self._products
+            ],
+            dtype=float,
         )
-    return goals
+        self._counts = np.array(counts, dtype=np.int64)
+        self._ends = np.cumsum(self._counts)
+
+    def __len__(self):
+        return int(self._ends[-1]) if len(self._ends) else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("goal index out of range")
+        product_index = int(np.searchsorted(self._ends, index, side="right"))
+        combination = index - int(
+            self._ends[product_index] - self._counts[product_index]
+        )
+        return self._make_goal(product_index, combination)
+
+    @property
+    def weights(self):
+        """Weight of each goal, as an array"""
+        return np.repeat(self._product_weights, self._counts)
+
+    def _make_goal(self, product_index, combination):
+        product = self._products[product_index]
+        # The last option changes fastest, like in `itertools.product`.
+        values = []
+        for _, option_values in reversed(product["options"]):
+            combination, i = divmod(combination, len(option_values))
+            values.append(option_values[i])
+        goal_options = dict(
+            zip((name for name, _ in product["options"]), reversed(values))
+        )
+        option_text = ", and ".join([f"{k}: {v}" for k, v in goal_options.items()])
+        option_text = " with " + option_text if option_text else ""
+        instruction_text = product["instruction_text"]
+        price_text = product["price_text"]
+        return {
+            "asin": product["asin"],
+            "category": product["category"],
+            "query": product["query"],
+            "name": product["name"],
+            "product_category": product["product_category"],
+            "instruction_text": f"{instruction_text}{option_text}{price_text}",
+            "attributes": product["attributes"],
+            "price_upper": product["price_upper"],
+            "goal_options": goal_options,
+            "title": product["title"],
+            "weight": float(self._product_weights[product_index]),
+        }
+
+
+class GoalSubset(Sequence):
+    """The goals at some indices of other goals, in the order of the indices"""
+
+    def __init__(self, goals, indices):
+        self._goals = goals
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._goals[int(self._indices[index])]
+
+
+def get_goal_weights(goals):
+    """Returns the sampling weight of each goal, as an array"""
+    if isinstance(goals, SyntheticGoals):
+        return goals.weights
+    return np.array([goal["weight"] for goal in goals], dtype=float)
+
+
+def _doc_nouns(doc):
+    return tuple(t.text.lower() for t in doc if t.pos_ in TYPE_POS)
+
+
+def _cached_type_nouns(name):
+    with _type_nouns_lock:
+        nouns = _type_nouns.get(name)
+        if nouns is not None:
+            _type_nouns.move_to_end(name)
+        return nouns
+
+
+def _cache_type_nouns(name, nouns):
+    with _type_nouns_lock:
+        _type_nouns[name] = nouns
+        _type_nouns.move_to_end(name)
+        if len(_type_nouns) > _TYPE_NOUNS_CACHE_SIZE:
+            _type_nouns.popitem(last=False)
+
+
+def get_type_nouns(name):
+    """Returns the lowercased nouns of a product name, in order, with repeats."""
+    nouns = _cached_type_nouns(name)
+    if nouns is None:
+        nouns = _stored_type_nouns.get(name)
+        if nouns is None:
+            nouns = _doc_nouns(nlp(name, disable=_DISABLED_PIPES))
+        nouns = tuple(nouns)
+        _cache_type_nouns(name, nouns)
+    return nouns
+
+
+def compute_type_nouns(names, batch_size=_NLP_BATCH_SIZE):
+    """Returns the nouns of each name, tagging the missing ones in batches.
+
+    Arguments:
+
+    names (`Iterable[str]`) -- Product names, of products or goals.
+    batch_size (`int`) -- Number of names tagged at once by spaCy.
+    """
+    names = list(names)
+    missing = [
+        name
+        for name in dict.fromkeys(names)
+        if name not in _type_nouns and name not in _stored_type_nouns
+    ]
+    docs = nlp.pipe(missing, disable=_DISABLED_PIPES, batch_size=batch_size)
+    # Kept apart from the cache, which may not have room for all of them.
+    tagged = {}
+    for name, doc in zip(missing, docs):
+        tagged[name] = nouns = _doc_nouns(doc)
+        _cache_type_nouns(name, nouns)
+    return {
+        name: tagged[name] if name in tagged else get_type_nouns(name) for name in names
+    }
+
+
+def use_type_nouns(type_nouns):
+    """Looks up the nouns of names in `type_nouns` before tagging them.
+
+    Arguments:
+
+    type_nouns (`Mapping[str, list[str]]`) -- Nouns precomputed by
+      `compute_type_nouns`, such as the ones stored in the catalog.
+    """
+    global _stored_type_nouns
+    _stored_type_nouns = type_nouns
+
+
+@functools.lru_cache(maxsize=_TEXT_CACHE_SIZE)
+def _lowercase(text):
+    return text.lower()
+
+
+@functools.lru_cache(maxsize=_TEXT_CACHE_SIZE)
+def _lowercase_joined(texts):
+    return " ".join(texts).lower()
+
+
+@functools.lru_cache(maxsize=_MATCH_CACHE_SIZE)
+def _fuzzy_match(a, b):
+    """Whether two attributes or options are the same, ignoring word order"""
+    return fuzz.token_set_ratio(a, b) > 85
 
 
 def get_type_reward(purchased_product, goal):
@@ -161,19 +355,8 @@ def get_type_reward(purchased_product, goal):
     purchased_type = purchased_product["name"]
     desired_type = goal["name"]
 
-    purchased_type_parse = nlp(purchased_type)
-    desired_type_parse = nlp(desired_type)
-
-    purchased_type_parse = [
-        t.text.lower()
-        for t in purchased_type_parse
-        if t.pos_ in ("PNOUN", "NOUN", "PROPN")
-    ]
-    desired_type_parse = [
-        t.text.lower()
-        for t in desired_type_parse
-        if t.pos_ in ("PNOUN", "NOUN", "PROPN")
-    ]
+    purchased_type_parse = get_type_nouns(purchased_type)
+    desired_type_parse = get_type_nouns(desired_type)
 
     n_intersect_type = len(set(purchased_type_parse) & set(desired_type_parse))
     if len(desired_type_parse) == 0:
@@ -212,16 +395,15 @@ def get_attribute_reward(purchased_product, goal):
         matched = False
         # Check whether goal attribute found in purchased product attribute list
         for p_attr in purchased_attrs:
-            score = fuzz.token_set_ratio(p_attr, g_attr)
-            if score > 85:
+            if _fuzzy_match(p_attr, g_attr):
                 num_attr_matches += 1
                 matched = True
                 break
         # If not in purchased attrs, check Title, Bullet Points (Features), Desc
         if not matched and (
-            g_attr in purchased_product["Title"].lower()
-            or g_attr in " ".join(purchased_product["BulletPoints"]).lower()
-            or g_attr in purchased_product["Description"].lower()
+            g_attr in _lowercase(purchased_product["Title"])
+            or g_attr in _lowercase_joined(tuple(purchased_product["BulletPoints"]))
+            or g_attr in _lowercase(purchased_product["Description"])
         ):
             num_attr_matches += 1
             matched = True
@@ -239,8 +421,7 @@ def get_option_reward(purchased_options, goal_options):
     num_option_matches = 0
     for g_option in goal_options:
         for p_option in purchased_options:
-            score = fuzz.token_set_ratio(p_option, g_option)
-            if score > 85:
+            if _fuzzy_match(p_option, g_option):
                 num_option_matches += 1
                 break
 
@@ -295,3 +476,25 @@ def get_reward(purchased_product, goal, price, options, **kwargs):
             )
         return total_reward, info
     return total_reward
+
+
+def get_rewards(purchases, **kwargs):
+    """Get the rewards of many purchases, like `get_reward` for each of them
+
+    Arguments:
+
+    purchases (`Iterable[tuple]`) -- The `(purchased_product, goal, price,
+      options)` of each purchase.
+    kwargs -- Passed to `get_reward`.
+    """
+    purchases = list(purchases)
+    # Tag all the names at once, rather than one by one.
+    compute_type_nouns(
+        name
+        for purchased_product, goal, _, _ in purchases
+        for name in (purchased_product["name"], goal["name"])
+    )
+    return [
+        get_reward(purchased_product, goal, price=price, options=options, **kwargs)
+        for purchased_product, goal, price, options in purchases
+    ]
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import re
 from typing import Tuple
 
@@ -167,13 +168,57 @@ SIZE_PATTERNS = [
 ]
 SIZE_PATTERNS = [re.compile(s) for s in SIZE_SET] + SIZE_PATTERNS
 
+_CACHE_SIZE = 1 << 16
 
-def normalize_color(color_string: str) -> str:
-    """Extracts the first color found if exists"""
+
+def _search_pattern(pattern):
+    """Pattern found in the same strings, without a leading or trailing `(.*)`
+
+    `(.*)` can match the empty string, so it doesn't change whether a pattern
+    is found; it only makes searching backtrack from every position.
+    """
+    pattern = pattern.pattern
+    if pattern.startswith("(.*)"):
+        pattern = pattern[len("(.*)") :]
+    if pattern.endswith("(.*)"):
+        pattern = pattern[: -len("(.*)")]
+    return re.compile(pattern)
+
+
+_SIZE_SEARCH_PATTERNS = [
+    (_search_pattern(pattern), pattern.pattern) for pattern in SIZE_PATTERNS
+]
+
+
+def _find_color(color_string):
+    # Checking each color is faster than one regex alternating all of them.
     for norm_color in COLOR_SET:
         if norm_color in color_string:
             return norm_color
-    return color_string
+    return None
+
+
+_find_color_cached = functools.lru_cache(maxsize=_CACHE_SIZE)(_find_color)
+
+
+def normalize_color(color_string: str) -> str:
+    """Extracts the first color found if exists"""
+    # Option values repeat across products and goals; other values, like the
+    # (name, value) pairs of some goal options, aren't cached.
+    find_color = _find_color_cached if isinstance(color_string, str) else _find_color
+    norm_color = find_color(color_string)
+    return color_string if norm_color is None else norm_color
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def normalize_size(size_string: str) -> str:
+    """Maps a size to the first of SIZE_PATTERNS it matches, or a size class"""
+    for search_pattern, pattern in _SIZE_SEARCH_PATTERNS:
+        if search_pattern.search(size_string) is not None:
+            return pattern
+    if size_string.replace(".", "", 1).isdigit():
+        return "numeric_size"
+    return "not_matched"
 
 
 def normalize_color_size(product_prices: dict) -> Tuple[dict, dict]:
@@ -188,30 +233,12 @@ def normalize_color_size(product_prices: dict) -> Tuple[dict, dict]:
     # Create mapping of each original color value to corresponding set value
     color_mapping = {"N.A.": "not_matched"}
     for c in all_colors:
-        matched = False
-        for base in COLOR_SET:
-            if base in c:
-                color_mapping[c] = base
-                matched = True
-                break
-        if not matched:
-            color_mapping[c] = "not_matched"
+        norm_color = _find_color_cached(c)
+        color_mapping[c] = "not_matched" if norm_color is None else norm_color
 
     # Create mapping of each original size value to corresponding set value
     size_mapping = {"N.A.": "not_matched"}
     for s in all_sizes:
-        matched = False
-        for pattern in SIZE_PATTERNS:
-            m = re.search(pattern, s)
-            if m is not None:
-                matched = True
-                size_mapping[s] = pattern.pattern
-                break
-        if not matched:
-            if s.replace(".", "", 1).isdigit():
-                size_mapping[s] = "numeric_size"
-                matched = True
-        if not matched:
-            size_mapping[s] = "not_matched"
+        size_mapping[s] = normalize_size(s)
 
     return color_mapping, size_mapping
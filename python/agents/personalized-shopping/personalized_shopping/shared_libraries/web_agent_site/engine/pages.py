@@ -0,0 +1,232 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Structured pages, built without rendering and parsing HTML.
+
+A `Page` holds what the text observations and the available actions are
+built from: the visible texts of the page, in order, and its clickables.
+`map_action_to_page` builds the same content as the templates rendered by
+`map_action_to_html`, as parsed by `html.parser`, so observations are
+identical in both modes. The templates and the functions building their
+pages below must be kept in sync.
+"""
+
+from pprint import pformat
+
+from flask import current_app
+from jinja2.utils import htmlsafe_json_dumps
+
+from .engine import ACTION_TO_TEMPLATE, END_BUTTON, parse_action
+
+# Whitespace removed by BeautifulSoup to detect whitespace-only strings.
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+class Page:
+    """Visible texts and clickables of a page, with its HTML rendered lazily"""
+
+    def __init__(self, render_html=None):
+        """Constructor for an empty page
+
+        Arguments:
+
+        render_html (`func`) -- Returns the HTML of the page, only called when
+          the HTML is needed
+        """
+        # The visible texts as (text, kind) pairs, where kind is "button",
+        # "label" (buying option), "product-link" or None.
+        self.texts = []
+        self.buttons = []
+        self.product_links = []
+        self.options = []
+        self.has_search_bar = False
+        self.instruction_text = None
+        self.image_url = None
+        self._render_html = render_html
+        self._html = None
+
+    @property
+    def html(self):
+        """HTML of the page, rendered on first access"""
+        if self._html is None:
+            self._html = self._render_html()
+        return self._html
+
+    def add_text(self, text, kind=None, preserve_whitespace=False):
+        """Add a visible text, normalized like BeautifulSoup does, and return it"""
+        text = str(text)
+        if not text:
+            return text
+        if not preserve_whitespace and not text.strip(_ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        self.texts.append((text, kind))
+        return text
+
+    def add_instruction(self, header, instruction_text):
+        self.instruction_text = self.add_text(header) + self.add_text(instruction_text)
+
+    def add_button(self, text, classes):
+        self.add_text(text, kind="button")
+        self.buttons.append((text, {"class": classes}))
+
+    def add_product_link(self, asin):
+        self.add_text(asin, kind="product-link")
+        self.product_links.append((str(asin), {"class": ["product-link"]}))
+
+    def add_option(self, option_name, option_value):
+        self.add_text(option_value, kind="label")
+        self.options.append((str(option_value), {"name": str(option_name)}))
+
+    def text_to_clickable(self):
+        """Map clickable texts to their attributes, like the HTML clickables"""
+        text_to_clickable = {
+            text.lower(): clickable
+            for text, clickable in self.buttons + self.product_links
+        }
+        for value, clickable in self.options:
+            text_to_clickable[value] = clickable
+        return text_to_clickable
+
+
+def map_action_to_page(action, render_html=None, **kwargs):
+    """Build the page of `action`, with the arguments of `map_action_to_html`"""
+    action_name, action_arg = parse_action(action)
+    page = Page(render_html)
+    if action_name == "start":
+        _search_page(page, kwargs)
+    elif action_name == "search":
+        _results_page(page, kwargs)
+    elif action_name == "click" and action_arg == END_BUTTON:
+        _done_page(page, kwargs)
+    elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
+        _item_sub_page(page, action_arg, kwargs)
+    elif action_name == "click":
+        _item_page(page, kwargs)
+    else:
+        raise ValueError("Action name not recognized.")
+    return page
+
+
+def _search_page(page, kwargs):
+    page.add_text("WebShop")
+    page.add_instruction("Instruction: ", kwargs["instruction_text"])
+    page.has_search_bar = True
+    page.add_button("Search", ["btn", "btn-success"])
+
+
+def _header(page, kwargs):
+    page.add_instruction("Instruction:", kwargs.get("instruction_text"))
+    page.add_button("Back to Search", ["btn", "btn-success"])
+
+
+def _results_page(page, kwargs):
+    _header(page, kwargs)
+    page.add_text(f"Page {kwargs['page']} (Total results: {kwargs['total']})")
+    if kwargs["page"] > 1:
+        page.add_button("< Prev", ["btn", "btn-primary"])
+    page.add_button("Next >", ["btn", "btn-primary"])
+    for item in kwargs["products"]:
+        page.add_product_link(item["asin"])
+        page.add_text(item["Title"])
+        page.add_text(item["Price"])
+
+
+def _item_page(page, kwargs):
+    product_info = kwargs["product_info"]
+    _header(page, kwargs)
+    page.add_button("< Prev", ["btn", "btn-primary"])
+    page.image_url = product_info["MainImage"]
+    for option_name, option_contents in product_info["options"].items():
+        page.add_text(option_name)
+        for option_content in option_contents:
+            page.add_option(option_name, option_content)
+    page.add_text(product_info["Title"])
+    page.add_text(f"Price: {product_info['Price']}")
+    page.add_text(f"Rating: {product_info['Rating']}")
+    sub_pages = ["Description", "Features", "Reviews"]
+    if kwargs["show_attrs"]:
+        sub_pages.append("Attributes")
+    for sub_page in sub_pages:
+        page.add_button(sub_page, ["btn", "btn-primary"])
+    page.add_button(END_BUTTON, ["btn", "btn-lg", "purchase"])
+
+
+def _item_sub_page(page, sub_page, kwargs):
+    product_info = kwargs["product_info"]
+    _header(page, kwargs)
+    page.add_button("< Prev", ["btn", "btn-primary"])
+    if sub_page == "Description":
+        page.add_text(product_info["Description"])
+    elif sub_page == "Features":
+        for bulletpoint in product_info["BulletPoints"]:
+            page.add_text(f" {bulletpoint}")
+    elif sub_page == "Reviews":
+        for review in product_info["Reviews"]:
+            page.add_text(f'"{_get(review, "title")}"')
+            page.add_text(_get(review, "score"))
+            page.add_text(_get(review, "body"))
+    elif sub_page == "Attributes":
+        for attribute in product_info["Attributes"]:
+            page.add_text(f" {attribute}")
+        page.add_text(_get(product_info, "category"))
+        page.add_text(_get(product_info, "query"))
+        page.add_text(_get(product_info, "product_category"))
+
+
+def _done_page(page, kwargs):
+    def add_field(name, value):
+        page.add_text(name)
+        # The values are in <pre> elements, which keep their whitespace.
+        page.add_text(value, preserve_whitespace=True)
+
+    goal = kwargs.get("goal")
+    page.add_text("Thank you for shopping with us!")
+    page.add_text("Your code: ")
+    page.add_text(kwargs.get("mturk_code"), preserve_whitespace=True)
+    page.add_text(" (Paste it in your MTurk interface.)")
+    page.add_text("Purchased")
+    add_field("asin", kwargs["asin"])
+    add_field("options", _tojson(kwargs["options"]))
+    add_field("attrs", kwargs.get("purchased_attrs"))
+    add_field("category", kwargs.get("category"))
+    add_field("query", kwargs.get("query"))
+    add_field("product category", kwargs.get("product_category"))
+    page.add_text("Target")
+    add_field("asin", _get(goal, "asin"))
+    add_field("options", _get(goal, "goal_options"))
+    add_field("attrs", _get(goal, "attributes"))
+    add_field("price upper", _get(goal, "price_upper"))
+    add_field("instuction text", _get(goal, "instruction_text"))
+    add_field("category", _get(goal, "category"))
+    add_field("product category", _get(goal, "product_category"))
+    add_field("query", _get(goal, "query"))
+    add_field("Goal ", pformat(goal))
+    page.add_text("Reward")
+    add_field("Your score (min 0.0, max 1.0)", kwargs["reward"])
+    add_field("Reward Details ", pformat(kwargs.get("reward_info")))
+
+
+def _tojson(value):
+    """Same as the `tojson` filter of the templates"""
+    policies = current_app.jinja_env.policies
+    return htmlsafe_json_dumps(
+        value, dumps=policies["json.dumps_function"], **policies["json.dumps_kwargs"]
+    )
+
+
+def _get(obj, name):
+    """Look up `obj.name` in a template, missing values rendering as ''"""
+    if isinstance(obj, dict):
+        return obj.get(name, "")
+    return getattr(obj, name, "")
@@ -12,10 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+import contextlib
 import json
 import random
 import string
+import threading
 import time
 from bs4 import BeautifulSoup
 from bs4.element import Comment
@@ -30,22 +32,26 @@ from ..engine.engine import (
     END_BUTTON,
     NEXT_PAGE,
     PREV_PAGE,
+    SEARCH_THREADS,
+    batch_get_top_n_asins_from_keywords,
     get_product_per_page,
-    get_top_n_product_from_keywords,
+    get_top_n_asins_from_keywords,
     init_search_engine,
     load_products,
     map_action_to_html,
     parse_action,
+    search_cache_key,
 )
-from ..engine.goal import get_goals, get_reward
+from ..engine.goal import GoalSubset, get_goal_weights, get_goals, get_reward
+from ..engine.pages import Page, map_action_to_page
 from ..utils import (
     DEFAULT_FILE_PATH,
     FEAT_CONV,
     FEAT_IDS,
     random_idx,
+    random_idxs_without_replacement,
 )
 
-
 app = Flask(__name__)
 
 
@@ -72,6 +78,8 @@ class WebAgentTextEnv(gym.Env):
         session
         session_prefix
         show_attrs
+        search_cache_size
+        structured_pages
         """
         super(WebAgentTextEnv, self).__init__()
         self.observation_mode = observation_mode
@@ -89,6 +97,8 @@ class WebAgentTextEnv(gym.Env):
                 self.kwargs.get("num_products"),
                 self.kwargs.get("human_goals"),
                 self.kwargs.get("show_attrs", False),
+                self.kwargs.get("search_cache_size", 1024),
+                self.kwargs.get("structured_pages", False),
             )
             if server is None
             else server
@@ -105,7 +115,7 @@ class WebAgentTextEnv(gym.Env):
         self.prev_actions = []
         self.num_prev_obs = self.kwargs.get("num_prev_obs", 0)
         self.num_prev_actions = self.kwargs.get("num_prev_actions", 0)
-        self.reset()
+        self.reset(session=self.session)
 
     def step(self, action):
         """Takes an action, updates WebShop environment, and returns (observation, reward, done, info)
@@ -150,6 +160,13 @@ class WebAgentTextEnv(gym.Env):
 
     def get_available_actions(self):
         """Returns list of available actions at the current step"""
+        page = self.browser.page_source
+        if isinstance(page, Page):
+            self.text_to_clickable = page.text_to_clickable()
+            return dict(
+                has_search_bar=page.has_search_bar,
+                clickables=list(self.text_to_clickable.keys()),
+            )
         html_obj = self._parse_html()
 
         # Collect search bar, buttons, links, and options as clickables
@@ -172,10 +189,14 @@ class WebAgentTextEnv(gym.Env):
 
     def get_image(self):
         """Scrape image from page HTML and return as a list of pixel values"""
-        html_obj = self._parse_html(self.browser.page_source)
-        image_url = html_obj.find(id="product-image")
+        page = self.browser.page_source
+        if isinstance(page, Page):
+            image_url = page.image_url
+        else:
+            image_url = self._parse_html(page).find(id="product-image")
+            if image_url is not None:
+                image_url = image_url["src"]
         if image_url is not None:
-            image_url = image_url["src"]
             if image_url in self.ids:
                 image_idx = self.ids[image_url]
                 image = self.feats[image_idx]
@@ -184,7 +205,10 @@ class WebAgentTextEnv(gym.Env):
 
     def get_instruction_text(self):
         """Get corresponding instruction text for current environment session"""
-        html_obj = self._parse_html(self.browser.page_source)
+        page = self.browser.page_source
+        if isinstance(page, Page):
+            return page.instruction_text
+        html_obj = self._parse_html(page)
         instruction_text = html_obj.find(id="instruction-text").h4.text
         return instruction_text
 
@@ -204,15 +228,14 @@ class WebAgentTextEnv(gym.Env):
     @property
     def observation(self):
         """Compiles state into either the `html` or `text` observation mode"""
-        html = self.state["html"]
         if self.observation_mode == "html":
-            return html
+            return self.state["html"]
         elif self.observation_mode == "text":
-            return self.convert_html_to_text(html, simple=True)
+            return self.convert_html_to_text(self.browser.page_source, simple=True)
         elif self.observation_mode == "text_rich":
-            return self.convert_html_to_text(html, simple=False)
+            return self.convert_html_to_text(self.browser.page_source, simple=False)
         elif self.observation_mode == "url":
-            return self.state["url"]
+            return self.browser.current_url
         else:
             raise ValueError(f"Observation mode {self.observation_mode} not supported.")
 
@@ -223,34 +246,44 @@ class WebAgentTextEnv(gym.Env):
         The actual observation are likely to be a subset or reduced form of the
         state.
         """
+        page = self.browser.page_source
         return dict(
             url=self.browser.current_url,
-            html=self.browser.page_source,
+            html=page.html if isinstance(page, Page) else page,
             instruction_text=self.instruction_text,
         )
 
     def convert_html_to_text(self, html, simple=False):
-        """Strip HTML of tags and add separators to convert observation into simple mode"""
-        texts = self._parse_html(html).findAll(text=True)
-        visible_texts = filter(tag_visible, texts)
+        """Strip HTML of tags and add separators to convert observation into simple mode
+
+        Arguments:
+
+        html (`str` | `Page`) -- HTML of the page, or the page, whose visible
+          texts are used without parsing any HTML
+        """
+        if isinstance(html, Page):
+            visible_texts = html.texts
+        else:
+            texts = self._parse_html(html).findAll(text=True)
+            visible_texts = [(t, text_kind(t)) for t in texts if tag_visible(t)]
         if simple:
             # For `simple` mode, return just [SEP] separators
-            return " [SEP] ".join(t.strip() for t in visible_texts if t != "\n")
+            return " [SEP] ".join(t.strip() for t, _ in visible_texts if t != "\n")
         else:
             # Otherwise, return an observation with tags mapped to specific, unique separators
             observation = ""
-            for t in visible_texts:
+            for t, kind in visible_texts:
                 if t == "\n":
                     continue
-                if t.parent.name == "button":  # button
+                if kind == "button":  # button
                     processed_t = f"[button] {t} [button_]"
-                elif t.parent.name == "label":  # options
-                    if f'"{t}"' in self.state["url"]:
+                elif kind == "label":  # options
+                    if f'"{t}"' in self.browser.current_url:
                         processed_t = f"  [clicked button] {t} [clicked button_]"
                         observation = f"You have clicked {t}.\n" + observation
                     else:
                         processed_t = f"  [button] {t} [button_]"
-                elif t.parent.get("class") == ["product-link"]:  # product asins
+                elif kind == "product-link":  # product asins
                     if f"{t}" in self.server.user_sessions[self.session]["asins"]:
                         processed_t = f"\n[clicked button] {t} [clicked button_]"
                     else:
@@ -290,7 +323,8 @@ class WebAgentTextEnv(gym.Env):
         pass
 
     def close(self):
-        pass
+        """End the session, the server may be shared with other environments"""
+        self.server.end_session(self.session)
 
 
 def tag_visible(element):
@@ -298,8 +332,34 @@ def tag_visible(element):
     return element.parent.name not in ignore and not isinstance(element, Comment)
 
 
+def text_kind(element):
+    """Kind of a visible text, as in `Page.texts`"""
+    if element.parent.name == "button":
+        return "button"
+    elif element.parent.name == "label":
+        return "label"
+    elif element.parent.get("class") == ["product-link"]:
+        return "product-link"
+    return None
+
+
+class _SessionLock:
+    """Lock of a session, with the number of threads holding or waiting on it"""
+
+    def __init__(self):
+        # Reentrant, as some actions receive other actions.
+        self.lock = threading.RLock()
+        self.users = 0
+
+
 class SimServer:
-    """Lightweight simulator of WebShop Flask application for generating HTML observations"""
+    """Lightweight simulator of WebShop Flask application for generating HTML observations
+
+    A server can be shared by the environments of many sessions, in different
+    threads: the actions of a session run one at a time, holding the lock of
+    the session, and the state shared by sessions is guarded by the lock of
+    the server.
+    """
 
     def __init__(
         self,
@@ -310,6 +370,8 @@ class SimServer:
         num_products=None,
         human_goals=0,
         show_attrs=False,
+        search_cache_size=1024,
+        structured_pages=False,
     ):
         """Constructor for simulated server serving WebShop application
 
@@ -321,55 +383,69 @@ class SimServer:
         num_products (`int`) -- Number of products to search across
         human_goals (`bool`) -- If true, load human goals; otherwise, load synthetic
           goals
+        search_cache_size (`int`) -- Number of searches whose results are kept
+          for all sessions (0 to only reuse them within a session)
+        structured_pages (`bool`) -- If true, return pages as `Page` objects,
+          rendering their HTML only when it is accessed; otherwise, return HTML
         """
         # Load all products, goals, and search engine
         self.base_url = base_url
-        self.all_products, self.product_item_dict, self.product_prices, _ = (
-            load_products(
-                filepath=file_path,
-                num_products=num_products,
-                human_goals=human_goals,
-            )
+        (
+            self.all_products,
+            self.product_item_dict,
+            self.product_prices,
+            self.product_index,
+        ) = load_products(
+            filepath=file_path,
+            num_products=num_products,
+            human_goals=human_goals,
         )
         self.search_engine = init_search_engine(num_products=num_products)
-        self.goals = get_goals(self.all_products, self.product_prices, human_goals)
+        self.search_cache = OrderedDict()
+        self.search_cache_size = search_cache_size
+        self._lock = threading.Lock()
+        self._session_locks = dict()
+        goals = get_goals(self.all_products, self.product_prices, human_goals)
+        weights = get_goal_weights(goals)
         self.show_attrs = show_attrs
+        self.structured_pages = structured_pages
 
-        # Fix outcome for random shuffling of goals
+        # Fix outcome for random shuffling of goals. Goals are selected by
+        # index, shuffling the indices like the goals themselves.
         random.seed(233)
-        random.shuffle(self.goals)
+        idxs = np.arange(len(goals))
+        random.shuffle(idxs)
 
         # Apply `filter_goals` parameter if exists to select speific goal(s)
         if filter_goals is not None:
-            self.goals = [
-                goal for (i, goal) in enumerate(self.goals) if filter_goals(i, goal)
-            ]
+            keep = np.fromiter(
+                (filter_goals(i, goals[idx]) for i, idx in enumerate(idxs)),
+                dtype=bool,
+                count=len(idxs),
+            )
+            idxs = idxs[keep]
 
         # Imposes `limit` on goals via random selection
-        if limit_goals != -1 and limit_goals < len(self.goals):
-            self.weights = [goal["weight"] for goal in self.goals]
-            self.cum_weights = [0] + np.cumsum(self.weights).tolist()
-            idxs = []
-            while len(idxs) < limit_goals:
-                idx = random_idx(self.cum_weights)
-                if idx not in idxs:
-                    idxs.append(idx)
-            self.goals = [self.goals[i] for i in idxs]
+        if limit_goals != -1 and limit_goals < len(idxs):
+            idxs = idxs[random_idxs_without_replacement(weights[idxs], limit_goals)]
+        self.goals = GoalSubset(goals, idxs)
         print(f"Loaded {len(self.goals)} goals.")
 
         # Set extraneous housekeeping variables
-        self.weights = [goal["weight"] for goal in self.goals]
-        self.cum_weights = [0] + np.cumsum(self.weights).tolist()
+        self.weights = weights[idxs]
+        self.cum_weights = np.concatenate(([0.0], np.cumsum(self.weights)))
         self.user_sessions = dict()
         self.search_time = 0
         self.render_time = 0
         self.sample_time = 0
         self.assigned_instruction_text = None  # TODO: very hacky, should remove
+        # Instruction texts assigned to single sessions, by session ID
+        self.assigned_instruction_texts = dict()
 
     @app.route("/", methods=["GET", "POST"])
     def index(self, session_id, **kwargs):
         """Redirect to the search page with the given session ID"""
-        html = map_action_to_html(
+        html = self.render(
             "start",
             session_id=session_id,
             instruction_text=kwargs["instruction_text"],
@@ -394,16 +470,15 @@ class SimServer:
 
         # Perform search on keywords from items and record amount of time it takes
         old_time = time.time()
-        top_n_products = get_top_n_product_from_keywords(
-            keywords,
-            self.search_engine,
-            self.all_products,
-            self.product_item_dict,
-        )
-        self.search_time += time.time() - old_time
+        top_n_asins = self.get_top_n_asins(session, keywords)
+        with self._lock:
+            self.search_time += time.time() - old_time
 
         # Get product list from search result asins and get list of corresponding URLs
-        products = get_product_per_page(top_n_products, page)
+        products = [
+            self.product_item_dict[asin]
+            for asin in get_product_per_page(top_n_asins, page)
+        ]
 
         keywords_url_string = "+".join(keywords)
         url = (
@@ -411,23 +486,188 @@ class SimServer:
             f"{keywords_url_string}/{page}"
         )
 
-        # Render HTML search page and record amount of time taken
-        old_time = time.time()
-        html = map_action_to_html(
+        # Render search page and record amount of time taken
+        html = self.render(
             "search",
             session_id=session_id,
             products=products,
             keywords=session["keywords"],
             page=page,
-            total=len(top_n_products),
+            total=len(top_n_asins),
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
-        self.render_time += time.time() - old_time
         return html, url
 
+    def render(self, action, **kwargs):
+        """Render the page of `action`, and record amount of time it takes"""
+        old_time = time.time()
+        if self.structured_pages:
+            # The session's options keep changing after the page is rendered.
+            if "options" in kwargs:
+                kwargs["options"] = dict(kwargs["options"])
+
+            def render_html():
+                with app.app_context(), app.test_request_context():
+                    return map_action_to_html(action, **kwargs)
+
+            page = map_action_to_page(action, render_html=render_html, **kwargs)
+        else:
+            page = map_action_to_html(action, **kwargs)
+        with self._lock:
+            self.render_time += time.time() - old_time
+        return page
+
+    @contextlib.contextmanager
+    def session_lock(self, session_id):
+        """Hold the lock of the session while one of its actions runs
+
+        The lock is kept as long as a thread holds or waits on it, so that all
+        the actions of the session wait for each other, even when the session
+        ends meanwhile.
+        """
+        with self._lock:
+            session_lock = self._session_locks.get(session_id)
+            if session_lock is None:
+                session_lock = self._session_locks[session_id] = _SessionLock()
+            session_lock.users += 1
+        try:
+            with session_lock.lock:
+                yield
+        finally:
+            with self._lock:
+                session_lock.users -= 1
+                if session_lock.users == 0:
+                    del self._session_locks[session_id]
+
+    def end_session(self, session_id):
+        """Forget a session and its state
+
+        A later action of the session starts it over, at the search page.
+        """
+        with self.session_lock(session_id):
+            with self._lock:
+                self.user_sessions.pop(session_id, None)
+                self.assigned_instruction_texts.pop(session_id, None)
+
+    def assign_instruction_text(self, session_id, instruction_text):
+        """Show `instruction_text` in the pages of a session, instead of its goal's"""
+        with self._lock:
+            self.assigned_instruction_texts[session_id] = instruction_text
+
+    def get_assigned_instruction_text(self, session_id):
+        """Return the instruction text assigned to a session, or to all of them"""
+        with self._lock:
+            return self.assigned_instruction_texts.get(
+                session_id, self.assigned_instruction_text
+            )
+
+    def get_top_n_asins(self, session, keywords):
+        """Return the asins found by searching `keywords`, reusing past results
+
+        Results are kept for the last search of the session, so that changing
+        pages or going back to the results doesn't search again, and for the
+        last `search_cache_size` searches of all sessions.
+        """
+        key = search_cache_key(keywords)
+        if key is not None:
+            last_search = session.get("last_search")
+            if last_search is not None and last_search[0] == key:
+                return last_search[1]
+            with self._lock:
+                top_n_asins = self.search_cache.get(key)
+                if top_n_asins is not None:
+                    self.search_cache.move_to_end(key)
+            if top_n_asins is not None:
+                session["last_search"] = (key, top_n_asins)
+                return top_n_asins
+
+        top_n_asins = tuple(
+            get_top_n_asins_from_keywords(
+                keywords,
+                self.search_engine,
+                self.all_products,
+                self.product_item_dict,
+                self.product_index,
+            )
+        )
+        if key is not None:
+            session["last_search"] = (key, top_n_asins)
+            self.cache_search(key, top_n_asins)
+        return top_n_asins
+
+    def cache_search(self, key, top_n_asins):
+        """Keep the results of a search for all sessions"""
+        if self.search_cache_size > 0:
+            with self._lock:
+                self.search_cache[key] = top_n_asins
+                self.search_cache.move_to_end(key)
+                if len(self.search_cache) > self.search_cache_size:
+                    self.search_cache.popitem(last=False)
+
+    def batch_search(self, session_keywords, threads=SEARCH_THREADS):
+        """Run the searches of many sessions at once
+
+        The results are kept as the last search of each session that exists,
+        so the sessions then searching these keywords, e.g. with the
+        `search[...]` action, get the results without searching again.
+
+        Arguments:
+
+        session_keywords (`dict`) -- Keywords (`list[str]`) to search by session
+          ID
+        threads (`int`) -- Number of threads searching in parallel
+
+        Returns the asins found for each session, by session ID.
+        """
+        old_time = time.time()
+        keys = {
+            session_id: search_cache_key(keywords)
+            for session_id, keywords in session_keywords.items()
+        }
+        # Sessions searching the same keywords share one search, except for
+        # random searches, which have no key.
+        top_n_asins_by_key = dict()
+        searches = dict()
+        with self._lock:
+            for session_id, keywords in session_keywords.items():
+                key = keys[session_id]
+                if key is None:
+                    searches[("<r>", session_id)] = keywords
+                elif key in self.search_cache:
+                    self.search_cache.move_to_end(key)
+                    top_n_asins_by_key[key] = self.search_cache[key]
+                else:
+                    searches.setdefault(key, keywords)
+        found = batch_get_top_n_asins_from_keywords(
+            list(searches.values()),
+            self.search_engine,
+            self.all_products,
+            self.product_item_dict,
+            self.product_index,
+            threads=threads,
+        )
+        for key, top_n_asins in zip(searches, found):
+            top_n_asins_by_key[key] = tuple(top_n_asins)
+
+        results = dict()
+        for session_id, key in keys.items():
+            if key is None:
+                results[session_id] = top_n_asins_by_key[("<r>", session_id)]
+                continue
+            results[session_id] = top_n_asins_by_key[key]
+            self.cache_search(key, results[session_id])
+            if session_id in self.user_sessions:
+                self.user_sessions[session_id]["last_search"] = (
+                    key,
+                    results[session_id],
+                )
+        with self._lock:
+            self.search_time += time.time() - old_time
+        return results
+
     @app.route("/", methods=["GET", "POST"])
     def item_page(self, session_id, **kwargs):
         """Render and return the HTML for a product item page"""
@@ -460,7 +700,7 @@ class SimServer:
             f'{session["page"]}/{option_string}'
         )
 
-        html = map_action_to_html(
+        html = self.render(
             "click",
             session_id=session_id,
             product_info=product_info,
@@ -471,7 +711,7 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
             show_attrs=self.show_attrs,
         )
         return html, url
@@ -498,7 +738,7 @@ class SimServer:
             f'{session["asin"]}/{keywords_url_string}/{session["page"]}/'
             f'{clickable_name}/{session["options"]}'
         )
-        html = map_action_to_html(
+        html = self.render(
             f"click[{clickable_name}]",
             session_id=session_id,
             product_info=product_info,
@@ -509,7 +749,7 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
         return html, url
 
@@ -539,7 +779,7 @@ class SimServer:
             f"{self.base_url}/done/{session_id}/"
             f'{session["asin"]}/{session["options"]}'
         )
-        html = map_action_to_html(
+        html = self.render(
             f"click[{END_BUTTON}]",
             session_id=session_id,
             reward=reward,
@@ -548,7 +788,7 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
         return html, url, reward
 
@@ -556,7 +796,8 @@ class SimServer:
         """Map action to the corresponding page"""
         status = dict(reward=0.0, done=False)
 
-        with app.app_context(), app.test_request_context():
+        session_lock = self.session_lock(session_id)
+        with session_lock, app.app_context(), app.test_request_context():
             # Create/determine goal, instruction_text from current session
             if session_id not in self.user_sessions:
                 idx = (
@@ -564,17 +805,25 @@ class SimServer:
                     if (session_int is not None and isinstance(session_int, int))
                     else random_idx(self.cum_weights)
                 )
-                goal = self.goals[idx]
+                # A copy, as sessions change the instruction text of their goal.
+                goal = dict(self.goals[idx])
                 instruction_text = goal["instruction_text"]
-                self.user_sessions[session_id] = {"goal": goal, "done": False}
+                # Like after `index`, in case the session ended since its
+                # environment was reset.
+                self.user_sessions[session_id] = {
+                    "goal": goal,
+                    "done": False,
+                    **self._initial_session_state(),
+                }
             else:
                 instruction_text = self.user_sessions[session_id]["goal"][
                     "instruction_text"
                 ]
-            if self.assigned_instruction_text is not None:
+            assigned_instruction_text = self.get_assigned_instruction_text(session_id)
+            if assigned_instruction_text is not None:
                 instruction_text = (
-                    self.assigned_instruction_text
-                )  # TODO: very hacky, should remove
+                    assigned_instruction_text  # TODO: very hacky, should remove
+                )
                 self.user_sessions[session_id]["goal"][
                     "instruction_text"
                 ] = instruction_text
@@ -584,16 +833,7 @@ class SimServer:
                 # If no action, reset the session variables
                 kwargs["instruction_text"] = instruction_text
                 html, url = self.index(session_id, **kwargs)
-                self.user_sessions[session_id].update(
-                    {
-                        "keywords": None,
-                        "page": None,
-                        "asin": None,
-                        "asins": set(),
-                        "options": dict(),
-                        "actions": defaultdict(int),
-                    }
-                )
+                self.user_sessions[session_id].update(self._initial_session_state())
             elif "keywords" in kwargs:
                 # If search keywords are available, run a search
                 html, url = self.search_results(session_id, **kwargs)
@@ -654,6 +894,19 @@ class SimServer:
                     html, url = self.item_page(session_id, **kwargs)
             return html, url, status
 
+    @staticmethod
+    def _initial_session_state():
+        """Return the variables of a session at the search page"""
+        return {
+            "keywords": None,
+            "last_search": None,
+            "page": None,
+            "asin": None,
+            "asins": set(),
+            "options": dict(),
+            "actions": defaultdict(int),
+        }
+
     def get_page_name(self, url):
         """Determine which page (i.e.
 
@@ -12,11 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import bisect
 import hashlib
 import logging
 from os.path import abspath, dirname, join
 import random
+import numpy as np
 
 BASE_DIR = dirname(abspath(__file__))
 DEBUG_PROD_SIZE = None  # set to `None` to disable
@@ -40,11 +40,29 @@ def random_idx(cum_weights):
     and the value of the second to last index
     """
     pos = random.uniform(0, cum_weights[-1])
-    idx = bisect.bisect(cum_weights, pos)
+    idx = int(np.searchsorted(cum_weights, pos, side="right"))
     idx = min(idx, len(cum_weights) - 2)
     return idx
 
 
+def random_idxs_without_replacement(weights, k):
+    """Sample `k` distinct indices, drawing each one with a probability
+    proportional to its weight among the indices left
+
+    Each index gets the key `log(u) / weight`, for `u` uniform in [0, 1), and
+    the `k` largest keys are the sample, in the order they would be drawn
+    (Efraimidis and Spirakis). Unlike drawing indices until `k` distinct ones
+    are found, this takes the same time for any `k`.
+    """
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    rng = np.random.default_rng(random.getrandbits(64))
+    with np.errstate(divide="ignore"):
+        keys = np.log(rng.random(len(weights))) / weights
+    idxs = np.argpartition(-keys, k - 1)[:k]
+    return idxs[np.argsort(-keys[idxs], kind="stable")]
+
+
 def setup_logger(session_id, user_log_dir):
     """Creates a log file and logging object for the corresponding session ID"""
     logger = logging.getLogger(session_id)
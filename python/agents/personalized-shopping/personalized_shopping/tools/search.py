@@ -15,7 +15,7 @@
 from google.adk.tools import ToolContext
 from google.genai import types
 
-from ..shared_libraries.init_env import webshop_env
+from ..shared_libraries.init_env import use_webshop_env
 
 
 async def search(keywords: str, tool_context: ToolContext) -> str:
@@ -30,11 +30,17 @@ async def search(keywords: str, tool_context: ToolContext) -> str:
     """
     status = {"reward": None, "done": False}
     action_string = f"search[{keywords}]"
-    webshop_env.server.assigned_instruction_text = f"Find me {keywords}."
-    print(f"env instruction_text: {webshop_env.instruction_text}")
-    _, status["reward"], status["done"], _ = webshop_env.step(action_string)
+    # The environment isn't closed for other sessions while the action runs.
+    with use_webshop_env(tool_context.session.id) as webshop_env:
+        server = webshop_env.server
+        # Other sessions share the server, only this session's actions wait.
+        with server.session_lock(webshop_env.session):
+            server.assign_instruction_text(webshop_env.session, f"Find me {keywords}.")
+            print(f"env instruction_text: {webshop_env.instruction_text}")
+            _, status["reward"], status["done"], _ = webshop_env.step(action_string)
+            ob = webshop_env.observation
+            html = webshop_env.state["html"]
 
-    ob = webshop_env.observation
     index = ob.find("Back to Search")
     if index >= 0:
         ob = ob[index:]
@@ -49,9 +55,7 @@ async def search(keywords: str, tool_context: ToolContext) -> str:
     try:
         await tool_context.save_artifact(
             "html",
-            types.Part.from_uri(
-                file_uri=webshop_env.state["html"], mime_type="text/html"
-            ),
+            types.Part.from_uri(file_uri=html, mime_type="text/html"),
         )
     except ValueError as e:
         print(f"Error saving artifact: {e}")
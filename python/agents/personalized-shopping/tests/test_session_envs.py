@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import types
+import uuid
+
+import pytest
+
+from personalized_shopping.shared_libraries import init_env
+from personalized_shopping.tools.click import click
+from personalized_shopping.tools.search import search
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+class FakeToolContext:
+    """Context of the tools in an ADK session, without an artifact service"""
+
+    def __init__(self, session_id):
+        self.session = types.SimpleNamespace(id=session_id)
+
+    async def save_artifact(self, filename, artifact):
+        pass
+
+
+@pytest.fixture
+def session_ids():
+    session_ids = [str(uuid.uuid4()) for _ in range(2)]
+    yield session_ids
+    for session_id in session_ids:
+        init_env.close_webshop_env(session_id)
+
+
+@pytest.mark.asyncio
+async def test_sessions_have_their_own_environment(session_ids):
+    first, second = session_ids
+    await search("shoes", FakeToolContext(first))
+    await search("dress", FakeToolContext(second))
+    await click("Next >", FakeToolContext(first))
+
+    first_env = init_env.get_webshop_env(first)
+    second_env = init_env.get_webshop_env(second)
+    assert first_env is not second_env
+    assert first_env.server is second_env.server
+    user_sessions = first_env.server.user_sessions
+    assert user_sessions[first]["keywords"] == ["shoes"]
+    assert user_sessions[first]["page"] == 2
+    assert user_sessions[second]["keywords"] == ["dress"]
+    assert user_sessions[second]["page"] == 1
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_environment_is_closed(session_ids, monkeypatch):
+    monkeypatch.setattr(init_env, "MAX_SESSION_ENVS", 1)
+    first, second = session_ids
+    await search("shoes", FakeToolContext(first))
+    server = init_env.get_webshop_env(first).server
+    assert first in server.user_sessions
+
+    await search("dress", FakeToolContext(second))
+    assert first not in server.user_sessions
+    assert second in server.user_sessions
+
+    # The session starts over in a new environment.
+    await search("shoes", FakeToolContext(first))
+    assert server.user_sessions[first]["keywords"] == ["shoes"]
+    assert second not in server.user_sessions
+
+
+@pytest.mark.asyncio
+async def test_environment_in_use_is_not_closed(session_ids, monkeypatch):
+    monkeypatch.setattr(init_env, "MAX_SESSION_ENVS", 1)
+    first, second = session_ids
+    with init_env.use_webshop_env(first) as first_env:
+        server = first_env.server
+        # Another session would evict the environment before it steps, the
+        # least recently used environment not in use is closed instead.
+        await search("dress", FakeToolContext(second))
+        assert first in server.user_sessions
+        assert second not in server.user_sessions
+        with server.session_lock(first):
+            first_env.step("search[shoes]")
+        assert server.user_sessions[first]["keywords"] == ["shoes"]
+    assert list(init_env._session_envs) == [first]
+
+
+def test_actions_of_an_ended_session_start_over(session_ids):
+    env = init_env.get_webshop_env(session_ids[0])
+    env.close()
+    with env.server.session_lock(env.session):
+        env.step("search[shoes]")
+    assert env.server.user_sessions[env.session]["keywords"] == ["shoes"]
+
+
+def test_actions_of_a_session_wait_for_each_other_across_its_end(session_ids):
+    server = init_env.get_webshop_env(session_ids[0]).server
+    session_id = session_ids[1]
+    entered = threading.Event()
+    running = []
+    overlapped = []
+
+    def action():
+        with server.session_lock(session_id):
+            running.append(True)
+            entered.set()
+            time.sleep(0.2)
+            running.pop()
+
+    with server.session_lock(session_id):
+        waiting = threading.Thread(target=action)
+        waiting.start()
+        time.sleep(0.1)
+        # Ends the session while an action waits on it.
+        server.end_session(session_id)
+    entered.wait()
+    with server.session_lock(session_id):
+        overlapped.append(bool(running))
+    waiting.join()
+    assert overlapped == [False]
+    assert session_id not in server._session_locks
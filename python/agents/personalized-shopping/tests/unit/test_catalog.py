@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from web_agent_site.engine.catalog import (
+    ProductCatalog,
+    ProductIndex,
+    catalog_path_for,
+    is_catalog_fresh,
+    write_catalog,
+)
+
+
+def make_product(i):
+    return {
+        "asin": f"B{i:09d}",
+        "name": f"red shoe {i}",
+        "Title": f"Red Shoe {i}",
+        "category": "fashion" if i % 2 else "beauty",
+        "product_category": "Clothing › Shoes",
+        "options": {"size": ["8", "9"]} if i % 2 else {},
+        "query": f"query {i % 3}",
+        "pricing": [float(i), float(i) + 1],
+        # Attributes may be repeated.
+        "Attributes": [f"attribute {i % 2}", "comfortable", "comfortable"],
+    }
+
+
+def make_instructions(i):
+    return {
+        "instructions": [{"instruction": f"human goal {i}"}] if i % 2 else None,
+        "instruction_text": f"synthetic goal {i}",
+        "instruction_attributes": [f"attribute {i % 2}"],
+    }
+
+
+@pytest.fixture
+def items_path(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text("[]")
+    return str(path)
+
+
+@pytest.fixture
+def catalog_path(items_path):
+    # The products are listed in a different order than in the items file.
+    source_indexes = [1, 0, 3, 2, 4]
+    path = catalog_path_for(items_path)
+    write_catalog(
+        path,
+        ((i, make_product(i), make_instructions(i)) for i in source_indexes),
+        [items_path],
+        type_nouns=lambda names: {name: name.split()[1:2] for name in names},
+    )
+    return path
+
+
+def test_catalog_path_for():
+    assert catalog_path_for("data/items.json") == "data/items.catalog.sqlite"
+
+
+def test_is_catalog_fresh(items_path, catalog_path):
+    assert is_catalog_fresh(catalog_path, [items_path])
+    assert not is_catalog_fresh(catalog_path + ".missing", [items_path])
+
+    with open(items_path, "w") as f:
+        f.write("[ ]")
+    assert not is_catalog_fresh(catalog_path, [items_path])
+
+
+def test_write_catalog_replaces_catalog(items_path, catalog_path):
+    write_catalog(catalog_path, [(0, make_product(0), {})], [items_path])
+
+    catalog = ProductCatalog(catalog_path)
+    assert catalog.asins == [make_product(0)["asin"]]
+    assert not os.path.exists(f"{catalog_path}.tmp")
+    catalog.close()
+
+
+def test_products(catalog_path):
+    catalog = ProductCatalog(catalog_path)
+    order = [1, 0, 3, 2, 4]
+    assert catalog.asins == [make_product(i)["asin"] for i in order]
+    assert catalog.pricings == [make_product(i)["pricing"] for i in order]
+    assert len(catalog.products) == 5
+    assert catalog.products[2]["asin"] == make_product(3)["asin"]
+    assert [p["asin"] for p in catalog.products[1:3]] == catalog.asins[1:3]
+    assert [p["asin"] for p in catalog.products] == catalog.asins
+
+    asin = make_product(2)["asin"]
+    assert asin in catalog.product_item_dict
+    assert catalog.product_item_dict[asin]["name"] == "red shoe 2"
+    assert list(catalog.product_item_dict) == catalog.asins
+    with pytest.raises(KeyError):
+        catalog.product_item_dict["missing"]
+    catalog.close()
+
+
+def test_num_products(catalog_path):
+    catalog = ProductCatalog(catalog_path, num_products=3)
+    assert catalog.asins == [make_product(i)["asin"] for i in [1, 0, 2]]
+    assert make_product(3)["asin"] not in catalog.product_item_dict
+    assert [p["asin"] for p in catalog.products] == catalog.asins
+    assert catalog.product_index.attribute_to_asins["attribute 1"] == [
+        make_product(1)["asin"]
+    ]
+    catalog.close()
+
+
+def test_human_and_synthetic_goals(catalog_path):
+    human = ProductCatalog(catalog_path, human_goals=True)
+    synthetic = ProductCatalog(catalog_path, human_goals=False)
+    for i in range(5):
+        asin = make_product(i)["asin"]
+        instructions = make_instructions(i)
+        human_product = human.product_item_dict[asin]
+        if instructions["instructions"] is None:
+            assert "instructions" not in human_product
+        else:
+            assert human_product["instructions"] == instructions["instructions"]
+        assert "instruction_text" not in human_product
+
+        synthetic_product = synthetic.product_item_dict[asin]
+        assert synthetic_product["instruction_text"] == instructions["instruction_text"]
+        assert (
+            synthetic_product["instruction_attributes"]
+            == instructions["instruction_attributes"]
+        )
+    human.close()
+    synthetic.close()
+
+
+def test_product_index_matches_from_products(catalog_path):
+    catalog = ProductCatalog(catalog_path)
+    expected = ProductIndex.from_products(list(catalog.products))
+    index = catalog.product_index
+    assert index.category_to_asins == expected.category_to_asins
+    assert index.query_to_asins == expected.query_to_asins
+    assert dict(index.attribute_to_asins) == expected.attribute_to_asins
+    assert len(index.attribute_to_asins) == 3
+    with pytest.raises(KeyError):
+        index.attribute_to_asins["missing"]
+    catalog.close()
+
+
+def test_type_nouns(items_path, catalog_path):
+    catalog = ProductCatalog(catalog_path)
+    assert catalog.type_nouns["red shoe 4"] == ["shoe"]
+    assert len(catalog.type_nouns) == 5
+    assert set(catalog.type_nouns) == {f"red shoe {i}" for i in range(5)}
+    with pytest.raises(KeyError):
+        catalog.type_nouns["missing"]
+    catalog.close()
+
+    write_catalog(catalog_path, [(0, make_product(0), {})], [items_path])
+    catalog = ProductCatalog(catalog_path)
+    assert len(catalog.type_nouns) == 0
+    catalog.close()
+
+
+@pytest.mark.parametrize("human_goals", [True, False])
+def test_goal_records_match_products(catalog_path, monkeypatch, human_goals):
+    catalog = ProductCatalog(catalog_path, num_products=3, human_goals=human_goals)
+    products = list(catalog.products)
+    # The records are built without decoding any product.
+    monkeypatch.setattr(catalog, "_materialize", None)
+    records = list(catalog.products.goal_records())
+    assert [r["asin"] for r in records] == catalog.asins
+    for record, product in zip(records, products):
+        assert record == {key: product[key] for key in record}
+    if human_goals:
+        assert "instructions" in records[0]
+    else:
+        assert records[0]["instruction_text"] == "synthetic goal 1"
+    catalog.close()
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+
+import pytest
+
+from search_engine.convert_product_file_format import iter_json_array
+
+ELEMENTS = [
+    12345678,
+    -1.5e10,
+    "a, string]",
+    {"nested": [1, {"b": None}], "n": 2.25},
+    [],
+    True,
+    None,
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_elements_match_json_loads(chunk_size, indent):
+    text = json.dumps(ELEMENTS, indent=indent)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == ELEMENTS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+def test_number_across_chunks(chunk_size):
+    assert list(iter_json_array(io.StringIO("[12345678]"), chunk_size)) == [12345678]
+    assert list(iter_json_array(io.StringIO("[1, 2e5]"), chunk_size)) == [1, 2e5]
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_empty_array(text):
+    assert list(iter_json_array(io.StringIO(text), 1)) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1 << 20])
+@pytest.mark.parametrize(
+    "text", ["{}", "[1 2]", "[1, 2", "[{} {}]", "[1,, 2]", "[, 1]", "[1, ]"]
+)
+def test_invalid_arrays(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+def test_elements_are_not_yielded_without_separator():
+    elements = iter_json_array(io.StringIO('[1, "a" "b"]'), 2)
+    assert next(elements) == 1
+    with pytest.raises(ValueError):
+        next(elements)
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+
+import pytest
+
+from web_agent_site.engine import goal
+from web_agent_site.engine.catalog import ProductCatalog, write_catalog
+
+
+@pytest.fixture
+def type_nouns(monkeypatch):
+    """Empty type nouns cache of two names, with the nouns of a catalog"""
+    stored = {f"red shoe {i}": ["shoe"] for i in range(4)}
+    monkeypatch.setattr(goal, "_type_nouns", OrderedDict())
+    monkeypatch.setattr(goal, "_TYPE_NOUNS_CACHE_SIZE", 2)
+    monkeypatch.setattr(goal, "_stored_type_nouns", stored)
+    return stored
+
+
+def test_type_nouns_cache_is_bounded(type_nouns):
+    for name in type_nouns:
+        assert goal.get_type_nouns(name) == ("shoe",)
+    assert list(goal._type_nouns) == ["red shoe 2", "red shoe 3"]
+
+
+def test_type_nouns_cache_keeps_recently_used_names(type_nouns):
+    goal.get_type_nouns("red shoe 0")
+    goal.get_type_nouns("red shoe 1")
+    goal.get_type_nouns("red shoe 0")
+    goal.get_type_nouns("red shoe 2")
+    assert list(goal._type_nouns) == ["red shoe 0", "red shoe 2"]
+
+
+def test_compute_type_nouns_returns_all_names(type_nouns):
+    names = [f"blue jacket {i}" for i in range(3)] + ["red shoe 0"]
+    type_nouns_by_name = goal.compute_type_nouns(names)
+    assert list(type_nouns_by_name) == names
+    assert type_nouns_by_name["red shoe 0"] == ("shoe",)
+    for name in names[:3]:
+        assert "jacket" in type_nouns_by_name[name]
+    assert len(goal._type_nouns) == 2
+
+
+def make_product(i, options):
+    return {
+        "asin": f"B{i:09d}",
+        "category": "fashion",
+        "query": "shoes",
+        "name": f"red shoe {i}",
+        "product_category": "Clothing › Shoes",
+        "instruction_text": f"i want red shoes {i}",
+        "instruction_attributes": ["comfortable"] if i % 2 else ["warm"],
+        "options": options,
+        "Title": f"Red Shoe {i}",
+    }
+
+
+def test_synthetic_goals_of_option_combinations():
+    products = [
+        make_product(0, {"size": ["8", "9"], "color": ["red", "blue", "black"]}),
+        make_product(1, {}),
+    ]
+    goals = goal.get_synthetic_goals(products, None)
+    assert len(goals) == 7
+    assert [g["goal_options"] for g in goals[:3]] == [
+        {"color": "red", "size": "8"},
+        {"color": "red", "size": "9"},
+        {"color": "blue", "size": "8"},
+    ]
+    assert goals[6]["goal_options"] == {}
+    assert goals[6]["instruction_text"] == "i want red shoes 1"
+    assert goal.get_goal_weights(goals).tolist() == [1 / 6] * 6 + [1.0]
+
+
+def test_synthetic_goals_skip_products_with_an_empty_option():
+    products = [
+        make_product(0, {"size": ["8"], "color": []}),
+        make_product(1, {"size": ["8", "9"]}),
+        make_product(2, {"size": []}),
+    ]
+    goals = goal.get_synthetic_goals(products, None)
+    assert [g["asin"] for g in goals] == [products[1]["asin"]] * 2
+    assert goal.get_goal_weights(goals).tolist() == [0.5, 0.5]
+
+
+def test_goals_of_catalog_match_goals_of_products(tmp_path):
+    products = [
+        make_product(0, {"size": ["8", "9"], "color": ["red", "blue"]}),
+        make_product(1, {}),
+    ]
+    for p in products:
+        p.update(pricing=[10.0], Attributes=[])
+    catalog_path = str(tmp_path / "items.catalog.sqlite")
+    write_catalog(
+        catalog_path,
+        ((i, p, p) for i, p in enumerate(products)),
+        [],
+    )
+    catalog = ProductCatalog(catalog_path, human_goals=False)
+    goals = goal.get_goals(catalog.products, None, human_goals=False)
+    expected = goal.get_goals(products, None, human_goals=False)
+    assert list(goals) == list(expected)
+    catalog.close()
@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from bs4 import BeautifulSoup
+import pytest
+
+from web_agent_site.engine.engine import map_action_to_html
+from web_agent_site.engine.pages import map_action_to_page
+from web_agent_site.envs.web_agent_text_env import app, tag_visible, text_kind
+
+# Texts that BeautifulSoup normalizes, or that must be escaped in HTML.
+TITLES = ["Red <b>shoe</b> & 'sock'", "  ", "\n", "multi\nline  title", "ünïcode"]
+
+PRODUCT = {
+    "asin": "B000000001",
+    "Title": TITLES[0],
+    "Price": "$10.0",
+    "MainImage": "https://example.com/image.jpg",
+    "Description": "A <p>description</p>",
+    "BulletPoints": ["soft", " ", "", "warm\n"],
+    "Reviews": [
+        {"title": "good", "score": 4, "body": "nice"},
+        {"title": "", "score": 1, "body": " "},
+    ],
+    "Rating": "N.A.",
+    "options": {"color": ["red", "blue | green"], "size": ["x-large", " "]},
+    "option_to_image": {},
+    "Attributes": ["soft", "cheap"],
+    "category": "fashion",
+    "query": "shoes",
+    "product_category": "Clothing › Shoes",
+}
+
+COMMON = dict(
+    session_id="abc",
+    instruction_text="i want <red> shoes, and price lower than 20.00 dollars",
+    keywords=["red", "shoes"],
+    page=2,
+    asin=PRODUCT["asin"],
+    options={"color": "red"},
+    product_info=PRODUCT,
+    show_attrs=True,
+)
+
+PAGES = {
+    "search": ("start", {}),
+    "results": (
+        "search[red shoes]",
+        dict(
+            products=[
+                dict(PRODUCT, asin=f"B00000000{i}", Title=title)
+                for i, title in enumerate(TITLES)
+            ],
+            total=23,
+        ),
+    ),
+    "results_first_page": (
+        "search[red shoes]",
+        dict(products=[PRODUCT], total=1, page=1),
+    ),
+    "item": ("click[b000000001]", {}),
+    "item_without_attributes": ("click[b000000001]", dict(show_attrs=False)),
+    "description": ("click[Description]", {}),
+    "features": ("click[Features]", {}),
+    "reviews": ("click[Reviews]", {}),
+    "attributes": ("click[Attributes]", {}),
+    "done": (
+        "click[Buy Now]",
+        dict(
+            reward=0.75,
+            reward_info={"r_type": 1.0, "r_att": "<x>"},
+            purchased_attrs=["soft"],
+            goal={
+                "asin": "B000000002",
+                "goal_options": ["red"],
+                "attributes": ["soft"],
+                "price_upper": 20.0,
+                "instruction_text": "i want red shoes",
+                "category": "fashion",
+                "product_category": "Clothing › Shoes",
+                "query": "shoes",
+            },
+            mturk_code="abc",
+            query="shoes",
+            category="fashion",
+            product_category="Clothing › Shoes",
+        ),
+    ),
+}
+
+
+@pytest.fixture(params=list(PAGES))
+def page_and_soup(request):
+    action, kwargs = PAGES[request.param]
+    kwargs = dict(COMMON, **kwargs)
+    # Pages are built in the context of the app, like `SimServer.receive` does.
+    with app.app_context(), app.test_request_context():
+        page = map_action_to_page(
+            action, render_html=lambda: map_action_to_html(action, **kwargs), **kwargs
+        )
+        html = page.html
+    return page, BeautifulSoup(html, "html.parser")
+
+
+def test_texts_match_html(page_and_soup):
+    # The line breaks between tags are not part of the observations.
+    page, soup = page_and_soup
+    visible_texts = [
+        (str(t), text_kind(t)) for t in soup.find_all(string=True) if tag_visible(t)
+    ]
+    assert [(t, kind) for t, kind in page.texts if t != "\n"] == [
+        (t, kind) for t, kind in visible_texts if t != "\n"
+    ]
+
+
+def test_text_to_clickable_matches_html(page_and_soup):
+    # Clickables are found in the HTML like `WebAgentTextEnv` does.
+    page, soup = page_and_soup
+    buttons = soup.find_all(class_="btn")
+    product_links = soup.find_all(class_="product-link")
+    text_to_clickable = {
+        f"{b.get_text()}".lower(): {"class": b.get("class")}
+        for b in buttons + product_links
+    }
+    for opt in soup.select('input[type="radio"]'):
+        text_to_clickable[f"{opt.get('value')}"] = {"name": opt.get("name")}
+    assert page.text_to_clickable() == text_to_clickable
+    assert page.has_search_bar == (soup.find(id="search_input") is not None)
+
+
+def test_instruction_text_and_image_match_html(page_and_soup):
+    page, soup = page_and_soup
+    instruction = soup.find(id="instruction-text")
+    if instruction is not None:
+        assert page.instruction_text == instruction.h4.text
+    image = soup.find(id="product-image")
+    assert page.image_url == (None if image is None else image["src"])